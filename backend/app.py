@@ -1,8 +1,9 @@
 import logging
 import sys
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,6 +14,7 @@ from qdrant_client import QdrantClient
 
 from config import settings
 from routers import repo_router
+from services.chunker import shutdown_chunk_pool
 
 
 def _configure_logging() -> None:
@@ -32,6 +34,13 @@ def _configure_logging() -> None:
 _configure_logging()
 logger = logging.getLogger("autodeployx.api")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    shutdown_chunk_pool()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
@@ -39,6 +48,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
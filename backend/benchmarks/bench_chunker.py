@@ -0,0 +1,323 @@
+"""Measure CodeChunker throughput and chunk sizes on synthetic and local repositories.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_chunker --files 400 --output results.json
+    python -m benchmarks.bench_chunker --repo ~/src/project --baseline results.json
+
+Synthetic repositories are generated from ``--mix`` (language=weight pairs)
+and ``--seed``, so the same arguments give the same corpus across versions.
+Every corpus is read with FileReader and chunked with each strategy; the
+content cache is disabled so every run does the full work. Peak memory is
+traced in a separate pass (tracemalloc slows the code it measures) and only
+covers the calling process, not pool workers.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_python_chunker import make_source as make_python_source
+from config import settings
+from services.chunker import CodeChunker, shutdown_chunk_pool
+from services.file_reader import FileReader
+
+RESULTS_VERSION = 1
+STRATEGIES = ("semantic", "sliding_window", "pool")
+DEFAULT_MIX = "python=4,javascript=3,go=1,java=1,markdown=1"
+
+
+def make_javascript_source(lines: int) -> str:
+    parts = ['import { request } from "./http";\n\n']
+    total = 2
+    index = 0
+    while total < lines:
+        parts.append(
+            f"export class Store{index} {{\n"
+            f"  constructor(base) {{\n    this.base = `${{base}}/store/{index}`;\n  }}\n\n"
+            f"  async load(id) {{\n"
+            f"    const path = id.replace(/[{{}}]/g, \"\");\n"
+            f"    return request(this.base + \"/\" + path, {{ retries: {index % 5} }});\n"
+            f"  }}\n}}\n\n"
+            f"export const handler{index} = (event) => {{\n"
+            f"  // braces in comments {{ are ignored\n"
+            f"  return {{ status: 200, body: JSON.stringify(event) }};\n}};\n\n"
+        )
+        total += 16
+        index += 1
+    return "".join(parts)
+
+
+def make_go_source(lines: int) -> str:
+    parts = ['package service\n\nimport (\n\t"fmt"\n\t"strings"\n)\n\n']
+    total = 7
+    index = 0
+    while total < lines:
+        parts.append(
+            f"type Worker{index} struct {{\n\tName string\n\tLimit int\n}}\n\n"
+            f"func (w *Worker{index}) Run(items []string) string {{\n"
+            f"\tvar out []string\n"
+            f"\tfor _, item := range items {{\n"
+            f"\t\tout = append(out, fmt.Sprintf(`{{%s}}`, item))\n"
+            f"\t}}\n"
+            f"\treturn strings.Join(out, \",\")\n}}\n\n"
+        )
+        total += 14
+        index += 1
+    return "".join(parts)
+
+
+def make_java_source(lines: int) -> str:
+    parts = ["package app;\n\nimport java.util.List;\n\npublic class Generated {\n"]
+    total = 5
+    index = 0
+    while total < lines:
+        parts.append(
+            f"    public int compute{index}(List<Integer> values) {{\n"
+            f"        int total = {index};\n"
+            f"        for (int value : values) {{\n"
+            f"            total += value * {index % 7};\n"
+            f"        }}\n"
+            f"        return total;\n"
+            f"    }}\n\n"
+        )
+        total += 8
+        index += 1
+    parts.append("}\n")
+    return "".join(parts)
+
+
+def make_markdown_source(lines: int) -> str:
+    parts = []
+    for index in range(max(1, lines // 6)):
+        parts.append(
+            f"## Section {index}\n\n"
+            f"This section describes step {index} of the deployment process in some detail.\n"
+            f"It mentions configuration, environment variables and the expected output.\n\n"
+            f"- item {index}\n"
+        )
+    return "".join(parts)
+
+
+GENERATORS: Dict[str, tuple] = {
+    "python": (".py", make_python_source),
+    "javascript": (".js", make_javascript_source),
+    "go": (".go", make_go_source),
+    "java": (".java", make_java_source),
+    "markdown": (".md", make_markdown_source),
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        language, _, weight = item.partition("=")
+        language = language.strip().lower()
+        if language not in GENERATORS:
+            raise ValueError(f"Unknown language in --mix: {language} (choose from {', '.join(GENERATORS)})")
+        weights[language] = float(weight or 1)
+    return weights
+
+
+def generate_repository(root: Path, files: int, lines_per_file: int, mix: Dict[str, float], seed: int) -> None:
+    """Write ``files`` files whose languages follow ``mix`` and sizes vary around ``lines_per_file``."""
+    rng = random.Random(seed)
+    languages = list(mix)
+    weights = [mix[language] for language in languages]
+
+    for index in range(files):
+        language = rng.choices(languages, weights)[0]
+        extension, generate = GENERATORS[language]
+        lines = rng.randint(max(10, lines_per_file // 2), lines_per_file * 3 // 2)
+        path = root / f"pkg_{index % 16}" / f"module_{index}{extension}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(generate(lines))
+
+
+def read_corpus(path: Path) -> List[Dict]:
+    return asyncio.run(FileReader().read_repository(path))["files"]
+
+
+def run_strategy(strategy: str, files: List[Dict], workers: int) -> list:
+    if strategy == "semantic":
+        return CodeChunker(workers=1).chunk_repository(files)
+    if strategy == "pool":
+        return CodeChunker(workers=workers).chunk_repository(files)
+
+    chunker = CodeChunker(workers=1)
+    chunks = []
+    for file_info in files:
+        chunks.extend(chunker._build_chunks(file_info, chunker._sliding_window_chunk(file_info["content"])))
+    return chunks
+
+
+def percentiles(values: List[int]) -> Dict[str, float]:
+    if len(values) < 2:
+        value = float(values[0]) if values else 0.0
+        return {"p50": value, "p90": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98]}
+
+
+def best_time(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def peak_memory(func: Callable) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_corpus(name: str, files: List[Dict], strategies, repeat: int, workers: int) -> List[Dict]:
+    total_bytes = sum(file_info["size"] or 0 for file_info in files)
+    results = []
+
+    for strategy in strategies:
+        # Warm-up: starts the process pool and loads the tokenizer
+        chunks = run_strategy(strategy, files, workers)
+        seconds = best_time(lambda: run_strategy(strategy, files, workers), repeat)
+        peak = peak_memory(lambda: run_strategy(strategy, files, workers))
+        sizes = [len(chunk.content) for chunk in chunks]
+
+        results.append({
+            "corpus": name,
+            "strategy": strategy,
+            "files": len(files),
+            "bytes": total_bytes,
+            "chunks": len(chunks),
+            "seconds": seconds,
+            "files_per_sec": len(files) / seconds if seconds else None,
+            "chunks_per_sec": len(chunks) / seconds if seconds else None,
+            "mb_per_sec": total_bytes / 1e6 / seconds if seconds else None,
+            "peak_memory_mb": peak / 1e6,
+            "chunk_size_percentiles": percentiles(sizes),
+            "statistics": CodeChunker(workers=1).get_chunk_statistics(chunks),
+        })
+
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict] = None) -> None:
+    previous = {
+        (result["corpus"], result["strategy"]): result
+        for result in (baseline or {}).get("results", [])
+    }
+    print(
+        f"{'corpus':<24} {'strategy':<15} {'files/s':>9} {'chunks/s':>10} {'MB/s':>7} "
+        f"{'peak MB':>8} {'chunks':>7} {'p50':>6} {'p90':>6}" + (f" {'vs base':>8}" if previous else "")
+    )
+    for result in results:
+        line = (
+            f"{result['corpus'][:24]:<24} {result['strategy']:<15} {result['files_per_sec']:>9.1f} "
+            f"{result['chunks_per_sec']:>10.1f} {result['mb_per_sec']:>7.2f} "
+            f"{result['peak_memory_mb']:>8.1f} {result['chunks']:>7} "
+            f"{result['chunk_size_percentiles']['p50']:>6.0f} {result['chunk_size_percentiles']['p90']:>6.0f}"
+        )
+        base = previous.get((result["corpus"], result["strategy"]))
+        if base:
+            line += f" {(result['mb_per_sec'] / base['mb_per_sec'] - 1) * 100:>+7.1f}%"
+        elif previous:
+            line += f" {'-':>8}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="Files in the synthetic repository (0 to skip it)")
+    parser.add_argument("--lines-per-file", type=int, default=300)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Language weights, e.g. python=3,go=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repo", type=Path, action="append", default=[], help="Local checkout to benchmark; repeatable")
+    parser.add_argument("--strategy", choices=STRATEGIES, action="append", help="Defaults to all strategies")
+    parser.add_argument("--workers", type=int, default=max(2, settings.CHUNK_WORKERS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Earlier --output file to compare MB/s against")
+    args = parser.parse_args()
+
+    settings.CONTENT_CACHE_ENABLED = False
+    # The shared pool is sized from this setting when it first starts
+    settings.CHUNK_WORKERS = args.workers
+    strategies = args.strategy or STRATEGIES
+    mix = parse_mix(args.mix)
+    corpora = []
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="chunker-bench-") as tmp:
+        sources = [(path.resolve().name, path.resolve()) for path in args.repo]
+        if args.files:
+            generate_repository(Path(tmp), args.files, args.lines_per_file, mix, args.seed)
+            name = f"synthetic-{args.files}x{args.lines_per_file}-seed{args.seed}"
+            sources.insert(0, (name, Path(tmp)))
+
+        for name, path in sources:
+            files = read_corpus(path)
+            corpora.append({
+                "name": name,
+                "source": "synthetic" if path == Path(tmp) else str(path),
+                "files": len(files),
+                "bytes": sum(file_info["size"] or 0 for file_info in files),
+                "languages": dict(Counter(file_info["language"] for file_info in files)),
+            })
+            results.extend(benchmark_corpus(name, files, strategies, args.repeat, args.workers))
+
+    shutdown_chunk_pool()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "version": RESULTS_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "settings": {
+                "mix": mix,
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "workers": args.workers,
+                "chunk_size": settings.CHUNK_SIZE,
+                "embedding_max_tokens": settings.EMBEDDING_MAX_TOKENS,
+                "chunk_header_tokens": settings.CHUNK_HEADER_TOKENS,
+                "chunk_overlap_tokens": settings.CHUNK_OVERLAP_TOKENS,
+                "tokenizer": CodeChunker(workers=1).token_counter.name,
+            },
+            "corpora": corpora,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Compare fixed-size embedding batches with length-bucketed token-budget batches.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_embedder --files 200 --output embed.json
+    python -m benchmarks.bench_embedder --repo ~/src/project --no-model
+
+The corpus is chunked with CodeChunker and prepared exactly as the embedder
+would. "fixed" slices texts in arrival order into ``--fixed-batch-size``
+batches (the previous behaviour); "bucketed" is Embedder._encode_texts. Both
+report padded versus real tokens; with the model available both are timed as
+chunks/sec for each ``--backend``, along with the model load time.
+``--no-model`` reports padding only.
+
+    python -m benchmarks.bench_embedder --backend torch --backend onnx
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.bench_chunker import DEFAULT_MIX, best_time, generate_repository, parse_mix, read_corpus
+from config import settings
+from services.chunk import Chunk
+from services.chunker import CodeChunker
+from services.embedder import Embedder, length_sorted_batches
+from services.token_budget import TokenCounter
+
+
+def load_chunks(args) -> List[Chunk]:
+    chunks = []
+    with tempfile.TemporaryDirectory(prefix="embedder-bench-") as tmp:
+        paths = list(args.repo)
+        if args.files:
+            generate_repository(Path(tmp), args.files, args.lines_per_file, parse_mix(args.mix), args.seed)
+            paths.insert(0, Path(tmp))
+        for path in paths:
+            # Chunk while the synthetic checkout still exists; chunks keep their text
+            chunks.extend(CodeChunker(workers=1).chunk_repository(read_corpus(path)))
+    return chunks
+
+
+def padding(batches: List[List[int]], lengths: List[int]) -> Dict:
+    real = sum(lengths)
+    padded = sum(len(batch) * max(lengths[index] for index in batch) for batch in batches)
+    return {"batches": len(batches), "real_tokens": real, "padded_tokens": padded, "efficiency": real / padded}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="Files in the synthetic repository (0 to skip it)")
+    parser.add_argument("--lines-per-file", type=int, default=300)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repo", type=Path, action="append", default=[])
+    parser.add_argument("--limit", type=int, default=2000, help="Chunks to embed")
+    parser.add_argument("--fixed-batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", choices=("torch", "onnx"), action="append", help="Defaults to torch")
+    parser.add_argument("--no-model", action="store_true", help="Report padding without loading the model")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    settings.CONTENT_CACHE_ENABLED = False
+    settings.EMBEDDING_CACHE_ENABLED = False
+
+    chunks = load_chunks(args)[:args.limit]
+    texts = [Embedder._prepare_text(chunk) for chunk in chunks]
+    counter = TokenCounter.for_model(settings.EMBEDDING_MODEL_NAME)
+    lengths = [min(count + 2, settings.EMBEDDING_MAX_TOKENS) for count in counter.count_batch(texts)]
+
+    fixed_batches = [
+        list(range(start, min(start + args.fixed_batch_size, len(texts))))
+        for start in range(0, len(texts), args.fixed_batch_size)
+    ]
+    bucketed_batches = list(length_sorted_batches(lengths, settings.EMBEDDING_BATCH_TOKENS))
+    results = {
+        "fixed": padding(fixed_batches, lengths),
+        "bucketed": padding(bucketed_batches, lengths),
+    }
+    timings = []
+
+    for backend in [] if args.no_model else args.backend or ["torch"]:
+        settings.EMBEDDING_BACKEND = backend
+        started = time.perf_counter()
+        embedder = Embedder()
+        timing = {"backend": embedder.backend, "load_seconds": time.perf_counter() - started}
+
+        def fixed() -> None:
+            for batch in fixed_batches:
+                embedder.model.encode(
+                    [texts[index] for index in batch], batch_size=len(batch),
+                    show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True
+                )
+
+        for name, run in (("fixed", fixed), ("bucketed", lambda: embedder._encode_texts(texts))):
+            run()
+            timing[f"{name}_chunks_per_sec"] = len(texts) / best_time(run, args.repeat)
+        timings.append(timing)
+
+    print(f"{len(texts)} chunks, tokenizer: {counter.name}, batch tokens: {settings.EMBEDDING_BATCH_TOKENS}")
+    print(f"{'strategy':<10} {'batches':>8} {'real tok':>10} {'padded tok':>11} {'efficiency':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['batches']:>8} {result['real_tokens']:>10} {result['padded_tokens']:>11} "
+            f"{result['efficiency']:>10.1%}"
+        )
+    if timings:
+        print(f"\n{'backend':<10} {'load s':>7} {'fixed/s':>9} {'bucketed/s':>11} {'speedup':>8}")
+    for timing in timings:
+        print(
+            f"{timing['backend']:<10} {timing['load_seconds']:>7.2f} {timing['fixed_chunks_per_sec']:>9.1f} "
+            f"{timing['bucketed_chunks_per_sec']:>11.1f} "
+            f"{timing['bucketed_chunks_per_sec'] / timing['fixed_chunks_per_sec']:>7.2f}x"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "chunks": len(texts),
+            "tokenizer": counter.name,
+            "settings": {
+                "model": settings.EMBEDDING_MODEL_NAME,
+                "max_tokens": settings.EMBEDDING_MAX_TOKENS,
+                "batch_tokens": settings.EMBEDDING_BATCH_TOKENS,
+                "fixed_batch_size": args.fixed_batch_size,
+            },
+            "padding": results,
+            "timings": timings,
+        }, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
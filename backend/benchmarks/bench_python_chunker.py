@@ -0,0 +1,76 @@
+"""Compare the AST Python chunker with the line-regex path on large files.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_python_chunker --lines 2000 20000 80000
+
+Many moderate classes are the regex path's best case. One huge class
+(``--methods-per-class 1000000``) shows its quadratic block concatenation.
+"""
+import argparse
+import time
+
+from services.chunker import CodeChunker
+
+
+def make_source(lines: int, methods_per_class: int = 40) -> str:
+    """Classes of decorated sync/async methods until the file has ``lines`` lines."""
+    parts = ['"""Generated benchmark module."""\nimport asyncio\n\n']
+    total = 3
+    class_index = 0
+
+    while total < lines:
+        parts.append(f"\nclass Service{class_index}:\n    \"\"\"Service {class_index}.\"\"\"\n\n")
+        total += 4
+        for method in range(methods_per_class):
+            if total >= lines:
+                break
+            keyword = "async def" if method % 3 == 0 else "def"
+            parts.append(
+                f"    @staticmethod\n"
+                f"    {keyword} handle_{method}(payload):\n"
+                f"        total = 0\n"
+                f"        for item in payload.get('items', []):\n"
+                f"            total += item * {method}\n"
+                f"        return {{'service': {class_index}, 'total': total}}\n\n"
+            )
+            total += 7
+        class_index += 1
+
+    return "".join(parts)
+
+
+def best_of(func, content: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[2_000, 20_000, 80_000])
+    parser.add_argument("--methods-per-class", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunker = CodeChunker(workers=1)
+    print(f"{'lines':>8} {'MB':>6} {'regex s':>9} {'ast s':>9} {'speedup':>8} {'regex blocks':>13} {'ast blocks':>11}")
+
+    for lines in args.lines:
+        content = make_source(lines, args.methods_per_class)
+        regex_time = best_of(chunker._extract_python_blocks_regex, content, args.repeat)
+        ast_time = best_of(chunker._extract_python_blocks, content, args.repeat)
+        regex_blocks = len(chunker._extract_python_blocks_regex(content))
+        ast_blocks = len(chunker._extract_python_blocks(content))
+
+        print(
+            f"{lines:>8} {len(content) / 1e6:>6.2f} {regex_time:>9.4f} {ast_time:>9.4f} "
+            f"{regex_time / ast_time:>7.1f}x {regex_blocks:>13} {ast_blocks:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -24,8 +24,39 @@ class Settings(BaseSettings):
         "*"
     ]
     
+    # Repository Cloning
+    CLONE_DIR: str = os.getenv("CLONE_DIR", "./tmp/repos")
+    MAX_REPO_SIZE_MB: int = int(os.getenv("MAX_REPO_SIZE_MB", "500"))
+    CLONE_DEPTH: int = int(os.getenv("CLONE_DEPTH", "1"))
+    CLONE_TIMEOUT: int = int(os.getenv("CLONE_TIMEOUT", "300"))
+    # "full" checks out every blob; "sparse" does a blob-less partial clone and
+    # only checks out paths matching ALLOWED_EXTENSIONS minus excluded patterns
+    CLONE_MODE: str = os.getenv("CLONE_MODE", "full")
+    # "checkout" walks a working tree; "git" skips the checkout and streams
+    # blobs straight from the object database
+    INGESTION_MODE: str = os.getenv("INGESTION_MODE", "checkout")
+    
+    # Mirror Cache (bare mirrors reused across jobs, LRU-evicted by size)
+    MIRROR_CACHE_ENABLED: bool = os.getenv("MIRROR_CACHE_ENABLED", "true").lower() == "true"
+    MIRROR_CACHE_DIR: str = os.getenv("MIRROR_CACHE_DIR", "./tmp/mirrors")
+    MIRROR_CACHE_MAX_MB: int = int(os.getenv("MIRROR_CACHE_MAX_MB", "2048"))
+    
+    # Content Cache (decoded file metadata and chunks keyed by blob hash, LRU-evicted by size)
+    CONTENT_CACHE_ENABLED: bool = os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true"
+    CONTENT_CACHE_DIR: str = os.getenv("CONTENT_CACHE_DIR", "./tmp/content-cache")
+    CONTENT_CACHE_MAX_MB: int = int(os.getenv("CONTENT_CACHE_MAX_MB", "512"))
+    
+    # Embedding Cache (float32 vectors keyed by embedder input, model and dimension;
+    # stored next to the content cache, LRU-evicted by size)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+    
     # File Processing
     MAX_FILE_SIZE_MB: int = 10
+    # Skip lockfiles, minified bundles and generated sources (reported in metadata)
+    SKIP_GENERATED_FILES: bool = os.getenv("SKIP_GENERATED_FILES", "true").lower() == "true"
+    # Reads in flight at once when walking a checkout (size of the reader pool)
+    FILE_READ_CONCURRENCY: int = int(os.getenv("FILE_READ_CONCURRENCY", "32"))
     
     # Comprehensive list of allowed extensions for code analysis
     ALLOWED_EXTENSIONS: List[str] = [
@@ -80,6 +111,45 @@ class Settings(BaseSettings):
     
     # Embedding Model
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", EMBEDDING_MODEL)
+    EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", str(EMBEDDING_DIM)))
+    # Chunks per embedding call; each call is sorted by token length and split
+    # into forward passes of at most EMBEDDING_BATCH_TOKENS padded tokens
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+    EMBEDDING_BATCH_TOKENS: int = int(os.getenv("EMBEDDING_BATCH_TOKENS", "8192"))
+    # Shared embedding worker: requests from all jobs are coalesced into batches
+    # of about this many texts, waiting at most this long for a batch to fill
+    EMBEDDING_SERVICE_MAX_BATCH: int = int(os.getenv("EMBEDDING_SERVICE_MAX_BATCH", "256"))
+    EMBEDDING_SERVICE_MAX_WAIT_MS: int = int(os.getenv("EMBEDDING_SERVICE_MAX_WAIT_MS", "10"))
+    # Longest input the model sees, special tokens included; longer text is truncated
+    EMBEDDING_MAX_TOKENS: int = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+    # "torch" (SentenceTransformer) or "onnx" (ONNX Runtime on CPU; exported
+    # to EMBEDDING_ONNX_DIR on first use, int8-quantized unless disabled;
+    # needs requirements-onnx.txt, otherwise torch is used)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    EMBEDDING_ONNX_DIR: str = os.getenv("EMBEDDING_ONNX_DIR", "./models/onnx")
+    EMBEDDING_ONNX_QUANTIZE: bool = os.getenv("EMBEDDING_ONNX_QUANTIZE", "true").lower() == "true"
+    
+    # Chunking
+    # Characters at which classes and statement runs are split into smaller blocks
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1200"))
+    # Tokens of EMBEDDING_MAX_TOKENS kept free for the embedder's file header;
+    # blocks longer than the rest are split into token-bounded sub-chunks
+    CHUNK_HEADER_TOKENS: int = int(os.getenv("CHUNK_HEADER_TOKENS", "48"))
+    # Tokens repeated at the start of the next sub-chunk
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    # Processes in the shared chunking pool (1 chunks in the calling thread)
+    CHUNK_WORKERS: int = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+    # Files are handed to the pool in groups of about this many bytes
+    CHUNK_WORK_UNIT_BYTES: int = int(os.getenv("CHUNK_WORK_UNIT_BYTES", str(256 * 1024)))
+    
+    # Indexing pipeline: embedding batches buffered between the chunk, embed
+    # and upsert stages before the upstream stage blocks
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+    
+    # Retrieval
+    RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "15"))
+    RAG_SCORE_THRESHOLD: float = float(os.getenv("RAG_SCORE_THRESHOLD", "0.55"))
     
     # Prometheus
     PROMETHEUS_METRICS_PATH: str = os.getenv("PROMETHEUS_METRICS_PATH", "/metrics")
@@ -1,10 +1,13 @@
+import asyncio
 import logging
 from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from urllib.parse import urlparse
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from multipart.multipart import MultipartParser, parse_options_header
 from pydantic import BaseModel, Field, field_validator
+from starlette.requests import ClientDisconnect
 
 from services.analysis_pipeline import RepositoryAnalyzer
 
@@ -83,19 +86,155 @@ def get_analyzer() -> RepositoryAnalyzer:
     return RepositoryAnalyzer()
 
 
+async def _run_until_disconnect(http_request: Request, coro, poll_interval: float = 1.0):
+    """Await ``coro``, cancelling it (and any git child processes) if the client goes away."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling analysis")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @router.post("/repo/analyze", response_model=AnalysisResponse)
-async def analyze_repository(request: AnalyzeRequest):
+async def analyze_repository(request: AnalyzeRequest, http_request: Request):
     analyzer = get_analyzer()
     try:
-        result = await analyzer.analyze_repo(
-            repo_url=str(request.repo_url),
-            branch=request.branch,
-            include_tests=request.include_tests,
-            metadata=request.metadata or {},
+        result = await _run_until_disconnect(
+            http_request,
+            analyzer.analyze_repo(
+                repo_url=str(request.repo_url),
+                branch=request.branch,
+                include_tests=request.include_tests,
+                metadata=request.metadata or {},
+            ),
         )
         return result
+    except HTTPException:
+        raise
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # pragma: no cover - runtime safeguard
         logger.exception("Repository analysis failed: %s", exc)
         raise HTTPException(status_code=500, detail="Analysis failed") from exc
+
+
+async def _stream_upload(http_request: Request) -> AsyncIterator[bytes]:
+    """Yield the first uploaded file of a multipart body as it arrives.
+
+    Unlike ``UploadFile`` nothing is spooled to a temporary file. A
+    non-multipart body is treated as the archive itself.
+    """
+    content_type, params = parse_options_header(http_request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data":
+        async for chunk in http_request.stream():
+            yield chunk
+        return
+
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("Missing boundary in multipart upload")
+
+    part: Dict[str, Any] = {"field": b"", "value": b"", "disposition": b""}
+    state = {"capturing": False, "found": False, "done": False}
+    pending: List[bytes] = []
+
+    def on_part_begin():
+        part.update(field=b"", value=b"", disposition=b"")
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        if part["field"].lower() == b"content-disposition":
+            part["disposition"] = part["value"]
+        part["field"] = b""
+        part["value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["disposition"])
+        state["capturing"] = b"filename" in options and not state["found"]
+        state["found"] = state["found"] or state["capturing"]
+
+    def on_part_data(data, start, end):
+        if state["capturing"]:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        if state["capturing"]:
+            state["capturing"] = False
+            state["done"] = True
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    async for chunk in http_request.stream():
+        parser.write(chunk)
+        if pending:
+            data = b"".join(pending)
+            pending.clear()
+            yield data
+        if state["done"]:
+            return
+
+    if not state["found"]:
+        raise ValueError("Multipart upload did not contain an archive file")
+
+
+@router.post("/repo/analyze-archive", response_model=AnalysisResponse)
+async def analyze_archive(
+    http_request: Request,
+    name: str = Query(default="uploaded-archive", description="Label used in place of a repository URL"),
+    include_tests: bool = Query(default=False, description="Include test directories when chunking"),
+):
+    analyzer = get_analyzer()
+    try:
+        # The body is consumed by the analysis itself, so disconnects surface
+        # as ClientDisconnect from the stream rather than by polling.
+        return await analyzer.analyze_archive(
+            _stream_upload(http_request),
+            archive_name=name,
+            include_tests=include_tests,
+        )
+    except ClientDisconnect as exc:
+        logger.info("Client disconnected during archive upload")
+        raise HTTPException(status_code=499, detail="Client closed request") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # pragma: no cover - runtime safeguard
+        logger.exception("Archive analysis failed: %s", exc)
+        raise HTTPException(status_code=500, detail="Analysis failed") from exc
+
+
+@router.get("/repo/jobs")
+async def list_jobs():
+    return {"jobs": get_analyzer().list_jobs()}
+
+
+@router.get("/repo/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    status = get_analyzer().get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
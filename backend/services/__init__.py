@@ -1,9 +1,22 @@
-from .repo_cloner import RepoCloner
-from .file_reader import FileReader
-from .chunker import CodeChunker
-from .embedder import Embedder
-from .vector_store import VectorStore
-from .llm_engine import LLMEngine
+import importlib
+
+# Resolved on first access so that importing one service (e.g. in a chunking
+# pool worker) does not pull in torch through the embedder
+_EXPORTS = {
+    'RepoCloner': '.repo_cloner',
+    'FileReader': '.file_reader',
+    'CodeChunker': '.chunker',
+    'Embedder': '.embedder',
+    'VectorStore': '.vector_store',
+    'LLMEngine': '.llm_engine',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'RepoCloner',
@@ -12,4 +25,4 @@ __all__ = [
     'Embedder',
     'VectorStore',
     'LLMEngine'
-]
\ No newline at end of file
+]
@@ -1,20 +1,28 @@
+import asyncio
 import json
 import logging
+import time
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 from uuid import uuid4
 
 from config import settings
+from services.chunk import Chunk
 from services.chunker import CodeChunker
+from services.content_dedup import ContentDeduplicator
 from services.embedder import Embedder
+from services.embedding_service import EmbeddingService
 from services.file_reader import FileReader
 from services.llm_engine import LLMEngine
 from services.repo_cloner import RepoCloner
 from services.vector_store import VectorStore
 from utils.helpers import detect_build_tools, detect_framework, truncate_text
+from utils.metrics import CHUNK_DEDUP_RATIO, CHUNKS_DEDUPLICATED_TOTAL, CHUNKS_SEEN_TOTAL
 
 logger = logging.getLogger(__name__)
 
+MAX_SKIPPED_EXAMPLES = 20
+
 
 @dataclass
 class SourceReference:
@@ -25,6 +33,24 @@ class SourceReference:
     snippet: str
 
 
+@dataclass
+class JobStatus:
+    job_id: str
+    repo_url: str
+    branch: Optional[str]
+    stage: str = "cloning"
+    bytes_received: int = 0
+    objects_received: int = 0
+    objects_total: int = 0
+    chunks_total: int = 0
+    chunks_indexed: int = 0
+    chunks_deduplicated: int = 0
+
+    def update_transfer(self, stats: Dict[str, int]) -> None:
+        for key, value in stats.items():
+            setattr(self, key, value)
+
+
 class RepositoryAnalyzer:
     """Runs the full repo → embeddings → RAG → LLM pipeline."""
 
@@ -33,8 +59,18 @@ class RepositoryAnalyzer:
         self.file_reader = FileReader()
         self.chunker = CodeChunker()
         self.embedder = Embedder()
+        # Shared by every job, so concurrent analyses are embedded in common batches
+        self.embedding_service = EmbeddingService(self.embedder)
         self.vector_store = VectorStore()
         self.llm_engine = LLMEngine()
+        self.jobs: Dict[str, JobStatus] = {}
+
+    def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        status = self.jobs.get(job_id)
+        return asdict(status) if status else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [asdict(status) for status in self.jobs.values()]
 
     async def analyze_repo(
         self,
@@ -44,66 +80,241 @@ class RepositoryAnalyzer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         job_id = uuid4().hex
-        collection_name = f"repo_{job_id}"
-        repo_path = None
+
+        checkout_free = settings.INGESTION_MODE == "git"
+        status = JobStatus(job_id=job_id, repo_url=repo_url, branch=branch)
+        self.jobs[job_id] = status
 
         try:
-            repo_path = await self.cloner.clone_repository(repo_url, job_id, branch)
+            repo_path = await self.cloner.clone_repository(
+                repo_url,
+                job_id,
+                branch,
+                no_checkout=checkout_free,
+                progress=status.update_transfer
+            )
             repo_git_info = await self.cloner.get_repository_info(repo_path)
 
-            files_data = await self.file_reader.read_repository(
-                repo_path, include_tests=include_tests
+            status.stage = "reading"
+            if checkout_free:
+                files_data = await self.file_reader.read_repository_from_git(
+                    repo_path, include_tests=include_tests
+                )
+            else:
+                files_data = await self.file_reader.read_repository(
+                    repo_path, include_tests=include_tests
+                )
+            return await self._analyze_files(
+                job_id=job_id,
+                status=status,
+                files_data=files_data,
+                repo_url=repo_url,
+                branch=branch,
+                metadata=metadata or {},
+                repo_git_info=repo_git_info,
             )
-            if not files_data.get("files"):
-                raise ValueError("No analyzable files found in repository")
 
-            chunks = self.chunker.chunk_repository(files_data["files"])
-            if not chunks:
-                raise ValueError("Unable to chunk repository content for embeddings")
+        finally:
+            self.jobs.pop(job_id, None)
+            # Unconditional: a cancelled clone leaves a partial checkout behind
+            # without ever returning repo_path.
+            await asyncio.shield(self.cloner.cleanup(job_id))
 
-            enriched_chunks = self.embedder.generate_embeddings(chunks)
+    async def analyze_archive(
+        self,
+        chunks: AsyncIterator[bytes],
+        archive_name: str,
+        include_tests: bool = False,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Analyze an uploaded .tar.gz/.zip stream without cloning or unpacking it."""
+        job_id = uuid4().hex
+        status = JobStatus(job_id=job_id, repo_url=archive_name, branch=None, stage="reading")
+        self.jobs[job_id] = status
 
+        try:
+            files_data = await self.file_reader.read_archive(
+                chunks, include_tests=include_tests, progress=status.update_transfer
+            )
+            return await self._analyze_files(
+                job_id=job_id,
+                status=status,
+                files_data=files_data,
+                repo_url=archive_name,
+                branch=None,
+                metadata=metadata or {},
+                repo_git_info={},
+            )
+        finally:
+            self.jobs.pop(job_id, None)
+
+    async def _analyze_files(
+        self,
+        job_id: str,
+        status: JobStatus,
+        files_data: Dict[str, Any],
+        repo_url: str,
+        branch: Optional[str],
+        metadata: Dict[str, Any],
+        repo_git_info: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        if not files_data.get("files"):
+            raise ValueError("No analyzable files found in repository")
+
+        collection_name = f"repo_{job_id}"
+
+        try:
+            status.stage = "indexing"
             self.vector_store.create_collection(collection_name, overwrite=True)
-            self.vector_store.insert_chunks(collection_name, enriched_chunks)
+            sample_chunks = await self._index_files(collection_name, files_data["files"], status)
+            if not status.chunks_total:
+                raise ValueError("Unable to chunk repository content for embeddings")
 
-            references = self._collect_references(collection_name, enriched_chunks)
+            status.stage = "analyzing"
+            references = await self._collect_references(collection_name, sample_chunks)
             analysis_payload = await self._generate_analysis_payload(
                 repo_url=repo_url,
                 branch=branch,
-                metadata=metadata or {},
+                metadata=metadata,
                 repo_git_info=repo_git_info,
                 files_data=files_data,
                 references=references,
             )
             analysis_payload = self._normalize_payload(analysis_payload, references)
 
-            result = {
+            return {
                 **analysis_payload,
                 "metadata": {
+                    "job_id": job_id,
                     "repo_url": repo_url,
                     "branch": branch,
                     "commit": repo_git_info.get("latest_commit", {}),
                     "total_files": files_data.get("total_files", 0),
                     "total_lines": files_data.get("total_lines", 0),
                     "languages": files_data.get("languages", {}),
+                    "chunks_indexed": status.chunks_indexed,
+                    "chunks_deduplicated": status.chunks_deduplicated,
+                    "skipped_files": self._summarize_skipped(files_data.get("skipped_files", [])),
                 },
                 "source_references": [asdict(ref) for ref in references],
             }
 
-            return result
-
         finally:
-            if repo_path:
-                await self.cloner.cleanup(job_id)
             try:
                 self.vector_store.delete_collection(collection_name)
             except Exception as exc:  # pragma: no cover - best effort cleanup
                 logger.debug("Unable to drop Qdrant collection %s: %s", collection_name, exc)
 
+    async def _index_files(
+        self,
+        collection_name: str,
+        files: Iterable[Dict[str, Any]],
+        status: JobStatus,
+    ) -> List[Chunk]:
+        """Chunk, embed and upsert as concurrent stages joined by bounded queues.
+
+        Files are chunked lazily, one embedding batch at a time, and each
+        embedded batch is upserted as soon as it is ready, so only a few
+        batches are ever held in memory. Duplicate files and chunks are
+        collapsed before embedding. Returns the first indexed batch as a
+        fallback source of references.
+        """
+        loop = asyncio.get_event_loop()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        first_batch: List[Chunk] = []
+        deduplicator = ContentDeduplicator()
+        upserted_alias_counts: Dict[str, int] = {}
+        started = time.perf_counter()
+
+        async def chunk_stage() -> None:
+            batches = self.chunker.iter_chunk_batches(
+                files, self.embedder.batch_size, deduplicator
+            )
+            while True:
+                batch = await loop.run_in_executor(None, next, batches, None)
+                if batch is None:
+                    break
+                status.chunks_total += len(batch)
+                await embed_queue.put(batch)
+            await embed_queue.put(None)
+
+        async def embed_stage() -> None:
+            while True:
+                batch = await embed_queue.get()
+                if batch is None:
+                    break
+                embeddings = await self.embedding_service.embed_chunks(batch)
+                await upsert_queue.put((batch, embeddings))
+            await upsert_queue.put(None)
+
+        async def upsert_stage() -> None:
+            while True:
+                item = await upsert_queue.get()
+                if item is None:
+                    break
+                batch, embeddings = item
+                for chunk in batch:
+                    upserted_alias_counts[chunk.point_id] = len(chunk.aliases)
+                await loop.run_in_executor(
+                    None, self.vector_store.insert_chunks, collection_name, batch, embeddings
+                )
+                if not first_batch:
+                    first_batch.extend(batch)
+                    logger.info(
+                        "First batch upserted into %s after %.2fs",
+                        collection_name,
+                        time.perf_counter() - started,
+                    )
+                status.chunks_indexed += len(batch)
+
+        stages = [asyncio.ensure_future(stage()) for stage in (chunk_stage, embed_stage, upsert_stage)]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # A failed stage would leave its neighbours blocked on a queue
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+
+        late_aliases = deduplicator.late_aliases(upserted_alias_counts)
+        if late_aliases:
+            await loop.run_in_executor(
+                None, self.vector_store.update_aliases, collection_name, late_aliases
+            )
+
+        status.chunks_deduplicated = deduplicator.chunks_deduplicated
+        CHUNKS_SEEN_TOTAL.inc(deduplicator.chunks_seen)
+        CHUNKS_DEDUPLICATED_TOTAL.inc(deduplicator.chunks_deduplicated)
+        if deduplicator.chunks_seen:
+            CHUNK_DEDUP_RATIO.observe(deduplicator.saved_fraction)
+
+        logger.info(
+            "Indexed %d chunks into %s in %.2fs (%d duplicates, %.0f%% saved)",
+            status.chunks_indexed,
+            collection_name,
+            time.perf_counter() - started,
+            deduplicator.chunks_deduplicated,
+            deduplicator.saved_fraction * 100,
+        )
+        return first_batch
+
+    @staticmethod
+    def _summarize_skipped(skipped: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Per-reason counts of files FileReader left out, with a few example paths."""
+        summary: Dict[str, Any] = {}
+        for skipped_file in skipped:
+            entry = summary.setdefault(skipped_file["reason"], {"count": 0, "examples": []})
+            entry["count"] += 1
+            if len(entry["examples"]) < MAX_SKIPPED_EXAMPLES:
+                entry["examples"].append(skipped_file["path"])
+        return summary
+
     async def _generate_analysis_payload(
         self,
         repo_url: str,
-        branch: str,
+        branch: Optional[str],
         metadata: Dict[str, Any],
         repo_git_info: Dict[str, Any],
         files_data: Dict[str, Any],
@@ -124,7 +335,7 @@ class RepositoryAnalyzer:
     def _build_context(
         self,
         repo_url: str,
-        branch: str,
+        branch: Optional[str],
         files_data: Dict[str, Any],
         references: List[SourceReference],
         repo_git_info: Dict[str, Any],
@@ -141,7 +352,7 @@ class RepositoryAnalyzer:
 
         return f"""
 Repository: {repo_url}
-Branch: {branch}
+Branch: {branch or "n/a"}
 Commit: {repo_git_info.get('latest_commit', {}).get('sha')}
 Total files: {files_data.get('total_files', 0)}
 Total lines: {files_data.get('total_lines', 0)}
@@ -151,8 +362,8 @@ Key references:
 {reference_block}
 """.strip()
 
-    def _collect_references(
-        self, collection_name: str, chunks: List[Dict[str, Any]]
+    async def _collect_references(
+        self, collection_name: str, chunks: List[Chunk]
     ) -> List[SourceReference]:
         queries = [
             "main entrypoints and application setup",
@@ -162,13 +373,14 @@ Key references:
         ]
 
         selected: Dict[str, Dict[str, Any]] = {}
+        # One request, so the queries share a batch instead of running one at a time
+        query_vectors = await self.embedding_service.embed_texts(queries)
 
-        for query in queries:
+        for query, query_vector in zip(queries, query_vectors):
             try:
-                hits = self.vector_store.search_by_text(
+                hits = self.vector_store.search(
                     collection_name=collection_name,
-                    query_text=query,
-                    embedder=self.embedder,
+                    query_vector=query_vector,
                     top_k=3,
                     score_threshold=0.35,
                 )
@@ -187,12 +399,8 @@ Key references:
 
         if not selected:
             for chunk in chunks[:5]:
-                key = (
-                    chunk.get("file_path"),
-                    chunk.get("start_line"),
-                    chunk.get("end_line"),
-                )
-                selected[key] = chunk
+                key = (chunk.file_path, chunk.start_line, chunk.end_line)
+                selected[key] = chunk.to_dict()
 
         references = []
         for idx, chunk in enumerate(selected.values(), start=1):
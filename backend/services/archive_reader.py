@@ -0,0 +1,177 @@
+import asyncio
+import io
+import logging
+import stat
+import tarfile
+import zipfile
+import zlib
+from pathlib import PurePosixPath
+from typing import AsyncIterator, Callable, Iterator, NamedTuple, Optional, Tuple
+
+from services.git_process import ProgressCallback
+from utils.helpers import format_file_size
+
+logger = logging.getLogger(__name__)
+
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+
+ARCHIVE_ERRORS = (tarfile.TarError, zipfile.BadZipFile, EOFError, zlib.error)
+
+
+class ArchiveMember(NamedTuple):
+    path: str
+    size: int
+
+
+class AsyncByteStream(io.RawIOBase):
+    """Blocking file object over an async byte iterator.
+
+    Meant to be read from a worker thread: every read that runs out of
+    buffered bytes pulls the next chunk on the event loop, so the upload is
+    only consumed as fast as the archive is parsed.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        loop: asyncio.AbstractEventLoop,
+        limit_bytes: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None
+    ):
+        super().__init__()
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = b""
+        self._eof = False
+        self._pending = None
+        self.limit_bytes = limit_bytes
+        self.progress = progress
+        self.bytes_received = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            if self._eof:
+                return 0
+            self._receive()
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        # Unblocks a worker thread waiting on the next chunk
+        if self._pending is not None:
+            self._pending.cancel()
+        super().close()
+
+    def _receive(self):
+        if self.closed:
+            raise ValueError("Archive stream was closed")
+
+        self._pending = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop)
+        try:
+            chunk = self._pending.result()
+        finally:
+            self._pending = None
+
+        if chunk is None:
+            self._eof = True
+            return
+
+        self.bytes_received += len(chunk)
+        if self.limit_bytes is not None and self.bytes_received > self.limit_bytes:
+            raise ValueError(
+                f"Archive size ({format_file_size(self.bytes_received)}) exceeds "
+                f"maximum allowed size ({format_file_size(self.limit_bytes)})"
+            )
+        if self.progress:
+            self.progress({"bytes_received": self.bytes_received})
+
+        self._buffer = chunk
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+
+class ArchiveReader:
+    """Walks the regular files of a .tar(.gz/.bz2/.xz) or .zip stream.
+
+    Tarballs are parsed strictly front to back, so members stream past without
+    the archive being buffered anywhere; zip keeps its index at the end and is
+    held in memory instead. Member contents are only read when the caller
+    invokes the returned reader, which must happen before advancing.
+    """
+
+    def __init__(self, fileobj: io.BufferedReader):
+        self.fileobj = fileobj
+
+    def iter_members(self) -> Iterator[Tuple[ArchiveMember, Callable[[], bytes]]]:
+        root = None
+
+        try:
+            for index, (name, is_dir, size, read) in enumerate(self._iter_entries()):
+                parts = [part for part in PurePosixPath(name).parts if part not in ("", ".")]
+                if not parts or name.startswith("/") or ".." in parts:
+                    continue
+
+                # GitHub/GitLab downloads and `git archive --prefix` wrap the
+                # tree in a single top-level directory that comes first.
+                if index == 0 and is_dir and len(parts) == 1:
+                    root = parts[0]
+                    continue
+                if root and parts[0] == root:
+                    parts = parts[1:]
+
+                if is_dir or not parts:
+                    continue
+
+                yield ArchiveMember(path="/".join(parts), size=size), _guarded(read)
+
+        except ARCHIVE_ERRORS as e:
+            raise ValueError(f"Unable to read archive: {e}") from e
+
+    def _iter_entries(self) -> Iterator[Tuple[str, bool, int, Callable[[], bytes]]]:
+        if self.fileobj.peek(4)[:4] in ZIP_SIGNATURES:
+            yield from self._iter_zip()
+        else:
+            yield from self._iter_tar()
+
+    def _iter_tar(self):
+        try:
+            archive = tarfile.open(fileobj=self.fileobj, mode="r|*")
+        except tarfile.ReadError as e:
+            raise ValueError("Upload is not a .tar, .tar.gz or .zip archive") from e
+
+        with archive:
+            for info in archive:
+                if info.isdir():
+                    yield info.name, True, 0, None
+                elif info.isfile():
+                    yield info.name, False, info.size, lambda info=info: archive.extractfile(info).read()
+
+    def _iter_zip(self):
+        logger.debug("Buffering zip upload in memory to read its central directory")
+        archive = zipfile.ZipFile(io.BytesIO(self.fileobj.read()))
+
+        with archive:
+            for info in archive.infolist():
+                if stat.S_ISLNK(info.external_attr >> 16):
+                    continue
+                yield info.filename, info.is_dir(), info.file_size, lambda info=info: archive.read(info)
+
+
+def _guarded(read: Callable[[], bytes]) -> Callable[[], bytes]:
+    def read_member() -> bytes:
+        try:
+            return read()
+        except ARCHIVE_ERRORS as e:
+            raise ValueError(f"Unable to read archive: {e}") from e
+
+    return read_member
@@ -0,0 +1,317 @@
+import bisect
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JS_LANGUAGES = frozenset(['JavaScript', 'TypeScript'])
+
+# Tokens that change lexer state. Plain code between them is skipped by the
+# regex engine, so the Python loop only runs once per interesting token.
+_COMMON_TOKENS = r'//|/\*|[{}()\[\];"\'/]'
+TOKEN_PATTERNS = {
+    # Template literals / Go raw strings
+    'JavaScript': re.compile(_COMMON_TOKENS + r'|`'),
+    'TypeScript': re.compile(_COMMON_TOKENS + r'|`'),
+    'Go': re.compile(_COMMON_TOKENS + r'|`'),
+    # Text blocks
+    'Java': re.compile(r'"""|' + _COMMON_TOKENS),
+    # Raw strings: R"delim(...)delim"
+    'C++': re.compile(r'(?<![\w])R"|' + _COMMON_TOKENS),
+    # Verbatim @"..." and raw """...""" strings
+    'C#': re.compile(r'\$?@\$?"|"""|' + _COMMON_TOKENS),
+}
+DEFAULT_TOKEN_PATTERN = re.compile(_COMMON_TOKENS)
+
+DOUBLE_QUOTED = re.compile(r'"(?:[^"\\\n]|\\.)*"?', re.DOTALL)
+SINGLE_QUOTED = re.compile(r"'(?:[^'\\\n]|\\.)*'?", re.DOTALL)
+VERBATIM_STRING = re.compile(r'\$?@\$?"(?:[^"]|"")*"?')
+RAW_STRING_OPENER = re.compile(r'R"([^()\\\s]{0,16})\(')
+REGEX_LITERAL = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*')
+TEMPLATE_TOKENS = re.compile(r'\\.|`|\$\{', re.DOTALL)
+
+BLANK_LINE = re.compile(r'\n[ \t]*\r?\n')
+NON_SPACE = re.compile(r'\S')
+CLASS_HEADER = re.compile(
+    r'\b(class|interface|enum|struct|record|namespace|trait|impl|object|module)\b'
+)
+
+# A "/" after one of these starts a regex literal rather than a division
+REGEX_PRECEDING_CHARS = frozenset('(,=:[!&|?{};+-*%<>~^')
+REGEX_PRECEDING_WORDS = frozenset([
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new',
+    'delete', 'void', 'throw', 'yield', 'await',
+])
+
+
+class _Group:
+    """One ``{...}`` pair and the declaration boundaries found directly inside it."""
+
+    __slots__ = ('open', 'close', 'in_parens', 'template', 'paren_depth', 'children', 'ends')
+
+    def __init__(self, open_pos: int, in_parens: bool = False, template: bool = False):
+        self.open = open_pos
+        self.close = None
+        self.in_parens = in_parens
+        self.template = template
+        self.paren_depth = 0
+        self.children: List['_Group'] = []
+        # (offset just past the boundary, group that closed it or None for ';')
+        self.ends: List[Tuple[int, Optional['_Group']]] = []
+
+
+class BraceBlockExtractor:
+    """Splits brace-language source into blocks at declaration boundaries.
+
+    One lexer pass tracks strings, character and template literals, regex
+    literals and comments, so braces inside them never shift a boundary. A
+    top-level declaration ends where its body's closing brace or a ``;``
+    brings the nesting back to zero outside parentheses. Declarations larger
+    than ``max_block_chars`` are split into their members the same way.
+    Blocks are whole source lines cut with a precomputed line-offset index.
+    """
+
+    def __init__(self, content: str, language: str, max_block_chars: int):
+        self.content = content
+        self.language = language
+        self.max_block_chars = max_block_chars
+        self.line_starts = [0] + [match.end() for match in re.finditer('\n', content)]
+
+    def extract(self) -> List[Dict]:
+        root = self._lex()
+        spans: List[List] = []
+        self._add_level(spans, root, 0, len(self.content), 'module', False)
+
+        return [
+            {
+                'type': block_type,
+                'content': self.content[self.line_starts[start - 1]:self._line_end(end)],
+                'start_line': start,
+                'end_line': end,
+            }
+            for block_type, start, end in spans
+        ]
+
+    def _lex(self) -> _Group:
+        content = self.content
+        length = len(content)
+        token_pattern = TOKEN_PATTERNS.get(self.language, DEFAULT_TOKEN_PATTERN)
+        is_js = self.language in JS_LANGUAGES
+
+        root = _Group(-1)
+        stack = [root]
+        pos = 0
+
+        while True:
+            match = token_pattern.search(content, pos)
+            if match is None:
+                break
+            token = match.group()
+            start = match.start()
+            pos = match.end()
+            group = stack[-1]
+
+            if token == '{':
+                child = _Group(start, in_parens=group.paren_depth > 0)
+                group.children.append(child)
+                stack.append(child)
+            elif token == '}':
+                if len(stack) == 1:
+                    continue
+                closed = stack.pop()
+                closed.close = start
+                if closed.template:
+                    pos, reopened = self._skip_template(pos)
+                    if reopened:
+                        stack.append(reopened)
+                elif not closed.in_parens:
+                    stack[-1].ends.append((start + 1, closed))
+            elif token in '([':
+                group.paren_depth += 1
+            elif token in ')]':
+                if group.paren_depth:
+                    group.paren_depth -= 1
+            elif token == ';':
+                if not group.paren_depth:
+                    group.ends.append((start + 1, None))
+            elif token == '//':
+                end = content.find('\n', pos)
+                pos = length if end < 0 else end
+            elif token == '/*':
+                end = content.find('*/', pos)
+                pos = length if end < 0 else end + 2
+            elif token == '/':
+                if is_js and self._regex_allowed(start):
+                    literal = REGEX_LITERAL.match(content, start)
+                    if literal:
+                        pos = literal.end()
+            elif token == '"':
+                pos = DOUBLE_QUOTED.match(content, start).end()
+            elif token == "'":
+                pos = SINGLE_QUOTED.match(content, start).end()
+            elif token == '"""':
+                end = content.find('"""', pos)
+                pos = length if end < 0 else end + 3
+            elif token == '`':
+                if is_js:
+                    pos, reopened = self._skip_template(pos)
+                    if reopened:
+                        stack.append(reopened)
+                else:
+                    end = content.find('`', pos)
+                    pos = length if end < 0 else end + 1
+            elif token.endswith('"') and '@' in token:
+                pos = VERBATIM_STRING.match(content, start).end()
+            elif token == 'R"':
+                opener = RAW_STRING_OPENER.match(content, start)
+                if opener:
+                    end = content.find(f'){opener.group(1)}"', opener.end())
+                    pos = length if end < 0 else end + len(opener.group(1)) + 2
+
+        # Unclosed groups run to the end of the file
+        for group in stack[1:]:
+            group.close = length
+            if not group.template and not group.in_parens:
+                stack[stack.index(group) - 1].ends.append((length, group))
+
+        return root
+
+    def _skip_template(self, pos: int) -> Tuple[int, Optional[_Group]]:
+        """Skip template literal text; a ``${`` returns a group that resumes it at its ``}``."""
+        while True:
+            match = TEMPLATE_TOKENS.search(self.content, pos)
+            if match is None:
+                return len(self.content), None
+            pos = match.end()
+            if match.group() == '`':
+                return pos, None
+            if match.group() == '${':
+                return pos, _Group(match.start() + 1, template=True)
+
+    def _regex_allowed(self, pos: int) -> bool:
+        content = self.content
+        i = pos - 1
+        while i >= 0 and content[i] in ' \t\r\n':
+            i -= 1
+        if i < 0:
+            return True
+
+        char = content[i]
+        if char in REGEX_PRECEDING_CHARS:
+            return True
+        if char.isalnum() or char in '_$':
+            word_start = i
+            while word_start > 0 and (content[word_start - 1].isalnum() or content[word_start - 1] in '_$'):
+                word_start -= 1
+            return content[word_start:i + 1] in REGEX_PRECEDING_WORDS
+        return False
+
+    def _items(self, group: _Group, lo: int, hi: int) -> Iterator[Tuple[int, int, Optional[_Group]]]:
+        """Declarations directly inside ``group`` as (start, end, body group or None)."""
+        previous = lo
+        ends = group.ends + [(hi, None)]
+        child_opens = None
+
+        for end, owner in ends:
+            if end > hi or end <= previous:
+                continue
+            match = NON_SPACE.search(self.content, previous, end)
+            previous = end
+            if match is None:
+                continue
+            start = match.start()
+
+            if owner is not None:
+                # Statements without ';' (imports in Go or ASI-style JS) end at a blank line
+                blank = None
+                for blank in BLANK_LINE.finditer(self.content, start, owner.open):
+                    pass
+                if blank is not None:
+                    yield start, blank.start() + 1, None
+                    start = NON_SPACE.search(self.content, blank.end(), end).start()
+            else:
+                if child_opens is None:
+                    child_opens = [child.open for child in group.children]
+                owner = self._largest_child(group, child_opens, start, end)
+
+            yield start, end, owner
+
+    @staticmethod
+    def _largest_child(group: _Group, child_opens: List[int], start: int, end: int) -> Optional[_Group]:
+        # Bodies passed as arguments: IIFEs, describe(...) and define(...) wrappers
+        largest = None
+        index = bisect.bisect_left(child_opens, start)
+        for child in group.children[index:]:
+            if child.open >= end:
+                break
+            if largest is None or child.close - child.open > largest.close - largest.open:
+                largest = child
+        return largest
+
+    def _add_level(
+        self,
+        spans: List[List],
+        group: _Group,
+        lo: int,
+        hi: int,
+        run_type: str,
+        in_class: bool,
+        run_start: Optional[int] = None,
+        run_end: Optional[int] = None
+    ):
+        for start, end, owner in self._items(group, lo, hi):
+            if owner is None:
+                if run_start is None:
+                    run_start = start
+                elif run_end is not None and end - run_start > self.max_block_chars:
+                    self._add_span(spans, run_type, run_start, run_end)
+                    run_start = start
+                run_end = end
+                continue
+
+            if run_end is not None:
+                self._add_span(spans, run_type, run_start, run_end)
+            run_start = run_end = None
+            self._add_definition(spans, start, end, owner, run_type, in_class)
+
+        if run_end is not None:
+            self._add_span(spans, run_type, run_start, run_end)
+
+    def _add_definition(
+        self,
+        spans: List[List],
+        start: int,
+        end: int,
+        owner: _Group,
+        run_type: str,
+        in_class: bool
+    ):
+        header = self.content[start:owner.open]
+        if CLASS_HEADER.search(header):
+            block_type = 'class'
+        elif '(' in header or '=>' in header:
+            block_type = 'method' if in_class else 'function'
+        else:
+            # Object literals, imports with braces, initializer blocks
+            block_type = run_type
+
+        if end - start <= self.max_block_chars:
+            self._add_span(spans, block_type, start, end)
+            return
+
+        # The header opens the first run of the body, which picks up fields and the like
+        self._add_level(
+            spans, owner, owner.open + 1, owner.close, block_type, block_type == 'class',
+            run_start=start, run_end=owner.open + 1
+        )
+
+    def _add_span(self, spans: List[List], block_type: str, start: int, end: int):
+        start_line = bisect.bisect_right(self.line_starts, start)
+        end_line = bisect.bisect_right(self.line_starts, end - 1)
+
+        # Declarations sharing a line ("} else {", "};") stay in one block
+        if spans and start_line <= spans[-1][2]:
+            spans[-1][2] = max(spans[-1][2], end_line)
+            return
+        spans.append([block_type, start_line, end_line])
+
+    def _line_end(self, number: int) -> int:
+        return self.line_starts[number] if number < len(self.line_starts) else len(self.content)
@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+
+@dataclass(slots=True, eq=False)
+class Chunk:
+    """One chunk of a file, kept compact for repositories with many thousands of chunks.
+
+    File-level fields (path, language, size, ...) are read through ``file``
+    rather than copied into every chunk. The dedup stage fills in the
+    optional fields in place; embeddings travel separately, as a float32
+    matrix whose rows line up with a list of chunks. ``to_dict`` produces the
+    flat shape used for Qdrant payloads and API responses.
+    """
+
+    file: Mapping = field(repr=False)
+    index: int
+    type: str
+    start_line: int
+    end_line: int
+    content: str
+    content_hash: Optional[str] = None
+    point_id: Optional[str] = None
+    aliases: Optional[List[Dict]] = None
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{self.file.get('path')}::chunk_{self.index}"
+
+    @property
+    def file_path(self) -> Optional[str]:
+        return self.file.get('path')
+
+    @property
+    def file_name(self) -> Optional[str]:
+        return self.file.get('name')
+
+    @property
+    def language(self) -> Optional[str]:
+        return self.file.get('language')
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            'file_size': self.file.get('size'),
+            'total_lines': self.file.get('lines'),
+            'file_type': self.file.get('type')
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'chunk_id': self.chunk_id,
+            'content': self.content,
+            'file_path': self.file_path,
+            'file_name': self.file_name,
+            'language': self.language,
+            'type': self.type,
+            'start_line': self.start_line,
+            'end_line': self.end_line,
+            'aliases': self.aliases or [],
+            'metadata': self.metadata
+        }
@@ -1,90 +1,286 @@
 import logging
-from typing import List, Dict
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import re
 from pathlib import Path
 
 from config import settings
+from services.brace_blocks import BraceBlockExtractor
+from services.chunk import Chunk
+from services.content_cache import ContentCache
+from services.content_dedup import ContentDeduplicator
+from services.python_blocks import PythonBlockExtractor
+from services.token_budget import TokenCounter
 
 logger = logging.getLogger(__name__)
 
+# Bump when chunk boundaries change so cached chunks are not reused
+CHUNKER_CACHE_VERSION = 4
+
+SEMANTIC_LANGUAGES = frozenset(['Python', 'JavaScript', 'TypeScript', 'Java', 'Go', 'C++', 'C#'])
+
+# Blocks and windows with less text than this are not worth a vector
+MIN_CHUNK_CHARS = 50
+
+# (index, type, start_line, end_line, content): a chunk without its file's fields
+ChunkPart = Tuple[int, str, int, int, str]
+
+# One pool for the whole process, so worker start-up is paid once rather than per job
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Set in each pool worker on first use
+_worker_chunker: Optional["CodeChunker"] = None
+
+
+def get_chunk_pool() -> ProcessPoolExecutor:
+    # Sized once from CHUNK_WORKERS; jobs share it, so none may resize or replace it
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = max(settings.CHUNK_WORKERS, 1)
+            # spawn: forking a process that already runs executor threads is unsafe
+            _pool = ProcessPoolExecutor(_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started chunking pool with {_pool_workers} workers")
+        return _pool
+
+
+def shutdown_chunk_pool() -> None:
+    global _pool
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _chunk_work_unit(files: List[Dict]) -> List[Optional[List[ChunkPart]]]:
+    global _worker_chunker
+    
+    if _worker_chunker is None:
+        _worker_chunker = CodeChunker(workers=1)
+    return [_worker_chunker._chunk_parts_safe(file_info) for file_info in files]
+
 
 class CodeChunker:
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None, token_counter: Optional[TokenCounter] = None):
         self.chunk_size = settings.CHUNK_SIZE
-        self.chunk_overlap = settings.CHUNK_OVERLAP
+        # Tokens of chunk text that fit in the embedding model next to the header
+        self.max_tokens = settings.EMBEDDING_MAX_TOKENS - settings.CHUNK_HEADER_TOKENS
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS
+        # More than one chunks in the shared pool, whose size CHUNK_WORKERS sets
+        self.workers = settings.CHUNK_WORKERS if workers is None else workers
+        self.work_unit_bytes = settings.CHUNK_WORK_UNIT_BYTES
+        self.cache = ContentCache() if settings.CONTENT_CACHE_ENABLED else None
+        self._token_counter = token_counter
+        
+        if self.overlap_tokens >= self.max_tokens:
+            raise ValueError(
+                "EMBEDDING_MAX_TOKENS must exceed CHUNK_HEADER_TOKENS + CHUNK_OVERLAP_TOKENS"
+            )
+    
+    @property
+    def token_counter(self) -> TokenCounter:
+        # Loaded on first use, so pool workers and cache hits don't pay for it
+        if self._token_counter is None:
+            self._token_counter = TokenCounter.for_model(settings.EMBEDDING_MODEL_NAME)
+        return self._token_counter
     
-    def chunk_repository(self, files_data: List[Dict]) -> List[Dict]:
+    def chunk_repository(self, files_data: List[Dict]) -> List[Chunk]:
         logger.info(f"Starting chunking process for {len(files_data)} files")
         
-        all_chunks = []
-        
-        for file_info in files_data:
-            try:
-                chunks = self._chunk_file(file_info)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.error(f"Error chunking file {file_info.get('path')}: {e}")
-                continue
+        all_chunks = list(self.iter_chunks(files_data))
         
         logger.info(f"Generated {len(all_chunks)} chunks from {len(files_data)} files")
         
         return all_chunks
     
-    def _chunk_file(self, file_info: Dict) -> List[Dict]:
-        content = file_info.get('content', '')
-        file_path = file_info.get('path', '')
-        language = file_info.get('language', '')
+    def iter_chunks(self, files_data: Iterable[Dict]) -> Iterator[Chunk]:
+        if self.workers > 1:
+            yield from self._iter_chunks_parallel(files_data)
+            return
         
+        for file_info in files_data:
+            parts = self._cached_parts(file_info)
+            if parts is None:
+                parts = self._chunk_parts_safe(file_info)
+                self._store_parts(file_info, parts)
+            yield from self._build_chunks(file_info, parts)
+    
+    def _iter_chunks_parallel(self, files_data: Iterable[Dict]) -> Iterator[Chunk]:
+        """Chunk work units in the shared process pool, yielding chunks in file order.
+        
+        Only a couple of units per worker are in flight, so files are still
+        pulled lazily and the output is identical to chunking in-process.
+        Cache lookups and writes stay in this process; workers only see misses.
+        """
+        pool = get_chunk_pool()
+        pending = deque()
+        max_pending = _pool_workers * 2
+        
+        try:
+            for unit in self._work_units(files_data):
+                cached = [self._cached_parts(file_info) for file_info in unit]
+                misses = [file_info for file_info, parts in zip(unit, cached) if parts is None]
+                future = pool.submit(_chunk_work_unit, misses) if misses else None
+                pending.append((unit, cached, future))
+                if len(pending) >= max_pending:
+                    yield from self._collect_unit(*pending.popleft())
+            
+            while pending:
+                yield from self._collect_unit(*pending.popleft())
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; the next job gets a fresh one
+            shutdown_chunk_pool()
+            raise
+        finally:
+            for _, _, future in pending:
+                if future:
+                    future.cancel()
+    
+    def _collect_unit(self, unit: List[Dict], cached: List[Optional[List]], future) -> Iterator[Chunk]:
+        computed = iter(future.result() if future else ())
+        for file_info, parts in zip(unit, cached):
+            if parts is None:
+                parts = next(computed)
+                self._store_parts(file_info, parts)
+            yield from self._build_chunks(file_info, parts)
+    
+    def _work_units(self, files_data: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """Group consecutive files into units of roughly ``work_unit_bytes``."""
+        unit = []
+        unit_bytes = 0
+        
+        for file_info in files_data:
+            unit.append(file_info)
+            unit_bytes += file_info.get('size') or 0
+            if unit_bytes >= self.work_unit_bytes:
+                yield unit
+                unit = []
+                unit_bytes = 0
+        
+        if unit:
+            yield unit
+    
+    def _chunk_parts_safe(self, file_info: Dict) -> Optional[List[ChunkPart]]:
+        try:
+            return self._chunk_parts(file_info.get('content', ''), file_info.get('language', ''))
+        except Exception as e:
+            logger.error(f"Error chunking file {file_info.get('path')}: {e}")
+            return None
+    
+    def _cache_key(self, file_info: Dict) -> Optional[str]:
+        content_hash = file_info.get('content_hash')
+        if not self.cache or not content_hash:
+            return None
+        # Language picks the chunking strategy and the model's tokenizer sets
+        # the sub-chunk boundaries, so both are part of the key. The model
+        # name stands in for the tokenizer, which cache hits never load.
+        return (
+            f"{CHUNKER_CACHE_VERSION}:{self.chunk_size}:{self.max_tokens}:{self.overlap_tokens}:"
+            f"{settings.EMBEDDING_MODEL_NAME}:{file_info.get('language', '')}:{content_hash}"
+        )
+    
+    def _cached_parts(self, file_info: Dict) -> Optional[List[ChunkPart]]:
+        key = self._cache_key(file_info)
+        return self.cache.get("chunks", key) if key else None
+    
+    def _store_parts(self, file_info: Dict, parts: Optional[List[ChunkPart]]) -> None:
+        # Failures are not cached, so a fixed chunker gets another try
+        key = self._cache_key(file_info)
+        if key and parts is not None:
+            self.cache.set("chunks", key, parts)
+    
+    def iter_chunk_batches(
+        self,
+        files_data: Iterable[Dict],
+        batch_size: int,
+        deduplicator: Optional[ContentDeduplicator] = None
+    ) -> Iterator[List[Chunk]]:
+        """Chunk files lazily, yielding lists of ``batch_size`` chunks (the last may be short)."""
+        if deduplicator:
+            chunks = deduplicator.unique_chunks(
+                self.iter_chunks(deduplicator.unique_files(files_data))
+            )
+        else:
+            chunks = self.iter_chunks(files_data)
+        
+        batch = []
+        
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        
+        if batch:
+            yield batch
+    
+    def _chunk_file(self, file_info: Dict) -> List[Chunk]:
+        parts = self._chunk_parts(file_info.get('content', ''), file_info.get('language', ''))
+        return self._build_chunks(file_info, parts)
+    
+    def _chunk_parts(self, content: str, language: str) -> List[ChunkPart]:
+        """Chunk boundaries and text, which depend only on the content and language."""
         if not content:
             return []
         
-        if language in ['Python', 'JavaScript', 'TypeScript', 'Java', 'Go', 'C++', 'C#']:
-            chunks = self._semantic_chunk(content, file_info)
+        if language in SEMANTIC_LANGUAGES:
+            parts = self._semantic_chunk(content, language)
         else:
-            chunks = self._sliding_window_chunk(content, file_info)
+            parts = self._sliding_window_chunk(content)
         
-        return chunks
+        # Split blocks contribute several parts, so number them afterwards
+        return [(i,) + part[1:] for i, part in enumerate(parts)]
+    
+    def _build_chunks(self, file_info: Dict, parts: Optional[List[ChunkPart]]) -> List[Chunk]:
+        return [Chunk(file_info, *part) for part in parts or ()]
     
-    def _semantic_chunk(self, content: str, file_info: Dict) -> List[Dict]:
-        chunks = []
-        language = file_info.get('language', '')
+    def _semantic_chunk(self, content: str, language: str) -> List[ChunkPart]:
+        parts = []
         
         if language == 'Python':
             blocks = self._extract_python_blocks(content)
-        elif language in ['JavaScript', 'TypeScript']:
-            blocks = self._extract_js_blocks(content)
-        elif language == 'Java':
-            blocks = self._extract_java_blocks(content)
         else:
-            blocks = self._extract_generic_blocks(content)
+            blocks = self._extract_brace_blocks(content, language)
         
-        for i, block in enumerate(blocks):
-            if len(block['content']) < 50:
+        for block in blocks:
+            if len(block['content']) < MIN_CHUNK_CHARS:
                 continue
             
-            chunk = {
-                'chunk_id': f"{file_info.get('path')}::chunk_{i}",
-                'content': block['content'],
-                'file_path': file_info.get('path'),
-                'file_name': file_info.get('name'),
-                'language': file_info.get('language'),
-                'type': block['type'],
-                'start_line': block['start_line'],
-                'end_line': block['end_line'],
-                'metadata': {
-                    'file_size': file_info.get('size'),
-                    'total_lines': file_info.get('lines'),
-                    'file_type': file_info.get('type')
-                }
-            }
-            chunks.append(chunk)
+            if self.token_counter.count(block['content']) <= self.max_tokens:
+                parts.append((0, block['type'], block['start_line'], block['end_line'], block['content']))
+            else:
+                parts.extend(self._token_windows(block['content'], block['start_line'], block['type']))
         
-        if not chunks and len(content) > 100:
-            chunks = self._sliding_window_chunk(content, file_info)
+        if not parts and len(content) > 100:
+            parts = self._sliding_window_chunk(content)
         
-        return chunks
+        return parts
     
     def _extract_python_blocks(self, content: str) -> List[Dict]:
+        blocks = PythonBlockExtractor(content, self.chunk_size).extract()
+        if blocks is None:
+            # Not valid Python 3 (e.g. Python 2 or a template): line-based fallback
+            return self._extract_python_blocks_regex(content)
+        
+        if not blocks:
+            blocks = [{
+                'type': 'file',
+                'content': content,
+                'start_line': 1,
+                'end_line': content.count('\n') + 1
+            }]
+        
+        return blocks
+    
+    def _extract_python_blocks_regex(self, content: str) -> List[Dict]:
         blocks = []
         lines = content.split('\n')
         
@@ -147,171 +343,72 @@ class CodeChunker:
         
         return blocks
     
-    def _extract_js_blocks(self, content: str) -> List[Dict]:
-        blocks = []
-        lines = content.split('\n')
-        
-        function_pattern = re.compile(r'(function\s+\w+|const\s+\w+\s*=\s*\(|class\s+\w+)')
-        
-        current_block = None
-        brace_count = 0
-        in_block = False
-        
-        for i, line in enumerate(lines):
-            if function_pattern.search(line):
-                if current_block and brace_count == 0:
-                    blocks.append(current_block)
-                current_block = {
-                    'type': 'function',
-                    'content': line + '\n',
-                    'start_line': i + 1,
-                    'end_line': i + 1
-                }
-                brace_count = line.count('{') - line.count('}')
-                in_block = True
-            
-            elif in_block and current_block:
-                current_block['content'] += line + '\n'
-                current_block['end_line'] = i + 1
-                brace_count += line.count('{') - line.count('}')
-                
-                if brace_count == 0:
-                    blocks.append(current_block)
-                    current_block = None
-                    in_block = False
-        
-        if current_block:
-            blocks.append(current_block)
+    def _extract_brace_blocks(self, content: str, language: str) -> List[Dict]:
+        blocks = BraceBlockExtractor(content, language, self.chunk_size).extract()
         
         if not blocks:
             blocks = [{
                 'type': 'file',
                 'content': content,
                 'start_line': 1,
-                'end_line': len(lines)
+                'end_line': content.count('\n') + 1
             }]
         
         return blocks
     
-    def _extract_java_blocks(self, content: str) -> List[Dict]:
-        blocks = []
-        lines = content.split('\n')
-        
-        class_pattern = re.compile(r'(public|private|protected)?\s*(class|interface|enum)\s+\w+')
-        method_pattern = re.compile(r'(public|private|protected)?\s+\w+\s+\w+\s*\(')
-        
-        current_block = None
-        brace_count = 0
-        
-        for i, line in enumerate(lines):
-            if class_pattern.search(line):
-                if current_block and brace_count == 0:
-                    blocks.append(current_block)
-                current_block = {
-                    'type': 'class',
-                    'content': line + '\n',
-                    'start_line': i + 1,
-                    'end_line': i + 1
-                }
-                brace_count = line.count('{') - line.count('}')
-            
-            elif method_pattern.search(line) and current_block:
-                current_block['content'] += line + '\n'
-                current_block['end_line'] = i + 1
-                brace_count += line.count('{') - line.count('}')
-            
-            elif current_block:
-                current_block['content'] += line + '\n'
-                current_block['end_line'] = i + 1
-                brace_count += line.count('{') - line.count('}')
-                
-                if brace_count == 0:
-                    blocks.append(current_block)
-                    current_block = None
-        
-        if current_block:
-            blocks.append(current_block)
-        
-        if not blocks:
-            blocks = [{
-                'type': 'file',
-                'content': content,
-                'start_line': 1,
-                'end_line': len(lines)
-            }]
-        
-        return blocks
+    def _sliding_window_chunk(self, content: str) -> List[ChunkPart]:
+        return self._token_windows(content, 1, 'sliding_window')
     
-    def _extract_generic_blocks(self, content: str) -> List[Dict]:
-        lines = content.split('\n')
-        blocks = []
-        
-        current_block = {
-            'type': 'section',
-            'content': '',
-            'start_line': 1,
-            'end_line': 1
-        }
+    def _token_windows(self, content: str, first_line: int, chunk_type: str) -> List[ChunkPart]:
+        """Split text into runs of whole lines of at most ``max_tokens`` tokens.
         
-        for i, line in enumerate(lines):
-            current_block['content'] += line + '\n'
-            current_block['end_line'] = i + 1
-            
-            if len(current_block['content']) >= self.chunk_size:
-                blocks.append(current_block)
-                overlap_lines = min(10, len(current_block['content'].split('\n')) // 4)
-                overlap_content = '\n'.join(current_block['content'].split('\n')[-overlap_lines:])
-                current_block = {
-                    'type': 'section',
-                    'content': overlap_content + '\n',
-                    'start_line': i + 1 - overlap_lines,
-                    'end_line': i + 1
-                }
-        
-        if current_block['content'].strip():
-            blocks.append(current_block)
-        
-        return blocks
-    
-    def _sliding_window_chunk(self, content: str, file_info: Dict) -> List[Dict]:
-        chunks = []
+        Each window after the first repeats up to ``overlap_tokens`` tokens of
+        trailing lines from the one before. A single line over the budget is
+        cut at token boundaries instead.
+        """
         lines = content.split('\n')
-        
-        window_size = max(20, self.chunk_size // 50)
-        overlap = max(5, self.chunk_overlap // 50)
-        
-        for i in range(0, len(lines), window_size - overlap):
-            window_lines = lines[i:i + window_size]
-            chunk_content = '\n'.join(window_lines)
+        lines = [line + '\n' for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+        counts = self.token_counter.count_batch(lines)
+        parts = []
+        
+        start = 0
+        while start < len(lines):
+            end = start
+            tokens = 0
+            while end < len(lines) and tokens + counts[end] <= self.max_tokens:
+                tokens += counts[end]
+                end += 1
             
-            if len(chunk_content.strip()) < 50:
+            if end == start:
+                line = lines[start]
+                cuts = [0] + self.token_counter.split_offsets(line, self.max_tokens) + [len(line)]
+                for cut_start, cut_end in zip(cuts, cuts[1:]):
+                    line_number = first_line + start
+                    parts.append((0, chunk_type, line_number, line_number, line[cut_start:cut_end]))
+                start += 1
                 continue
             
-            chunk = {
-                'chunk_id': f"{file_info.get('path')}::chunk_{i // (window_size - overlap)}",
-                'content': chunk_content,
-                'file_path': file_info.get('path'),
-                'file_name': file_info.get('name'),
-                'language': file_info.get('language'),
-                'type': 'sliding_window',
-                'start_line': i + 1,
-                'end_line': min(i + window_size, len(lines)),
-                'metadata': {
-                    'file_size': file_info.get('size'),
-                    'total_lines': file_info.get('lines'),
-                    'file_type': file_info.get('type')
-                }
-            }
-            chunks.append(chunk)
-        
-        return chunks
+            window = ''.join(lines[start:end])
+            if len(window.strip()) >= MIN_CHUNK_CHARS:
+                parts.append((0, chunk_type, first_line + start, first_line + end - 1, window))
+            if end == len(lines):
+                break
+            
+            next_start = end
+            overlap = 0
+            while next_start - 1 > start and overlap + counts[next_start - 1] <= self.overlap_tokens:
+                next_start -= 1
+                overlap += counts[next_start]
+            start = next_start
+        
+        return parts
     
-    def get_chunk_statistics(self, chunks: List[Dict]) -> Dict:
+    def get_chunk_statistics(self, chunks: List[Chunk]) -> Dict:
         if not chunks:
             return {}
         
         total_chunks = len(chunks)
-        chunk_sizes = [len(chunk['content']) for chunk in chunks]
+        chunk_sizes = [len(chunk.content) for chunk in chunks]
         
         return {
             'total_chunks': total_chunks,
@@ -322,16 +419,16 @@ class CodeChunker:
             'chunks_by_language': self._count_by_language(chunks)
         }
     
-    def _count_by_type(self, chunks: List[Dict]) -> Dict:
+    def _count_by_type(self, chunks: List[Chunk]) -> Dict:
         type_counts = {}
         for chunk in chunks:
-            chunk_type = chunk.get('type', 'unknown')
+            chunk_type = chunk.type or 'unknown'
             type_counts[chunk_type] = type_counts.get(chunk_type, 0) + 1
         return type_counts
     
-    def _count_by_language(self, chunks: List[Dict]) -> Dict:
+    def _count_by_language(self, chunks: List[Chunk]) -> Dict:
         lang_counts = {}
         for chunk in chunks:
-            language = chunk.get('language', 'unknown')
+            language = chunk.language or 'unknown'
             lang_counts[language] = lang_counts.get(language, 0) + 1
         return lang_counts
\ No newline at end of file
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from utils.helpers import format_file_size
+from utils.metrics import (
+    CONTENT_CACHE_EVICTIONS_TOTAL,
+    CONTENT_CACHE_REQUESTS_TOTAL,
+    CONTENT_CACHE_SIZE_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Entries are only re-stamped for LRU once they are this old, so hot
+# entries don't cost a write on every read
+TOUCH_INTERVAL_SECONDS = 3600
+# Writes between checks of the total size against the budget
+EVICT_CHECK_INTERVAL = 256
+# Eviction trims the cache to this fraction of its budget
+EVICT_TARGET_RATIO = 0.9
+# Keys per SELECT, below SQLite's bound-parameter limit
+MAX_QUERY_KEYS = 500
+
+
+class ContentCache:
+    """Content-addressed cache of per-blob reader and chunker output, shared across jobs.
+
+    Values are JSON, zlib-compressed into one SQLite table and keyed by
+    ``(kind, key)``; callers fold whatever affects the value (content hash,
+    code version, settings) into the key. The least recently used entries are
+    evicted once the table outgrows ``CONTENT_CACHE_MAX_MB``. The connection is
+    opened on first use, so instances are cheap to create in processes that
+    never touch the cache.
+
+    Subclasses can store another kind of value in their own database and
+    budget by overriding the file name, metrics and ``_encode``/``_decode``.
+    """
+
+    DB_FILE = "content-cache.sqlite3"
+    REQUESTS_TOTAL = CONTENT_CACHE_REQUESTS_TOTAL
+    EVICTIONS_TOTAL = CONTENT_CACHE_EVICTIONS_TOTAL
+    SIZE_BYTES = CONTENT_CACHE_SIZE_BYTES
+
+    def __init__(self, max_size_mb: Optional[int] = None):
+        self.cache_dir = Path(settings.CONTENT_CACHE_DIR).resolve()
+        if max_size_mb is None:
+            max_size_mb = settings.CONTENT_CACHE_MAX_MB
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        return self.get_many(kind, [key]).get(key)
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values found for ``keys``, in one query; missing keys are left out."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                for start in range(0, len(keys), MAX_QUERY_KEYS):
+                    batch = keys[start:start + MAX_QUERY_KEYS]
+                    rows = conn.execute(
+                        f"SELECT key, value, last_used FROM entries WHERE kind = ? "
+                        f"AND key IN ({', '.join('?' * len(batch))})",
+                        (kind, *batch)
+                    ).fetchall()
+                    stale = [(now, kind, key) for key, _, last_used in rows
+                             if now - last_used > TOUCH_INTERVAL_SECONDS]
+                    if stale:
+                        conn.executemany(
+                            "UPDATE entries SET last_used = ? WHERE kind = ? AND key = ?", stale
+                        )
+                        conn.commit()
+                    for key, value, _ in rows:
+                        found[key] = value
+            found = {key: self._decode(value) for key, value in found.items()}
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"Content cache read failed for {kind}: {e}")
+            found = {}
+
+        hits = len(found)
+        if hits:
+            self.REQUESTS_TOTAL.labels(kind=kind, result="hit").inc(hits)
+        if len(keys) - hits:
+            self.REQUESTS_TOTAL.labels(kind=kind, result="miss").inc(len(keys) - hits)
+        return found
+
+    def set(self, kind: str, key: str, value: Any) -> None:
+        self.set_many(kind, [(key, value)])
+
+    def set_many(self, kind: str, items: List[Tuple[str, Any]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items:
+            data = self._encode(value)
+            rows.append((kind, key, data, len(data), now))
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (kind, key, value, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+                previous = self._writes
+                self._writes += len(rows)
+                if self._writes // EVICT_CHECK_INTERVAL != previous // EVICT_CHECK_INTERVAL:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Content cache write failed for {kind}: {e}")
+
+    def evict(self) -> None:
+        try:
+            with self._lock:
+                self._evict(self._connect())
+        except sqlite3.Error as e:
+            logger.warning(f"Content cache eviction failed: {e}")
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._total_size(self._connect())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross a fork; reconnect in the child
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.cache_dir / self.DB_FILE, timeout=30, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (kind, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        conn.commit()
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self._evict(conn)
+        return conn
+
+    @staticmethod
+    def _total_size(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = self._total_size(conn)
+        if total > self.max_size_bytes:
+            target = int(self.max_size_bytes * EVICT_TARGET_RATIO)
+            evicted = 0
+            rows = conn.execute(
+                "SELECT kind, key, size FROM entries ORDER BY last_used"
+            ).fetchall()
+            for kind, key, size in rows:
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                total -= size
+                evicted += 1
+            conn.commit()
+            self.EVICTIONS_TOTAL.inc(evicted)
+            logger.info(
+                f"Evicted {evicted} entries from {self.DB_FILE}, "
+                f"{format_file_size(total)} remaining"
+            )
+        self.SIZE_BYTES.set(total)
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        return json.loads(zlib.decompress(data))
@@ -0,0 +1,103 @@
+import logging
+import uuid
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from services.chunk import Chunk
+from utils.helpers import hash_content
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_chunk_text(text: str) -> str:
+    # Trailing whitespace and surrounding blank lines never change meaning
+    return "\n".join(line.rstrip() for line in text.splitlines()).strip("\n")
+
+
+class ContentDeduplicator:
+    """Collapses byte-identical files and identical chunk text onto one embedding.
+
+    Files sharing a ``content_hash`` are chunked once; every chunk of the
+    first copy lists the other paths in its ``aliases``. Chunks whose
+    normalized text was already emitted are dropped and recorded as aliases of
+    the first occurrence, whose ``point_id`` is derived from that text.
+
+    Chunks stream into the vector store as they are produced, so an alias can
+    turn up after its canonical chunk was upserted; ``late_aliases`` reports
+    the points whose payload needs refreshing.
+    """
+
+    def __init__(self):
+        self._file_aliases: Dict[str, List[str]] = {}
+        self._canonical: Dict[str, Tuple[str, List[Dict]]] = {}
+        self.chunks_seen = 0
+        self.chunks_deduplicated = 0
+
+    @property
+    def saved_fraction(self) -> float:
+        return self.chunks_deduplicated / self.chunks_seen if self.chunks_seen else 0.0
+
+    def unique_files(self, files_data: Iterable[Mapping]) -> Iterator[Mapping]:
+        files_data = list(files_data)
+        primaries: Dict[str, str] = {}
+
+        for file_info in files_data:
+            content_hash = file_info.get("content_hash")
+            if not content_hash:
+                continue
+            primary = primaries.setdefault(content_hash, file_info["path"])
+            if primary != file_info["path"]:
+                self._file_aliases.setdefault(primary, []).append(file_info["path"])
+
+        duplicates = {path for paths in self._file_aliases.values() for path in paths}
+        if duplicates:
+            logger.info(f"Skipping {len(duplicates)} byte-identical file copies")
+
+        for file_info in files_data:
+            if file_info["path"] not in duplicates:
+                yield file_info
+
+    def unique_chunks(self, chunks: Iterable[Chunk]) -> Iterator[Chunk]:
+        for chunk in chunks:
+            locations = [
+                self._location(chunk, path)
+                for path in self._file_aliases.get(chunk.file_path, ())
+            ]
+            self.chunks_seen += 1 + len(locations)
+            self.chunks_deduplicated += len(locations)
+
+            chunk_hash = hash_content(normalize_chunk_text(chunk.content).encode("utf-8"))
+            canonical = self._canonical.get(chunk_hash)
+
+            if canonical is not None:
+                _, aliases = canonical
+                aliases.append(self._location(chunk, chunk.file_path))
+                aliases.extend(locations)
+                self.chunks_deduplicated += 1
+                continue
+
+            # The list stays shared with the chunk until it is upserted, so
+            # aliases found in the meantime still make it into the payload
+            point_id = str(uuid.UUID(hex=chunk_hash))
+            chunk.content_hash = chunk_hash
+            chunk.point_id = point_id
+            chunk.aliases = locations
+            self._canonical[chunk_hash] = (point_id, locations)
+
+            yield chunk
+
+    def late_aliases(self, upserted_alias_counts: Dict[str, int]) -> Dict[str, List[Dict]]:
+        """Aliases of upserted points that grew after the point was written."""
+        stale = {}
+        for point_id, aliases in self._canonical.values():
+            count = upserted_alias_counts.get(point_id)
+            if count is not None and len(aliases) > count:
+                stale[point_id] = list(aliases)
+        return stale
+
+    @staticmethod
+    def _location(chunk: Chunk, file_path: str) -> Dict:
+        return {
+            "file_path": file_path,
+            "start_line": chunk.start_line,
+            "end_line": chunk.end_line,
+        }
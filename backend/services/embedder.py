@@ -1,102 +1,179 @@
 import logging
-from typing import List, Dict
+import time
+from typing import Dict, Iterator, List
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import torch
 
 from config import settings
+from services import onnx_encoder
+from services.chunk import Chunk
+from services.embedding_cache import EmbeddingCache
+from services.token_budget import TokenCounter
 
 logger = logging.getLogger(__name__)
 
 
+def length_sorted_batches(lengths: List[int], batch_tokens: int) -> Iterator[List[int]]:
+    """Indices sorted by length, split into batches of at most ``batch_tokens`` padded tokens."""
+    batch = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so this text sets the batch's padded length
+        if batch and (len(batch) + 1) * lengths[index] > batch_tokens:
+            yield batch
+            batch = []
+        batch.append(index)
+    if batch:
+        yield batch
+
+
 class Embedder:
     def __init__(self):
         self.model_name = settings.EMBEDDING_MODEL_NAME
         self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.batch_tokens = settings.EMBEDDING_BATCH_TOKENS
         self.dimension = settings.EMBEDDING_DIMENSION
+        self.max_tokens = settings.EMBEDDING_MAX_TOKENS
+        self.backend = settings.EMBEDDING_BACKEND
+        if self.backend not in ('torch', 'onnx'):
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {self.backend!r}; use 'torch' or 'onnx'")
+        self.device = 'cpu'
+        self.cache = EmbeddingCache() if settings.EMBEDDING_CACHE_ENABLED else None
         self.model = None
         self._load_model()
+        # Everything besides the text that changes the vector
+        self.cache_kind = f"{self.model_name}:{self.dimension}:{self.max_tokens}:{self.backend}"
     
     def _load_model(self):
         try:
-            logger.info(f"Loading embedding model: {self.model_name}")
+            logger.info(f"Loading embedding model: {self.model_name} ({self.backend} backend)")
+            started = time.perf_counter()
             
-            device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            logger.info(f"Using device: {device}")
+            if self.backend.startswith('onnx') and onnx_encoder.ort is None:
+                logger.warning("onnxruntime is not installed, using the torch embedding backend")
+                self.backend = 'torch'
             
-            self.model = SentenceTransformer(self.model_name, device=device)
+            if self.backend.startswith('onnx'):
+                quantize = settings.EMBEDDING_ONNX_QUANTIZE
+                self.backend = 'onnx-int8' if quantize else 'onnx'
+                self.model = onnx_encoder.OnnxEncoder(
+                    self.model_name, self.max_tokens, settings.EMBEDDING_ONNX_DIR, quantize
+                )
+            else:
+                # Imported here so the ONNX backend never pays for torch
+                import torch
+                from sentence_transformers import SentenceTransformer
+                
+                self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                logger.info(f"Using device: {self.device}")
+                self.model = SentenceTransformer(self.model_name, device=self.device)
+                # The chunker sizes chunks against the same limit
+                self.model.max_seq_length = self.max_tokens
             
-            logger.info(f"Model loaded successfully. Embedding dimension: {self.dimension}")
+            logger.info(
+                f"Model loaded successfully in {time.perf_counter() - started:.2f}s. "
+                f"Embedding dimension: {self.dimension}"
+            )
         
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
-    def generate_embeddings(self, chunks: List[Dict]) -> List[Dict]:
-        logger.info(f"Generating embeddings for {len(chunks)} chunks")
+    def generate_embeddings(self, chunks: List[Chunk]) -> np.ndarray:
+        """A C-contiguous float32 matrix with one row per chunk, in chunk order."""
+        logger.debug(f"Generating embeddings for {len(chunks)} chunks")
+        return self.embed_texts([self._prepare_text(chunk) for chunk in chunks])
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Vectors for already prepared texts, served from the cache where possible."""
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        missing = list(range(len(texts)))
+        
+        keys = None
+        if self.cache and texts:
+            keys = [EmbeddingCache.key(text) for text in texts]
+            cached = self.cache.get_many(self.cache_kind, keys)
+            missing = []
+            for index, key in enumerate(keys):
+                vector = cached.get(key)
+                if vector is None:
+                    missing.append(index)
+                else:
+                    embeddings[index] = vector
+        
+        # Only cache misses go to the model
+        if missing:
+            computed = self._encode_texts([texts[index] for index in missing])
+            embeddings[missing] = computed
+            
+            if self.cache:
+                # Zero vectors from failed batches are not cached
+                self.cache.set_many(self.cache_kind, [
+                    (keys[index], vector)
+                    for index, vector in zip(missing, computed)
+                    if vector.any()
+                ])
+        
+        logger.debug(
+            f"Embedded {len(texts)} texts ({len(texts) - len(missing)} from cache)"
+        )
         
-        if not chunks:
-            return []
+        return embeddings
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in forward passes of similar length, returned in input order.
         
-        texts = [self._prepare_text(chunk) for chunk in chunks]
+        A batch is padded to its longest text, so sorting by token length and
+        capping padded tokens rather than texts per pass keeps short snippets
+        from paying for the longest function in the call. Rows of failed
+        passes are left as zeros.
+        """
+        lengths = self._token_lengths(texts)
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        done = 0
         
-        embeddings = []
-        for i in range(0, len(texts), self.batch_size):
-            batch_texts = texts[i:i + self.batch_size]
+        for batch in length_sorted_batches(lengths, self.batch_tokens):
+            batch_texts = [texts[index] for index in batch]
             
             try:
-                batch_embeddings = self.model.encode(
+                embeddings[batch] = self.model.encode(
                     batch_texts,
-                    batch_size=self.batch_size,
+                    batch_size=len(batch_texts),
                     show_progress_bar=False,
                     convert_to_numpy=True,
                     normalize_embeddings=True
                 )
-                embeddings.extend(batch_embeddings)
-                
-                if (i + self.batch_size) % 100 == 0:
-                    logger.info(f"Processed {i + self.batch_size}/{len(texts)} chunks")
-            
             except Exception as e:
-                logger.error(f"Error generating embeddings for batch {i}: {e}")
-                batch_embeddings = [np.zeros(self.dimension) for _ in batch_texts]
-                embeddings.extend(batch_embeddings)
-        
-        enriched_chunks = []
-        for chunk, embedding in zip(chunks, embeddings):
-            enriched_chunk = chunk.copy()
-            enriched_chunk['embedding'] = embedding.tolist()
-            enriched_chunks.append(enriched_chunk)
-        
-        logger.info(f"Successfully generated embeddings for {len(enriched_chunks)} chunks")
+                logger.error(f"Error generating embeddings for a batch of {len(batch_texts)} texts: {e}")
+            
+            done += len(batch)
+            if done // 100 != (done - len(batch)) // 100:
+                logger.info(f"Processed {done}/{len(texts)} chunks")
         
-        return enriched_chunks
+        return embeddings
     
-    def _prepare_text(self, chunk: Dict) -> str:
-        content = chunk.get('content', '')
-        file_path = chunk.get('file_path', '')
-        language = chunk.get('language', '')
-        chunk_type = chunk.get('type', '')
-        
-        context = f"File: {file_path}\nLanguage: {language}\nType: {chunk_type}\n\nCode:\n{content}"
-        
-        max_length = 512
-        if len(context) > max_length:
-            context = context[:max_length]
-        
-        return context
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        # Special tokens included; the model truncates anything past max_tokens
+        counts = TokenCounter.for_model(self.model_name).count_batch(texts)
+        return [min(count + 2, self.max_tokens) for count in counts]
+    
+    @staticmethod
+    def _prepare_text(chunk: Chunk) -> str:
+        # Chunks are sized to fit max_tokens with this header (CHUNK_HEADER_TOKENS)
+        return (
+            f"File: {chunk.file_path or ''}\nLanguage: {chunk.language or ''}\n"
+            f"Type: {chunk.type}\n\nCode:\n{chunk.content}"
+        )
     
-    def generate_single_embedding(self, text: str) -> List[float]:
+    def generate_single_embedding(self, text: str) -> np.ndarray:
         try:
             embedding = self.model.encode(
                 text,
                 convert_to_numpy=True,
                 normalize_embeddings=True
             )
-            return embedding.tolist()
+            return np.asarray(embedding, dtype=np.float32)
         except Exception as e:
             logger.error(f"Error generating single embedding: {e}")
-            return [0.0] * self.dimension
+            return np.zeros(self.dimension, dtype=np.float32)
     
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         vec1 = np.array(embedding1)
@@ -111,5 +188,7 @@ class Embedder:
             'model_name': self.model_name,
             'dimension': self.dimension,
             'batch_size': self.batch_size,
-            'device': 'cuda' if torch.cuda.is_available() else 'cpu'
+            'max_tokens': self.max_tokens,
+            'backend': self.backend,
+            'device': self.device
         }
\ No newline at end of file
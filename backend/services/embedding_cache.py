@@ -0,0 +1,41 @@
+import hashlib
+from typing import Any
+
+import numpy as np
+
+from config import settings
+from services.content_cache import ContentCache
+from utils.metrics import (
+    EMBEDDING_CACHE_EVICTIONS_TOTAL,
+    EMBEDDING_CACHE_REQUESTS_TOTAL,
+    EMBEDDING_CACHE_SIZE_BYTES,
+)
+
+
+class EmbeddingCache(ContentCache):
+    """Embedding vectors keyed by the exact text sent to the model.
+
+    Vectors are stored as raw float32 bytes (1.5 KB for 384 dimensions)
+    in their own database and ``EMBEDDING_CACHE_MAX_MB`` budget, so they
+    never evict the reader and chunker entries. Use ``key`` to build keys.
+    """
+
+    DB_FILE = "embedding-cache.sqlite3"
+    REQUESTS_TOTAL = EMBEDDING_CACHE_REQUESTS_TOTAL
+    EVICTIONS_TOTAL = EMBEDDING_CACHE_EVICTIONS_TOTAL
+    SIZE_BYTES = EMBEDDING_CACHE_SIZE_BYTES
+
+    def __init__(self):
+        super().__init__(max_size_mb=settings.EMBEDDING_CACHE_MAX_MB)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype=np.float32)
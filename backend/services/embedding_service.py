@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+from services.chunk import Chunk
+from utils.metrics import (
+    EMBEDDING_BATCH_FILL_RATIO,
+    EMBEDDING_BATCH_REQUESTS,
+    EMBEDDING_QUEUE_DEPTH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: asyncio.Future
+
+
+class EmbeddingService:
+    """One embedding worker shared by every job, fed through an async queue.
+
+    Callers await futures; the worker coalesces whatever is queued into a
+    batch of about ``EMBEDDING_SERVICE_MAX_BATCH`` texts, waiting at most
+    ``EMBEDDING_SERVICE_MAX_WAIT_MS`` after the first request for it to fill,
+    and runs it on a single thread so jobs never contend for the model.
+    Requests are never split, so a batch can overshoot the limit by one request.
+    The worker task exits once the queue is drained and the next request
+    starts a new one, so nothing is left running between jobs.
+    """
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.max_batch = settings.EMBEDDING_SERVICE_MAX_BATCH
+        self.max_wait = settings.EMBEDDING_SERVICE_MAX_WAIT_MS / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._queued_texts = 0
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Rows for ``texts``: a contiguous slice of the float32 matrix of the batch they ran in."""
+        if not texts:
+            return np.zeros((0, self.embedder.dimension), dtype=np.float32)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The queue belongs to one event loop; a new loop (tests, reloads) gets its own
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._queued_texts = 0
+            self._worker = None
+
+        request = _Request(list(texts), loop.create_future())
+        self._queue.put_nowait(request)
+        self._queued_texts += len(texts)
+        EMBEDDING_QUEUE_DEPTH.set(self._queued_texts)
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        return await request.future
+
+    async def embed_chunks(self, chunks: List[Chunk]) -> np.ndarray:
+        return await self.embed_texts([self.embedder._prepare_text(chunk) for chunk in chunks])
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while not self._queue.empty():
+            requests = [self._queue.get_nowait()]
+            size = len(requests[0].texts)
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                requests.append(request)
+                size += len(request.texts)
+
+            self._queued_texts -= size
+            EMBEDDING_QUEUE_DEPTH.set(self._queued_texts)
+            # Callers that gave up (e.g. a cancelled job) cost nothing
+            requests = [request for request in requests if not request.future.cancelled()]
+            if not requests:
+                continue
+
+            texts = [text for request in requests for text in request.texts]
+            EMBEDDING_BATCH_FILL_RATIO.observe(len(texts) / self.max_batch)
+            EMBEDDING_BATCH_REQUESTS.observe(len(requests))
+
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self.embedder.embed_texts, texts)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_result(embeddings[offset:offset + len(request.texts)])
+                offset += len(request.texts)
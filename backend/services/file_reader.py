@@ -1,23 +1,95 @@
 import asyncio
+import codecs
+import io
 import logging
+import mmap
+import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, Union
 import chardet
 import magic
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 from config import settings
-from utils.helpers import format_file_size, detect_language_from_extension
+from services.archive_reader import ArchiveReader, AsyncByteStream
+from services.content_cache import ContentCache
+from services.file_record import FileRecord
+from services.file_walker import FileWalker, WalkEntry
+from services.git_object_reader import GitBlobEntry, GitObjectReader
+from services.git_process import ProgressCallback
+from utils.helpers import format_file_size, detect_language_from_extension, hash_content
+from utils.metrics import FILE_CHARSET_DETECTED_TOTAL, FILE_DECODE_TOTAL
 
 logger = logging.getLogger(__name__)
 
+# UTF-32 LE must be tested before UTF-16 LE, whose BOM is its prefix
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Only files that are not valid UTF-8 reach chardet, and only this much of them
+CHARSET_SAMPLE_BYTES = 64 * 1024
+
+SPECIAL_FILE_NAMES = frozenset(["Dockerfile", "Makefile", "README"])
+
+# "test" anywhere in a path component; it can never span a separator
+TEST_PATH_PATTERN = re.compile('test', re.IGNORECASE)
+
+TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+
+# Files whose extension is allowed but that only yield noise chunks
+LOCKFILE_NAMES = frozenset([
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "Cargo.lock", "composer.lock",
+    "Gemfile.lock", "go.sum", "packages.lock.json", "flake.lock", "pubspec.lock",
+    "Podfile.lock", "mix.lock",
+])
+GENERATED_NAME_PATTERN = re.compile(
+    r'\.(min|bundle)\.(js|mjs|css)$|_pb2(_grpc)?\.py$|\.pb\.go$|\.g\.dart$|\.generated\.\w+$',
+    re.IGNORECASE
+)
+GENERATED_MARKER_PATTERN = re.compile(
+    r'@generated|do not edit|code generated by|auto-?generated|automatically generated',
+    re.IGNORECASE
+)
+GENERATED_MARKER_CHARS = 1024
+DATA_FILE_EXTENSIONS = frozenset(['.json', '.yaml', '.yml', '.xml'])
+MAX_DATA_FILE_SIZE = 256 * 1024
+# Minified code: long average lines, or barely any newlines near the top
+MINIFIED_MIN_SIZE = 2048
+MINIFIED_AVG_LINE_LENGTH = 300
+NEWLINE_SAMPLE_CHARS = 4096
+MIN_SAMPLE_NEWLINES = 2
+
+# Bump when decoding or content classification changes so cached results are not reused
+READER_CACHE_VERSION = 1
+
+
+class SkippedFile(NamedTuple):
+    path: str
+    reason: str
+    size: int
+
 
 class FileReader:
     def __init__(self):
         self.max_file_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-        self.allowed_extensions = settings.ALLOWED_EXTENSIONS
-        self.excluded_dirs = settings.EXCLUDED_DIRS
+        self.max_repo_size = settings.MAX_REPO_SIZE_MB * 1024 * 1024
+        self.allowed_extensions = frozenset(ext.lower() for ext in settings.ALLOWED_EXTENSIONS)
+        self.excluded_dirs = frozenset(settings.EXCLUDED_DIRS)
+        self.walker = FileWalker()
+        self.skip_generated = settings.SKIP_GENERATED_FILES
+        self.cache = ContentCache() if settings.CONTENT_CACHE_ENABLED else None
+        self.read_concurrency = max(1, settings.FILE_READ_CONCURRENCY)
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=self.read_concurrency, thread_name_prefix="file-reader"
+        )
     
     async def read_repository(
         self,
@@ -26,39 +98,194 @@ class FileReader:
     ) -> Dict:
         logger.info(f"Reading repository at {repo_path}")
         
-        files_data = []
-        total_size = 0
-        total_lines = 0
-        language_counter = Counter()
-        file_tree = {}
+        loop = asyncio.get_event_loop()
+        
+        def include_dir(relative_path: str) -> bool:
+            return include_tests or not TEST_PATH_PATTERN.search(relative_path)
         
-        for root, dirs, files in os.walk(repo_path):
-            dirs[:] = [
-                d for d in dirs
-                if d not in self.excluded_dirs and not d.startswith('.')
+        # Filter on repo-relative paths so the clone directory's own location
+        # (e.g. a "tests" parent) never affects the decision
+        candidates = await loop.run_in_executor(
+            self._read_executor,
+            lambda: list(self.walker.walk(
+                repo_path,
+                include=lambda relative_path: self._should_process_file(relative_path, include_tests),
+                include_dir=include_dir
+            ))
+        )
+        
+        # The reader pool bounds how many reads are in flight; gather returns
+        # results in walk order so totals and file_tree are deterministic.
+        results = await asyncio.gather(
+            *(self._read_file(entry) for entry in candidates)
+        )
+        files_data = [file_info for file_info in results if isinstance(file_info, FileRecord)]
+        skipped = [file_info for file_info in results if isinstance(file_info, SkippedFile)]
+        
+        return self._summarize_files(files_data, skipped)
+    
+    async def read_repository_from_git(
+        self,
+        repo_path: Path,
+        include_tests: bool = False,
+        rev: str = "HEAD"
+    ) -> Dict:
+        logger.info(f"Reading repository objects at {repo_path} ({rev})")
+        
+        skipped: List[SkippedFile] = []
+        files_data = [
+            file_info
+            async for file_info in self.iter_git_files(repo_path, include_tests, rev, skipped)
+        ]
+        
+        return self._summarize_files(files_data, skipped)
+    
+    async def iter_git_files(
+        self,
+        repo_path: Path,
+        include_tests: bool = False,
+        rev: str = "HEAD",
+        skipped: Optional[List[SkippedFile]] = None
+    ) -> AsyncIterator[FileRecord]:
+        loop = asyncio.get_event_loop()
+        reader = GitObjectReader(repo_path)
+        if skipped is None:
+            skipped = []
+        
+        try:
+            # Full clones list sizes with the tree, so oversize and empty blobs
+            # are dropped before anything is read. Blobs missing from a
+            # partial clone have no local size until they are fetched.
+            partial = await loop.run_in_executor(None, reader.is_partial_clone)
+            entries = await loop.run_in_executor(None, reader.list_blobs, rev, not partial)
+            entries = [
+                entry for entry in entries
+                if self._should_process_file(entry.path, include_tests)
             ]
             
-            for file_name in files:
-                file_path = Path(root) / file_name
-                
-                if not self._should_process_file(file_path, include_tests):
+            # Name-based skips come before the prefetch so their blobs are never fetched
+            named = [(entry, self._path_skip_reason(entry.path)) for entry in entries]
+            entries = [entry for entry, reason in named if not reason]
+            for entry, reason in named:
+                if reason:
+                    skipped.append(SkippedFile(entry.path, reason, entry.size or 0))
+            entries = [entry for entry in entries if entry.size is None or self._within_size(entry)]
+            
+            if partial:
+                await reader.prefetch([entry.oid for entry in entries], rev)
+                sizes = await loop.run_in_executor(
+                    None, reader.get_sizes, [entry.oid for entry in entries]
+                )
+                entries = [entry._replace(size=sizes[entry.oid]) for entry in entries]
+                entries = [entry for entry in entries if self._within_size(entry)]
+            
+            selected = []
+            for entry in entries:
+                reason = self._path_skip_reason(entry.path, entry.size)
+                if reason:
+                    skipped.append(SkippedFile(entry.path, reason, entry.size))
                     continue
-                
+                selected.append((entry, entry.size))
+            
+            payload_size = sum(size for _, size in selected)
+            if payload_size > self.max_repo_size:
+                raise ValueError(
+                    f"Repository size ({format_file_size(payload_size)}) exceeds "
+                    f"maximum allowed size ({settings.MAX_REPO_SIZE_MB}MB)"
+                )
+            
+            for entry, size in selected:
                 try:
-                    file_info = await self._read_file(file_path, repo_path)
-                    
-                    if file_info:
-                        files_data.append(file_info)
-                        total_size += file_info['size']
-                        total_lines += file_info['lines']
-                        
-                        language = file_info.get('language')
-                        if language:
-                            language_counter[language] += 1
-                
+                    raw_content = await loop.run_in_executor(None, reader.read_blob, entry.oid)
                 except Exception as e:
-                    logger.warning(f"Failed to read file {file_path}: {e}")
+                    logger.warning(f"Failed to read blob {entry.path}: {e}")
                     continue
+                
+                file_info = self._make_file_info(entry.path, raw_content, skipped) if raw_content else None
+                if file_info is not None:
+                    yield file_info
+        
+        finally:
+            reader.close()
+    
+    def _within_size(self, entry: GitBlobEntry) -> bool:
+        if entry.size > self.max_file_size:
+            logger.debug(f"Skipping large file: {entry.path} ({format_file_size(entry.size)})")
+            return False
+        return entry.size > 0
+    
+    async def read_archive(
+        self,
+        chunks: AsyncIterator[bytes],
+        include_tests: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict:
+        logger.info("Reading uploaded archive")
+        
+        loop = asyncio.get_event_loop()
+        stream = AsyncByteStream(
+            chunks, loop, limit_bytes=self.max_repo_size, progress=progress
+        )
+        
+        skipped: List[SkippedFile] = []
+        try:
+            files_data = await loop.run_in_executor(
+                None, self._read_archive_members, io.BufferedReader(stream), include_tests, skipped
+            )
+        finally:
+            stream.close()
+        
+        return self._summarize_files(files_data, skipped)
+    
+    def _read_archive_members(
+        self,
+        fileobj: io.BufferedReader,
+        include_tests: bool,
+        skipped: List[SkippedFile]
+    ) -> List[FileRecord]:
+        files_data = []
+        payload_size = 0
+        
+        for member, read_member in ArchiveReader(fileobj).iter_members():
+            if not self._should_process_file(member.path, include_tests):
+                continue
+            
+            if member.size > self.max_file_size:
+                logger.debug(f"Skipping large file: {member.path} ({format_file_size(member.size)})")
+                continue
+            if member.size == 0:
+                continue
+            
+            reason = self._path_skip_reason(member.path, member.size)
+            if reason:
+                skipped.append(SkippedFile(member.path, reason, member.size))
+                continue
+            
+            payload_size += member.size
+            if payload_size > self.max_repo_size:
+                raise ValueError(
+                    f"Repository size ({format_file_size(payload_size)}) exceeds "
+                    f"maximum allowed size ({settings.MAX_REPO_SIZE_MB}MB)"
+                )
+            
+            file_info = self._make_file_info(member.path, read_member(), skipped)
+            if file_info is not None:
+                files_data.append(file_info)
+        
+        return files_data
+    
+    def _summarize_files(self, files_data: List[Dict], skipped: List[SkippedFile] = ()) -> Dict:
+        total_size = 0
+        total_lines = 0
+        language_counter = Counter()
+        
+        for file_info in files_data:
+            total_size += file_info['size']
+            total_lines += file_info['lines']
+            
+            language = file_info.get('language')
+            if language:
+                language_counter[language] += 1
         
         primary_language = language_counter.most_common(1)[0][0] if language_counter else "Unknown"
         
@@ -69,7 +296,8 @@ class FileReader:
             "total_lines": total_lines,
             "languages": dict(language_counter),
             "primary_language": primary_language,
-            "file_tree": self._build_file_tree(files_data)
+            "file_tree": self._build_file_tree(files_data),
+            "skipped_files": [skipped_file._asdict() for skipped_file in skipped]
         }
         
         logger.info(
@@ -79,113 +307,233 @@ class FileReader:
         
         return result
     
-    async def _read_file(self, file_path: Path, repo_path: Path) -> Optional[Dict]:
+    async def _read_file(self, entry: WalkEntry) -> Optional[Union[FileRecord, SkippedFile]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._read_executor, self._read_file_sync, entry)
+    
+    def _read_file_sync(self, entry: WalkEntry) -> Optional[Union[FileRecord, SkippedFile]]:
         try:
-            file_size = file_path.stat().st_size
-            
-            if file_size > self.max_file_size:
-                logger.debug(f"Skipping large file: {file_path} ({format_file_size(file_size)})")
+            if entry.size > self.max_file_size:
+                logger.debug(f"Skipping large file: {entry.path} ({format_file_size(entry.size)})")
                 return None
             
-            if file_size == 0:
+            if entry.size == 0:
                 return None
             
-            relative_path = file_path.relative_to(repo_path)
+            reason = self._path_skip_reason(entry.relative_path, entry.size)
+            if reason:
+                return SkippedFile(entry.relative_path, reason, entry.size)
             
-            content = await self._read_file_content(file_path)
+            # Only the codec and line count are kept; the text is re-read from
+            # the mapping when the chunker asks for it
+            with open(entry.path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                file_size = len(mapped)
+                content_hash = hash_content(mapped)
+                description, _ = self._describe(mapped, content_hash)
             
-            if content is None:
+            if description is None:
                 return None
             
-            lines = content.count('\n') + 1
-            
-            language = detect_language_from_extension(file_path.suffix)
+            reason = self._content_skip_reason(description)
+            if reason:
+                return SkippedFile(entry.relative_path, reason, file_size)
             
-            file_type = self._categorize_file(file_path)
-            
-            return {
-                "path": str(relative_path),
-                "name": file_path.name,
-                "extension": file_path.suffix,
-                "size": file_size,
-                "lines": lines,
-                "content": content,
-                "language": language,
-                "type": file_type
-            }
+            fields = self._make_file_fields(
+                Path(entry.relative_path), file_size, description["lines"], content_hash
+            )
+            return FileRecord(fields, entry.path, description["encoding"], description["errors"])
         
         except Exception as e:
-            logger.error(f"Error reading file {file_path}: {e}")
+            logger.error(f"Error reading file {entry.path}: {e}")
             return None
     
-    async def _read_file_content(self, file_path: Path) -> Optional[str]:
-        try:
-            loop = asyncio.get_event_loop()
-            
-            def read_sync():
-                with open(file_path, 'rb') as f:
-                    raw_content = f.read()
-                
-                if self._is_binary(raw_content):
-                    return None
-                
-                detected = chardet.detect(raw_content)
-                encoding = detected.get('encoding', 'utf-8')
-                
-                if encoding is None:
-                    encoding = 'utf-8'
-                
-                try:
-                    return raw_content.decode(encoding)
-                except (UnicodeDecodeError, LookupError):
-                    try:
-                        return raw_content.decode('utf-8', errors='ignore')
-                    except Exception:
-                        return raw_content.decode('latin-1', errors='ignore')
-            
-            return await loop.run_in_executor(None, read_sync)
+    def _make_file_info(
+        self,
+        relative_path: str,
+        raw_content: bytes,
+        skipped: List[SkippedFile]
+    ) -> Optional[FileRecord]:
+        """Record holding the decoded content of an in-memory blob, or None if it is skipped."""
+        content_hash = hash_content(raw_content)
+        description, content = self._describe(raw_content, content_hash)
+        if description is None:
+            return None
         
-        except Exception as e:
-            logger.error(f"Failed to read file content: {e}")
+        reason = self._content_skip_reason(description)
+        if reason:
+            skipped.append(SkippedFile(relative_path, reason, len(raw_content)))
             return None
+        
+        if content is None:
+            content = str(raw_content, description["encoding"], description["errors"])
+        
+        fields = self._make_file_fields(
+            Path(relative_path), len(raw_content), description["lines"], content_hash
+        )
+        return FileRecord(fields, encoding=description["encoding"], content=content)
+    
+    def _describe(self, raw_content, content_hash: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Codec, line count and classifier verdict for a blob, or None if it is binary.
+        
+        Served from the content cache when the blob was seen before. Otherwise
+        the blob is decoded, and that text is returned alongside.
+        """
+        key = f"{READER_CACHE_VERSION}:{content_hash}"
+        if self.cache:
+            description = self.cache.get("file", key)
+            if description is not None:
+                return (None if description.get("binary") else description), None
+        
+        decoded = self._decode(raw_content)
+        if decoded is None:
+            description, content = None, None
+        else:
+            content, encoding, errors = decoded
+            description = {
+                "encoding": encoding,
+                "errors": errors,
+                "lines": content.count('\n') + 1,
+                "generated": self._classify_content(content, len(raw_content)),
+            }
+        
+        if self.cache:
+            self.cache.set("file", key, description or {"binary": True})
+        return description, content
+    
+    def _make_file_fields(
+        self,
+        relative_path: Path,
+        file_size: int,
+        lines: int,
+        content_hash: str
+    ) -> Dict:
+        language = detect_language_from_extension(relative_path.suffix)
+        
+        file_type = self._categorize_file(relative_path)
+        
+        return {
+            "path": str(relative_path),
+            "name": relative_path.name,
+            "extension": relative_path.suffix,
+            "size": file_size,
+            "lines": lines,
+            "language": language,
+            "type": file_type,
+            "content_hash": content_hash
+        }
+    
+    def _decode_content(self, raw_content: bytes) -> Optional[str]:
+        decoded = self._decode(raw_content)
+        return decoded[0] if decoded else None
+    
+    def _decode(self, raw_content) -> Optional[Tuple[str, str, str]]:
+        """Decode any bytes-like buffer, returning (text, encoding, errors) or None if binary."""
+        # A BOM is authoritative, and stripping it keeps U+FEFF out of the
+        # content of UTF-8-with-BOM files.
+        head = raw_content[:4]
+        for bom, encoding in BOM_ENCODINGS:
+            if head.startswith(bom):
+                try:
+                    content = str(raw_content, encoding)
+                except UnicodeDecodeError:
+                    break
+                FILE_DECODE_TOTAL.labels(method="bom").inc()
+                return content, encoding, 'strict'
+        
+        if self._is_binary(raw_content):
+            FILE_DECODE_TOTAL.labels(method="binary").inc()
+            return None
+        
+        try:
+            content = str(raw_content, 'utf-8')
+        except UnicodeDecodeError:
+            pass
+        else:
+            FILE_DECODE_TOTAL.labels(method="utf8").inc()
+            return content, 'utf-8', 'strict'
+        
+        detected = chardet.detect(raw_content[:CHARSET_SAMPLE_BYTES])
+        encoding = detected.get('encoding')
+        
+        if encoding:
+            FILE_CHARSET_DETECTED_TOTAL.labels(encoding=encoding.lower()).inc()
+            try:
+                content = str(raw_content, encoding)
+            except (UnicodeDecodeError, LookupError):
+                pass
+            else:
+                FILE_DECODE_TOTAL.labels(method="detected").inc()
+                return content, encoding, 'strict'
+        
+        FILE_DECODE_TOTAL.labels(method="fallback").inc()
+        return str(raw_content, 'utf-8', 'ignore'), 'utf-8', 'ignore'
     
     def _is_binary(self, content: bytes) -> bool:
         if len(content) == 0:
             return False
         
-        textchars = bytearray({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
-        
         sample = content[:8192]
         
-        non_text = sample.translate(None, textchars)
+        non_text = sample.translate(None, TEXT_CHARS)
         
         if len(non_text) / len(sample) > 0.3:
             return True
         
         return False
     
-    def _should_process_file(self, file_path: Path, include_tests: bool) -> bool:
-        if file_path.name.startswith('.'):
+    def _should_process_file(self, relative_path: str, include_tests: bool) -> bool:
+        """Filter on a repo-relative, "/"-separated path; shared by every ingestion path."""
+        # Hidden files and anything under a hidden directory
+        if relative_path.startswith('.') or '/.' in relative_path:
             return False
         
-        if any(excluded in file_path.parts for excluded in self.excluded_dirs):
+        parts = relative_path.split('/')
+        name = parts[-1]
+        
+        if not self.excluded_dirs.isdisjoint(parts):
             return False
         
         if not include_tests:
-            if 'test' in file_path.name.lower() or 'spec' in file_path.name.lower():
-                return False
-            if any('test' in part.lower() for part in file_path.parts):
+            if TEST_PATH_PATTERN.search(relative_path) or 'spec' in name.lower():
                 return False
         
-        extension = file_path.suffix.lower()
+        extension = os.path.splitext(name)[1].lower()
         
-        if extension in self.allowed_extensions:
-            return True
+        return extension in self.allowed_extensions or name in SPECIAL_FILE_NAMES
+    
+    def _path_skip_reason(self, relative_path: str, size: Optional[int] = None) -> Optional[str]:
+        if not self.skip_generated:
+            return None
         
-        if file_path.name in ["Dockerfile", "Makefile", "README", ".gitignore", ".dockerignore"]:
-            return True
+        name = relative_path.rpartition('/')[2]
         
-        return False
+        if name in LOCKFILE_NAMES:
+            return "lockfile"
+        
+        if GENERATED_NAME_PATTERN.search(name):
+            return "generated"
+        
+        if size is not None and size > MAX_DATA_FILE_SIZE:
+            if os.path.splitext(name)[1].lower() in DATA_FILE_EXTENSIONS:
+                return "large_data"
+        
+        return None
+    
+    def _content_skip_reason(self, description: Dict) -> Optional[str]:
+        return description.get("generated") if self.skip_generated else None
+    
+    def _classify_content(self, content: str, size: int) -> Optional[str]:
+        if GENERATED_MARKER_PATTERN.search(content, 0, GENERATED_MARKER_CHARS):
+            return "generated"
+        
+        if size >= MINIFIED_MIN_SIZE:
+            if size / (content.count('\n') + 1) > MINIFIED_AVG_LINE_LENGTH:
+                return "minified"
+            if content.count('\n', 0, NEWLINE_SAMPLE_CHARS) < MIN_SAMPLE_NEWLINES:
+                return "minified"
+        
+        return None
     
     def _categorize_file(self, file_path: Path) -> str:
         extension = file_path.suffix.lower()
@@ -0,0 +1,69 @@
+import logging
+import mmap
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FileRecord(Mapping):
+    """Read-only file metadata, stored in slots rather than a per-file dict.
+
+    Reads like the plain dicts the rest of the pipeline expects. Git and
+    archive blobs keep their decoded ``content`` in memory. Files read from a
+    checkout keep only ``source_path``: every ``record["content"]`` maps the
+    file and decodes it with the codec chosen when it was first read. Nothing
+    is cached, so once the chunker has consumed a file its text can be
+    collected and peak memory follows the files in flight rather than the
+    whole repository.
+    """
+
+    FIELDS = ("path", "name", "extension", "size", "lines", "language", "type", "content_hash")
+
+    __slots__ = FIELDS + ("_source_path", "_encoding", "_errors", "_content")
+
+    def __init__(
+        self,
+        fields: Dict[str, Any],
+        source_path: Optional[str] = None,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+        content: Optional[str] = None
+    ):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+        self._source_path = source_path
+        self._encoding = encoding
+        self._errors = errors
+        self._content = content
+
+    def load_content(self) -> str:
+        if self._content is not None:
+            return self._content
+        if self._source_path is None:
+            return ""
+        try:
+            with open(self._source_path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, self._encoding, self._errors)
+        except (OSError, ValueError) as e:
+            # ValueError: the file was truncated to zero bytes since it was read
+            logger.warning(f"Unable to load {self._source_path}: {e}")
+            return ""
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "content":
+            return self.load_content()
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        yield "content"
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + 1
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, encoding={self._encoding!r})"
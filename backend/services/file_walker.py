@@ -0,0 +1,183 @@
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WalkEntry(NamedTuple):
+    path: str
+    relative_path: str
+    size: int
+
+
+class GitignoreRules:
+    """Patterns from one ``.gitignore``, matched against paths relative to its directory."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.rules: List[Tuple[Pattern, bool, bool]] = []
+        for line in lines:
+            rule = self._compile(line)
+            if rule:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["GitignoreRules"]:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                rules = cls(f.read().splitlines())
+        except OSError as e:
+            logger.debug(f"Unable to read {path}: {e}")
+            return None
+        return rules if rules.rules else None
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no rule applies."""
+        result = None
+        for pattern, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if pattern.match(relative_path):
+                result = not negate
+        return result
+
+    @staticmethod
+    def _compile(line: str) -> Optional[Tuple[Pattern, bool, bool]]:
+        if line.endswith("\\ "):
+            line = line.rstrip() + " "
+        else:
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate or line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+
+        regex = []
+        i = 0
+        while i < len(line):
+            if line.startswith("**/", i):
+                regex.append("(?:.*/)?")
+                i += 3
+            elif line.startswith("/**", i) and i + 3 == len(line):
+                regex.append("/.*")
+                i += 3
+            elif line.startswith("**", i):
+                regex.append(".*")
+                i += 2
+            elif line[i] == "*":
+                regex.append("[^/]*")
+                i += 1
+            elif line[i] == "?":
+                regex.append("[^/]")
+                i += 1
+            elif line[i] == "[" and "]" in line[i + 2:]:
+                end = line.index("]", i + 2)
+                body = line[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end + 1
+            elif line[i] == "\\" and i + 1 < len(line):
+                regex.append(re.escape(line[i + 1]))
+                i += 2
+            else:
+                regex.append(re.escape(line[i]))
+                i += 1
+
+        prefix = "" if anchored else "(?:.*/)?"
+        return re.compile(f"{prefix}{''.join(regex)}\\Z"), negate, dir_only
+
+
+class FileWalker:
+    """Single ``os.scandir`` pass over a checkout, shared by every disk-based reader.
+
+    Hidden and ``EXCLUDED_DIRS`` directories, plus anything the repository's
+    ``.gitignore`` files exclude, are pruned before they are opened. Only
+    files accepted by ``include`` are stat'ed, and symlinks are skipped like
+    they are for git object ingestion. Entries come out in sorted
+    depth-first order.
+    """
+
+    def __init__(self, respect_gitignore: bool = True):
+        self.excluded_dirs = frozenset(settings.EXCLUDED_DIRS)
+        self.respect_gitignore = respect_gitignore
+
+    def walk(
+        self,
+        root: Path,
+        include: Optional[Callable[[str], bool]] = None,
+        include_dir: Optional[Callable[[str], bool]] = None
+    ) -> Iterator[WalkEntry]:
+        root = str(root)
+        # (directory, its repo-relative prefix, gitignore rule sets in scope)
+        stack = [(root, "", ())]
+
+        while stack:
+            directory, prefix, ignores = stack.pop()
+
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                logger.warning(f"Unable to list {directory}: {e}")
+                continue
+
+            if self.respect_gitignore and any(entry.name == ".gitignore" for entry in entries):
+                rules = GitignoreRules.from_file(os.path.join(directory, ".gitignore"))
+                if rules:
+                    ignores = ignores + ((prefix, rules),)
+
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                relative_path = prefix + name
+
+                if entry.is_dir(follow_symlinks=False):
+                    if name.startswith(".") or name in self.excluded_dirs:
+                        continue
+                    if include_dir and not include_dir(relative_path):
+                        continue
+                    if ignores and self._is_ignored(relative_path, True, ignores):
+                        continue
+                    subdirs.append((entry.path, relative_path + "/", ignores))
+                    continue
+
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if include and not include(relative_path):
+                    continue
+                if ignores and self._is_ignored(relative_path, False, ignores):
+                    continue
+
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+
+                yield WalkEntry(path=entry.path, relative_path=relative_path, size=size)
+
+            stack.extend(reversed(subdirs))
+
+    @staticmethod
+    def _is_ignored(relative_path: str, is_dir: bool, ignores) -> bool:
+        # Deeper .gitignore files override shallower ones
+        for prefix, rules in reversed(ignores):
+            result = rules.match(relative_path[len(prefix):], is_dir)
+            if result is not None:
+                return result
+        return False
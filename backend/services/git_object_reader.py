@@ -0,0 +1,128 @@
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from git import GitCommandError, Repo
+
+from services.git_process import run_git
+
+logger = logging.getLogger(__name__)
+
+SYMLINK_MODE = "120000"
+
+
+class GitBlobEntry(NamedTuple):
+    path: str
+    oid: str
+    mode: str
+    # None when the listing was taken without sizes
+    size: Optional[int] = None
+
+
+class GitObjectReader:
+    """Reads trees and blobs straight from a repository's object database.
+
+    Blob headers and contents go through GitPython's persistent
+    ``cat-file --batch-check`` / ``cat-file --batch`` processes, so a whole
+    repository is streamed over two long-lived pipes instead of a checkout.
+    The only network operation, ``prefetch``, runs as an asyncio subprocess.
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo = Repo(repo_path)
+
+    def list_blobs(self, rev: str = "HEAD", sizes: bool = True) -> List[GitBlobEntry]:
+        """Blobs under ``rev``, with their sizes from the same ``ls-tree -l`` listing.
+
+        Pass ``sizes=False`` on partial clones: git looks sizes up in the
+        object store, so ``-l`` would lazily fetch every missing blob, one
+        round trip each.
+        """
+        args = ["-r", "-z", "--full-tree", rev]
+        if sizes:
+            args.insert(0, "-l")
+        output = self.repo.git.ls_tree(*args)
+
+        entries = []
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, path = record.split("\t", 1)
+            mode, object_type, oid, *size = meta.split()
+            # Submodules show up as "commit" entries and symlinks as blobs
+            # holding the link target; neither is source we can analyze.
+            if object_type != "blob" or mode == SYMLINK_MODE:
+                continue
+            entries.append(GitBlobEntry(
+                path=path, oid=oid, mode=mode, size=int(size[0]) if size else None
+            ))
+
+        return entries
+
+    def is_partial_clone(self) -> bool:
+        # Newer git marks partial clones with remote.<name>.promisor only
+        try:
+            output = self.repo.git.config(
+                "--get-regexp", r"^(extensions\.partialclone|remote\..*\.promisor)$"
+            )
+        except GitCommandError:
+            return False
+        return any(
+            line.split(" ", 1)[-1].lower() not in ("", "false")
+            for line in output.splitlines()
+        )
+
+    async def prefetch(self, oids: Iterable[str], rev: str = "HEAD") -> int:
+        if not self.is_partial_clone():
+            return 0
+
+        repo_path = Path(self.repo.working_tree_dir or self.repo.git_dir)
+        listing = await run_git(repo_path, ["rev-list", "--objects", "--missing=print", rev])
+        missing = {line[1:] for line in listing.splitlines() if line.startswith("?")}
+        wanted = [oid for oid in dict.fromkeys(oids) if oid in missing]
+
+        if not wanted:
+            return 0
+
+        logger.info(f"Prefetching {len(wanted)} blobs from promisor remote")
+
+        # Same invocation git uses for its own lazy fetches, but batched so the
+        # whole set arrives in one pack instead of one round trip per blob.
+        await run_git(
+            repo_path,
+            [
+                "-c", "fetch.negotiationAlgorithm=noop",
+                "fetch",
+                "origin",
+                "--no-tags",
+                "--no-write-fetch-head",
+                "--recurse-submodules=no",
+                "--filter=blob:none",
+                "--stdin",
+            ],
+            input="".join(f"{oid}\n" for oid in wanted).encode("ascii")
+        )
+
+        return len(wanted)
+
+    def get_sizes(self, oids: Iterable[str]) -> Dict[str, int]:
+        sizes = {}
+        for oid in oids:
+            _, _, size = self.repo.git.get_object_header(oid)
+            sizes[oid] = size
+        return sizes
+
+    def read_blob(self, oid: str) -> Optional[bytes]:
+        _, object_type, _, data = self.repo.git.get_object_data(oid)
+        if object_type != b"blob":
+            return None
+        return data
+
+    def close(self):
+        self.repo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
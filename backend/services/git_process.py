@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import re
+import signal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from git import Git, GitCommandError
+
+from utils.helpers import get_object_store_size
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[Dict[str, int]], None]
+
+PROGRESS_PATTERN = re.compile(
+    r'Receiving objects:\s+\d+% \((\d+)/(\d+)\)(?:,\s+([\d.]+) (bytes|KiB|MiB|GiB))?'
+)
+
+SIZE_UNITS = {
+    'bytes': 1,
+    'KiB': 1024,
+    'MiB': 1024 ** 2,
+    'GiB': 1024 ** 3,
+}
+
+
+class SizeLimitExceeded(Exception):
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Transfer reached {size} bytes (limit {limit} bytes)")
+        self.size = size
+        self.limit = limit
+
+
+def parse_progress_line(line: str) -> Optional[Dict[str, int]]:
+    match = PROGRESS_PATTERN.search(line)
+    if not match:
+        return None
+
+    received, total, amount, unit = match.groups()
+    stats = {
+        "objects_received": int(received),
+        "objects_total": int(total),
+    }
+    if amount:
+        stats["bytes_received"] = int(float(amount) * SIZE_UNITS[unit])
+    return stats
+
+
+async def run_git(
+    cwd: Path,
+    args: List[str],
+    watch_dir: Optional[Path] = None,
+    limit_bytes: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    input: Optional[bytes] = None,
+    poll_interval: float = 0.25
+) -> str:
+    """Run git as an asyncio subprocess that dies with the awaiting task.
+
+    Cancellation (a timeout or a disconnected client) and an exceeded size
+    budget both kill git's whole process group, so no remote helper or
+    index-pack is left writing to disk. ``watch_dir`` is the git directory
+    whose object store receives the transfer; ``transfer.unpackLimit=1``
+    keeps every fetched object in a pack, so polling ``objects/pack``
+    (including index-pack's in-progress ``tmp_pack_*``) tracks the bytes
+    received so far. Only growth past the size measured when git starts
+    counts against ``limit_bytes``, so packs already in a shared mirror are
+    not charged to this transfer. ``--progress`` output is parsed into
+    ``progress``.
+    """
+    command = [
+        Git.GIT_PYTHON_GIT_EXECUTABLE or "git",
+        "-c", "transfer.unpackLimit=1",
+        *args
+    ]
+
+    baseline = get_object_store_size(watch_dir) if watch_dir is not None else 0
+
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=str(cwd),
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+
+    stdout_task = asyncio.ensure_future(proc.stdout.read())
+    stderr_task = asyncio.ensure_future(_read_stderr(proc.stderr, progress))
+    wait_task = asyncio.ensure_future(proc.wait())
+
+    try:
+        if input is not None:
+            proc.stdin.write(input)
+            await proc.stdin.drain()
+            proc.stdin.close()
+
+        while True:
+            done, _ = await asyncio.wait({wait_task}, timeout=poll_interval)
+            if done:
+                break
+
+            if watch_dir is None or limit_bytes is None:
+                continue
+
+            size = get_object_store_size(watch_dir) - baseline
+            if size > limit_bytes:
+                logger.warning(
+                    f"Aborting 'git {args[0]}': transfer reached {size} bytes "
+                    f"(limit {limit_bytes})"
+                )
+                raise SizeLimitExceeded(size, limit_bytes)
+
+        stdout = await stdout_task
+        stderr = await stderr_task
+
+    except BaseException:
+        _kill_process_group(proc)
+        for task in (stdout_task, stderr_task, wait_task):
+            task.cancel()
+        await asyncio.gather(proc.wait(), return_exceptions=True)
+        if watch_dir is not None:
+            _remove_partial_packs(watch_dir)
+        raise
+
+    if proc.returncode != 0:
+        raise GitCommandError(command, proc.returncode, stderr, stdout)
+
+    return stdout.decode("utf-8", errors="replace")
+
+
+async def _read_stderr(
+    stream: asyncio.StreamReader,
+    progress: Optional[ProgressCallback]
+) -> bytes:
+    # Progress updates are \r-terminated rewrites of the same line; only the
+    # \n-terminated lines are kept for error reporting.
+    kept = []
+    pending = b""
+
+    while True:
+        chunk = await stream.read(4096)
+        if not chunk:
+            break
+
+        pending += chunk
+        parts = re.split(rb'(\r|\n)', pending)
+        pending = parts.pop()
+
+        for text, separator in zip(parts[0::2], parts[1::2]):
+            line = text.decode("utf-8", errors="replace")
+            if progress:
+                stats = parse_progress_line(line)
+                if stats:
+                    progress(stats)
+            if separator == b"\n":
+                kept.append(text)
+
+    if pending:
+        kept.append(pending)
+
+    return b"\n".join(kept)
+
+
+def _kill_process_group(proc: asyncio.subprocess.Process):
+    # git fetch/clone fan out into remote helpers and index-pack; kill them all
+    if proc.returncode is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _remove_partial_packs(git_dir: Path):
+    pack_dir = git_dir / "objects" / "pack"
+    if not pack_dir.is_dir():
+        return
+
+    for entry in pack_dir.iterdir():
+        if entry.name.startswith("tmp_"):
+            entry.unlink(missing_ok=True)
@@ -0,0 +1,351 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from git import GitCommandError
+
+from config import settings
+from services.git_process import ProgressCallback, SizeLimitExceeded, run_git
+from utils.helpers import format_file_size, get_object_store_size, normalize_repo_url
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "autodeployx-cache.json"
+
+
+class MirrorCache:
+    """Bare mirrors keyed by normalized repo URL, shared across analysis jobs.
+
+    ``MAX_REPO_SIZE_MB`` caps what each job transfers into a mirror, not the
+    mirror's accumulated object store. A mirror that outgrows the cap is
+    repacked, and dropped and fetched afresh once no job is using it.
+    """
+
+    def __init__(self):
+        self.cache_dir = Path(settings.MIRROR_CACHE_DIR).resolve()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = settings.MIRROR_CACHE_MAX_MB * 1024 * 1024
+        self.clone_depth = settings.CLONE_DEPTH
+        self.max_repo_size_bytes = settings.MAX_REPO_SIZE_MB * 1024 * 1024
+
+        self._entries: Dict[str, Dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Counter = Counter()
+        self._fetched_at: Dict[Tuple[str, str], float] = {}
+        self._leases: Counter = Counter()
+
+        self._load_entries()
+
+    def _load_entries(self):
+        for mirror_path in self.cache_dir.glob("*.git"):
+            meta_path = mirror_path / META_FILE
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self._entries[mirror_path.stem] = meta
+            except (OSError, ValueError):
+                logger.warning(f"Discarding incomplete mirror at {mirror_path}")
+                shutil.rmtree(mirror_path, ignore_errors=True)
+
+    def mirror_key(self, repo_url: str) -> str:
+        normalized = normalize_repo_url(repo_url)
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def mirror_path(self, repo_url: str) -> Path:
+        return self.cache_dir / f"{self.mirror_key(repo_url)}.git"
+
+    async def checkout(
+        self,
+        repo_url: str,
+        branch: str,
+        target_path: Path,
+        sparse_patterns: Optional[List[str]] = None,
+        no_checkout: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ) -> Tuple[str, int]:
+        """Check ``branch`` out into ``target_path``; returns the branch used and the bytes transferred."""
+        key = self.mirror_key(repo_url)
+        requested_at = time.monotonic()
+        partial = bool(sparse_patterns)
+
+        async with self._locked(key):
+            resolved_branch, transferred = await self._refresh_mirror(
+                repo_url, key, branch, requested_at, partial, progress
+            )
+            self._leases[key] += 1
+
+        try:
+            transferred += await self._materialize(
+                key, resolved_branch, target_path, sparse_patterns, no_checkout,
+                budget=self.max_repo_size_bytes - transferred
+            )
+        except SizeLimitExceeded as e:
+            await asyncio.shield(self.release(repo_url))
+            raise SizeLimitExceeded(transferred + e.size, self.max_repo_size_bytes)
+        except BaseException:
+            await asyncio.shield(self.release(repo_url))
+            raise
+
+        await self._evict()
+        return resolved_branch, transferred
+
+    async def release(self, repo_url: str):
+        key = self.mirror_key(repo_url)
+        if self._leases[key] > 0:
+            self._leases[key] -= 1
+        if self._leases[key] == 0:
+            del self._leases[key]
+
+        mirror_path = self.cache_dir / f"{key}.git"
+        if not mirror_path.exists():
+            return
+
+        try:
+            await run_git(mirror_path, ["worktree", "prune"])
+        except GitCommandError as e:
+            logger.warning(f"Failed to prune worktrees of {mirror_path}: {e}")
+
+    async def _refresh_mirror(
+        self,
+        repo_url: str,
+        key: str,
+        branch: str,
+        requested_at: float,
+        partial: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ) -> Tuple[str, int]:
+        mirror_path = self.cache_dir / f"{key}.git"
+
+        # A fetch that finished while this job was waiting on the lock already
+        # brought the mirror up to date; reuse it instead of fetching again.
+        fetched_at = self._fetched_at.get((key, branch))
+        if fetched_at is not None and fetched_at >= requested_at and mirror_path.exists():
+            logger.info(f"Reusing in-flight fetch of {repo_url} ({branch})")
+            self._touch(key)
+            return self._entries[key].get("branches", {}).get(branch, branch), 0
+
+        loop = asyncio.get_event_loop()
+        created = not mirror_path.exists() or key not in self._entries
+
+        # Still over budget after repacking: start over once no job reads it,
+        # so the mirror only holds what this fetch needs
+        if not created and not self._leases.get(key) and (
+            self._entries[key].get("size", 0) > self.max_repo_size_bytes
+        ):
+            logger.info(f"Dropping oversized mirror for {repo_url}")
+            await self._remove_mirror(key)
+            created = True
+
+        try:
+            if created:
+                await loop.run_in_executor(None, shutil.rmtree, mirror_path, True)
+                mirror_path.mkdir(parents=True)
+                await run_git(mirror_path, ["init", "--bare", "--quiet"])
+                await run_git(mirror_path, ["remote", "add", "origin", repo_url])
+
+            if partial:
+                await self._enable_partial_clone(mirror_path)
+
+            size_before = get_object_store_size(mirror_path)
+            try:
+                await self._fetch_branch(mirror_path, branch, partial, progress)
+                resolved_branch = branch
+            except GitCommandError as e:
+                if "couldn't find remote ref" not in str(e).lower():
+                    raise
+                resolved_branch = await self._resolve_default_branch(mirror_path)
+                logger.info(f"Branch {branch} not found, using default branch {resolved_branch}")
+                await self._fetch_branch(mirror_path, resolved_branch, partial, progress)
+
+        except Exception:
+            if created:
+                await self._remove_mirror(key)
+            raise
+
+        size = get_object_store_size(mirror_path)
+        transferred = max(size - size_before, 0)
+        if size > self.max_repo_size_bytes:
+            size = await self._repack(mirror_path)
+
+        entry = self._entries.setdefault(key, {"url": repo_url, "branches": {}})
+        entry["size"] = size
+        entry["branches"][branch] = resolved_branch
+        self._fetched_at[(key, branch)] = time.monotonic()
+        self._touch(key)
+
+        logger.info(
+            f"Mirror for {repo_url} {'created' if created else 'updated'}. "
+            f"Fetched {format_file_size(transferred)}, mirror size: {format_file_size(size)}"
+        )
+        return resolved_branch, transferred
+
+    async def _repack(self, mirror_path: Path) -> int:
+        # Folds the packs of every earlier fetch into one and drops objects no
+        # ref reaches any more; failures only cost disk space
+        try:
+            await run_git(mirror_path, ["repack", "-a", "-d", "-q"])
+        except GitCommandError as e:
+            logger.warning(f"Failed to repack {mirror_path}: {e}")
+        return get_object_store_size(mirror_path)
+
+    async def _fetch_branch(
+        self,
+        mirror_path: Path,
+        branch: str,
+        partial: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ):
+        args = ["fetch", "--progress", "origin", f"+refs/heads/{branch}:refs/heads/{branch}"]
+        if self.clone_depth and self.clone_depth > 0:
+            args.insert(1, f"--depth={self.clone_depth}")
+        if partial:
+            args.insert(1, "--filter=blob:none")
+        await run_git(
+            mirror_path,
+            args,
+            watch_dir=mirror_path,
+            limit_bytes=self.max_repo_size_bytes,
+            progress=progress
+        )
+
+    async def _enable_partial_clone(self, mirror_path: Path):
+        # Blob-less fetches require origin to be registered as a promisor so
+        # later checkouts can lazily fetch the blobs they actually need.
+        for name, value in (
+            ("core.repositoryformatversion", "1"),
+            ("extensions.partialClone", "origin"),
+            ("remote.origin.promisor", "true"),
+            ("remote.origin.partialclonefilter", "blob:none"),
+        ):
+            await run_git(mirror_path, ["config", name, value])
+
+    async def _resolve_default_branch(self, mirror_path: Path) -> str:
+        output = await run_git(mirror_path, ["ls-remote", "--symref", "origin", "HEAD"])
+        for line in output.splitlines():
+            if line.startswith("ref: refs/heads/"):
+                return line[len("ref: refs/heads/"):].split("\t")[0]
+        raise ValueError("Unable to determine the repository's default branch")
+
+    async def _materialize(
+        self,
+        key: str,
+        branch: str,
+        target_path: Path,
+        sparse_patterns: Optional[List[str]] = None,
+        no_checkout: bool = False,
+        budget: Optional[int] = None
+    ) -> int:
+        """Add the worktree; returns the bytes of blobs lazily fetched for it."""
+        mirror_path = self.cache_dir / f"{key}.git"
+        size_before = get_object_store_size(mirror_path)
+        if budget is None:
+            budget = self.max_repo_size_bytes
+        worktree_add = ["worktree", "add", "--detach", str(target_path), branch]
+
+        # Worktrees share the mirror's object store (and its shallow and
+        # promisor state), so lazily fetched blobs stay cached for later jobs.
+        if no_checkout:
+            worktree_add.insert(2, "--no-checkout")
+            await run_git(mirror_path, worktree_add)
+            return 0
+
+        # Checkouts of a partial mirror lazily fetch blobs into the mirror,
+        # so they share the job's transfer budget with the fetch.
+        if not sparse_patterns:
+            await run_git(
+                mirror_path,
+                worktree_add,
+                watch_dir=mirror_path,
+                limit_bytes=budget
+            )
+            return max(get_object_store_size(mirror_path) - size_before, 0)
+
+        worktree_add.insert(2, "--no-checkout")
+        await run_git(mirror_path, worktree_add)
+        await run_git(target_path, ["sparse-checkout", "set", "--no-cone", *sparse_patterns])
+        await run_git(
+            target_path,
+            ["checkout", "--detach", branch],
+            watch_dir=mirror_path,
+            limit_bytes=budget
+        )
+        return max(get_object_store_size(mirror_path) - size_before, 0)
+
+    def _touch(self, key: str):
+        entry = self._entries[key]
+        entry["last_used"] = time.time()
+        meta_path = self.cache_dir / f"{key}.git" / META_FILE
+        try:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+        except OSError as e:
+            logger.warning(f"Failed to persist mirror metadata for {entry.get('url')}: {e}")
+
+    def total_size(self) -> int:
+        return sum(entry.get("size", 0) for entry in self._entries.values())
+
+    async def _evict(self):
+        if self.total_size() <= self.max_size_bytes:
+            return
+
+        candidates = sorted(
+            (key for key in self._entries if not self._leases.get(key)),
+            key=lambda k: self._entries[k].get("last_used", 0)
+        )
+
+        for key in candidates:
+            if self.total_size() <= self.max_size_bytes:
+                break
+
+            if self._lock_users.get(key):
+                continue
+
+            async with self._locked(key):
+                if self._leases.get(key) or key not in self._entries:
+                    continue
+                logger.info(
+                    f"Evicting mirror {self._entries[key].get('url')} "
+                    f"({format_file_size(self._entries[key].get('size', 0))})"
+                )
+                await self._remove_mirror(key)
+
+    @contextlib.asynccontextmanager
+    async def _locked(self, key: str) -> AsyncIterator[None]:
+        # Counts holders and waiters so the lock of an evicted mirror is only
+        # dropped once nobody can still be queued on it
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                if key not in self._entries:
+                    self._locks.pop(key, None)
+
+    async def _remove_mirror(self, key: str):
+        loop = asyncio.get_event_loop()
+        mirror_path = self.cache_dir / f"{key}.git"
+
+        self._entries.pop(key, None)
+        for fetch_key in [k for k in self._fetched_at if k[0] == key]:
+            del self._fetched_at[fetch_key]
+
+        await loop.run_in_executor(None, shutil.rmtree, mirror_path, True)
+
+    def get_stats(self) -> Dict:
+        return {
+            "mirrors": len(self._entries),
+            "total_size": self.total_size(),
+            "max_size": self.max_size_bytes,
+            "active_leases": sum(self._leases.values())
+        }
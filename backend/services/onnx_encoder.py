@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+try:
+    import onnxruntime as ort  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "encoder.json"
+TOKENIZER_FILE = "tokenizer.json"
+# Bump when the exported graph or metadata change so old exports are rebuilt
+EXPORT_VERSION = 1
+
+
+def model_dir(base_dir: str, model_name: str) -> Path:
+    return Path(base_dir).resolve() / model_name.replace("/", "--")
+
+
+def export_model(model_name: str, output_dir: Path, quantize: bool) -> None:
+    """Export a SentenceTransformer's transformer to ONNX, optionally with an int8 copy.
+
+    Needs torch, sentence-transformers and (for quantization) onnx; only runs
+    once per model, after which the encoder loads without any of them.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    started = time.perf_counter()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    pooling = st_model[1] if len(st_model) > 1 else None
+    tokenizer = transformer.tokenizer
+
+    sample = dict(tokenizer(["def export(): pass"], return_tensors="pt"))
+    input_names = list(sample)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = output_dir / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer.auto_model.eval(),
+            # A trailing dict is passed as keyword arguments
+            (sample,),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32_path), str(output_dir / "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(str(output_dir / TOKENIZER_FILE))
+    metadata = {
+        "version": EXPORT_VERSION,
+        "model_name": model_name,
+        "pooling": "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+    }
+    (output_dir / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+    logger.info(f"Exported {model_name} to ONNX in {time.perf_counter() - started:.1f}s")
+
+
+class OnnxEncoder:
+    """Sentence embeddings from an exported transformer on ONNX Runtime.
+
+    ``encode`` follows the subset of ``SentenceTransformer.encode`` the
+    embedder uses: a list of texts gives a float32 matrix, a single string a
+    vector. Tokenization, padding, pooling and normalization match the
+    sentence-transformers pipeline. The model is exported on first use and
+    loaded from ``EMBEDDING_ONNX_DIR`` afterwards.
+    """
+
+    def __init__(self, model_name: str, max_seq_length: int, base_dir: str, quantize: bool = True):
+        if ort is None:
+            raise ValueError("The ONNX embedding backend requires onnxruntime")
+        from tokenizers import Tokenizer
+
+        directory = model_dir(base_dir, model_name)
+        model_path = directory / ("model.int8.onnx" if quantize else "model.onnx")
+        metadata_path = directory / METADATA_FILE
+        if (
+            not model_path.exists()
+            or not metadata_path.exists()
+            or json.loads(metadata_path.read_text()).get("version") != EXPORT_VERSION
+        ):
+            export_model(model_name, directory, quantize)
+
+        self.metadata = json.loads(metadata_path.read_text())
+        self.pooling = self.metadata["pooling"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(directory / TOKENIZER_FILE))
+        self.tokenizer.enable_padding(
+            pad_id=self.metadata["pad_token_id"], pad_token=self.metadata["pad_token"]
+        )
+        self.max_seq_length = max_seq_length
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._max_seq_length
+
+    @max_seq_length.setter
+    def max_seq_length(self, value: int) -> None:
+        self._max_seq_length = value
+        self.tokenizer.enable_truncation(max_length=value)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.metadata["dimension"]
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = [
+            self._encode_batch(texts[start:start + batch_size], normalize_embeddings)
+            for start in range(0, len(texts), batch_size)
+        ]
+        embeddings = (
+            np.concatenate(batches) if batches
+            else np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        )
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str], normalize: bool) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": mask,
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            weights = mask[:, :, None].astype(hidden.dtype)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+        if normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
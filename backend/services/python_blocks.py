@@ -0,0 +1,116 @@
+import ast
+import re
+from typing import Dict, List, Optional
+
+# Line breaks as Python's tokenizer counts them, so offsets agree with ast line numbers
+LINE_BREAK_PATTERN = re.compile(r'\r\n?|\n')
+
+DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class PythonBlockExtractor:
+    """Splits Python source into blocks along ``ast`` node boundaries.
+
+    Every block is one slice of the source, cut with a precomputed line-offset
+    index, so extraction is linear in the file size. Functions and classes
+    include their decorators, docstrings, nested scopes and the comment lines
+    directly above them. Classes larger than ``max_block_chars`` are split into
+    their header and one block per method, and consecutive top-level
+    statements are grouped into ``module`` blocks.
+    """
+
+    def __init__(self, content: str, max_block_chars: int):
+        self.content = content
+        self.max_block_chars = max_block_chars
+        self.offsets = [0] + [match.end() for match in LINE_BREAK_PATTERN.finditer(content)]
+
+    def extract(self) -> Optional[List[Dict]]:
+        """Blocks in source order, or None if the source does not parse."""
+        # Deeply nested source exhausts the parser's (or our) recursion limit
+        try:
+            tree = ast.parse(self.content)
+            blocks = []
+            self._add_body(blocks, tree.body, "module")
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            return None
+
+        return blocks
+
+    def _add_body(
+        self,
+        blocks: List[Dict],
+        body: List[ast.stmt],
+        run_type: str,
+        run_start: Optional[int] = None,
+        run_end: Optional[int] = None
+    ):
+        # Statements that are not definitions accumulate into runs
+        previous_end = run_end or 0
+
+        for node in body:
+            start = self._start_line(node, previous_end)
+            previous_end = node.end_lineno
+
+            if isinstance(node, DEFINITION_NODES):
+                if run_end is not None:
+                    blocks.append(self._block(run_type, run_start, run_end))
+                run_start = run_end = None
+                self._add_definition(blocks, node, start, run_type)
+                continue
+
+            if run_start is None:
+                run_start = start
+            elif run_end is not None and self._size(run_start, node.end_lineno) > self.max_block_chars:
+                blocks.append(self._block(run_type, run_start, run_end))
+                run_start = start
+            run_end = node.end_lineno
+
+        if run_end is not None:
+            blocks.append(self._block(run_type, run_start, run_end))
+
+    def _add_definition(self, blocks: List[Dict], node: ast.stmt, start: int, parent_type: str):
+        end = node.end_lineno
+
+        if isinstance(node, ast.ClassDef) and self._size(start, end) > self.max_block_chars:
+            # The signature opens the first run, which picks up the docstring and attributes
+            header_end = self._start_line(node.body[0], node.lineno) - 1
+            if header_end >= start:
+                self._add_body(blocks, node.body, "class", run_start=start, run_end=header_end)
+            else:
+                self._add_body(blocks, node.body, "class")
+            return
+
+        if isinstance(node, FUNCTION_NODES):
+            block_type = "method" if parent_type == "class" else "function"
+        else:
+            block_type = "class"
+        blocks.append(self._block(block_type, start, end))
+
+    def _start_line(self, node: ast.stmt, floor: int) -> int:
+        start = node.lineno
+        for decorator in getattr(node, "decorator_list", ()):
+            start = min(start, decorator.lineno)
+
+        # Comment lines directly above a statement usually describe it; never
+        # reach back past the end of the previous statement (e.g. into a string)
+        while start - 1 > floor and self._line(start - 1).lstrip().startswith("#"):
+            start -= 1
+        return start
+
+    def _line(self, number: int) -> str:
+        return self.content[self.offsets[number - 1]:self._line_end(number)]
+
+    def _line_end(self, number: int) -> int:
+        return self.offsets[number] if number < len(self.offsets) else len(self.content)
+
+    def _size(self, start: int, end: int) -> int:
+        return self._line_end(end) - self.offsets[start - 1]
+
+    def _block(self, block_type: str, start: int, end: int) -> Dict:
+        return {
+            "type": block_type,
+            "content": self.content[self.offsets[start - 1]:self._line_end(end)],
+            "start_line": start,
+            "end_line": end,
+        }
@@ -9,24 +9,34 @@ import aiofiles
 import os
 
 from config import settings
-from utils.helpers import format_file_size, get_directory_size
+from services.file_walker import FileWalker
+from services.git_process import ProgressCallback, SizeLimitExceeded, run_git
+from services.mirror_cache import MirrorCache
+from utils.helpers import format_file_size, get_object_store_size
 
 logger = logging.getLogger(__name__)
 
 
 class RepoCloner:
     def __init__(self):
-        self.clone_dir = Path(settings.CLONE_DIR)
+        self.clone_dir = Path(settings.CLONE_DIR).resolve()
         self.clone_dir.mkdir(parents=True, exist_ok=True)
         self.max_size_bytes = settings.MAX_REPO_SIZE_MB * 1024 * 1024
         self.clone_depth = settings.CLONE_DEPTH
         self.timeout = settings.CLONE_TIMEOUT
+        self.sparse = settings.CLONE_MODE == "sparse"
+        self.mirror_cache = MirrorCache() if settings.MIRROR_CACHE_ENABLED else None
+        self.allowed_extensions = frozenset(settings.ALLOWED_EXTENSIONS)
+        self.walker = FileWalker()
+        self._job_repos = {}
     
     async def clone_repository(
         self,
         repo_url: str,
         job_id: str,
-        branch: str = "main"
+        branch: str = "main",
+        no_checkout: bool = False,
+        progress: Optional[ProgressCallback] = None
     ) -> Path:
         target_path = self.clone_dir / job_id
         
@@ -39,13 +49,14 @@ class RepoCloner:
         logger.info(f"Cloning repository {repo_url} to {target_path}")
         
         try:
-            await asyncio.wait_for(
-                self._clone_with_timeout(repo_url, target_path, branch),
+            # Transfers were already capped while running; the final size is
+            # what this job received, read from pack accounting rather than
+            # by walking the tree.
+            repo_size = await asyncio.wait_for(
+                self._clone_with_timeout(repo_url, target_path, branch, no_checkout, progress),
                 timeout=self.timeout
             )
             
-            repo_size = await get_directory_size(target_path)
-            
             if repo_size > self.max_size_bytes:
                 await self._remove_directory(target_path)
                 raise ValueError(
@@ -66,6 +77,14 @@ class RepoCloner:
                 f"Repository cloning timed out after {self.timeout} seconds"
             )
         
+        except SizeLimitExceeded as e:
+            logger.error(f"Clone aborted after receiving {format_file_size(e.size)}")
+            await self._remove_directory(target_path)
+            raise ValueError(
+                f"Repository size ({format_file_size(e.size)}) exceeds "
+                f"maximum allowed size ({settings.MAX_REPO_SIZE_MB}MB)"
+            )
+        
         except GitCommandError as e:
             logger.error(f"Git command failed: {e}")
             await self._remove_directory(target_path)
@@ -80,33 +99,72 @@ class RepoCloner:
         self,
         repo_url: str,
         target_path: Path,
-        branch: str
-    ):
-        loop = asyncio.get_event_loop()
+        branch: str,
+        no_checkout: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ) -> int:
+        sparse_patterns = self.get_sparse_checkout_patterns() if self.sparse else None
+        
+        if self.mirror_cache:
+            job_id = target_path.name
+            resolved_branch, transferred = await self.mirror_cache.checkout(
+                repo_url,
+                branch,
+                target_path,
+                sparse_patterns,
+                no_checkout=no_checkout,
+                progress=progress
+            )
+            self._job_repos[job_id] = (repo_url, resolved_branch)
+            return transferred
+        
+        clone_args = ["--progress", "--single-branch"]
+        if self.clone_depth and self.clone_depth > 0:
+            clone_args.append(f"--depth={self.clone_depth}")
+        if sparse_patterns or no_checkout:
+            clone_args.append("--no-checkout")
+        if sparse_patterns:
+            clone_args.append("--filter=blob:none")
+        
+        git_dir = target_path / ".git"
+        
+        try:
+            await run_git(
+                self.clone_dir,
+                ["clone", f"--branch={branch}", *clone_args, repo_url, str(target_path)],
+                watch_dir=git_dir,
+                limit_bytes=self.max_size_bytes,
+                progress=progress
+            )
+        except GitCommandError as e:
+            if "not found" not in str(e).lower():
+                raise
+            logger.info(f"Branch {branch} not found, trying default branch")
+            await run_git(
+                self.clone_dir,
+                ["clone", *clone_args, repo_url, str(target_path)],
+                watch_dir=git_dir,
+                limit_bytes=self.max_size_bytes,
+                progress=progress
+            )
         
-        def clone_sync():
+        if sparse_patterns and not no_checkout:
+            await run_git(target_path, ["sparse-checkout", "set", "--no-cone", *sparse_patterns])
+            current_branch = await run_git(target_path, ["symbolic-ref", "--short", "HEAD"])
+            cloned = get_object_store_size(git_dir)
+            # Blobs for the sparse paths are lazily fetched here, within what
+            # is left of the budget after the clone
             try:
-                Repo.clone_from(
-                    repo_url,
+                await run_git(
                     target_path,
-                    depth=self.clone_depth,
-                    branch=branch,
-                    single_branch=True,
-                    no_checkout=False
+                    ["checkout", current_branch.strip()],
+                    watch_dir=git_dir,
+                    limit_bytes=self.max_size_bytes - cloned
                 )
-            except GitCommandError as e:
-                if "not found" in str(e).lower():
-                    logger.info(f"Branch {branch} not found, trying default branch")
-                    Repo.clone_from(
-                        repo_url,
-                        target_path,
-                        depth=self.clone_depth,
-                        single_branch=True
-                    )
-                else:
-                    raise
-        
-        await loop.run_in_executor(None, clone_sync)
+            except SizeLimitExceeded as e:
+                raise SizeLimitExceeded(cloned + e.size, self.max_size_bytes)
+        
+        return get_object_store_size(git_dir)
     
     async def get_repository_info(self, repo_path: Path) -> dict:
         try:
@@ -115,7 +173,11 @@ class RepoCloner:
             commits = list(repo.iter_commits(max_count=1))
             latest_commit = commits[0] if commits else None
             
-            branch = repo.active_branch.name if not repo.head.is_detached else "detached"
+            if not repo.head.is_detached:
+                branch = repo.active_branch.name
+            else:
+                # Mirror-cache worktrees are always detached at the fetched branch tip
+                branch = self._job_repos.get(repo_path.name, (None, "detached"))[1]
             
             remote_url = ""
             if repo.remotes:
@@ -142,6 +204,10 @@ class RepoCloner:
         if target_path.exists():
             logger.info(f"Cleaning up repository at {target_path}")
             await self._remove_directory(target_path)
+        
+        job_repo = self._job_repos.pop(job_id, None)
+        if job_repo and self.mirror_cache:
+            await self.mirror_cache.release(job_repo[0])
     
     async def _remove_directory(self, path: Path):
         loop = asyncio.get_event_loop()
@@ -192,33 +258,38 @@ class RepoCloner:
             "*.7z"
         ]
     
-    async def get_file_count(self, repo_path: Path) -> int:
-        count = 0
-        excluded_patterns = self.get_excluded_patterns()
-        
-        for root, dirs, files in os.walk(repo_path):
-            dirs[:] = [
-                d for d in dirs
-                if d not in settings.EXCLUDED_DIRS and not d.startswith('.')
-            ]
-            
-            for file in files:
-                file_path = Path(root) / file
-                if self._should_include_file(file_path):
-                    count += 1
+    def get_sparse_checkout_patterns(self) -> list:
+        # Non-cone sparse-checkout patterns: later entries win, so the
+        # allow-list comes first and the exclusions override it.
+        patterns = [f"*{extension}" for extension in settings.ALLOWED_EXTENSIONS]
+        patterns += ["Dockerfile", "Makefile", "README"]
+        patterns += ["!.*", "!**/.*/**"]
+        
+        for pattern in self.get_excluded_patterns():
+            if pattern == "*.git/*":
+                continue
+            if pattern.startswith("*/") and pattern.endswith("/*"):
+                patterns.append(f"!**/{pattern[2:-2]}/**")
+            else:
+                patterns.append(f"!{pattern}")
         
-        return count
+        return patterns
     
-    def _should_include_file(self, file_path: Path) -> bool:
-        if file_path.name.startswith('.'):
+    async def get_file_count(self, repo_path: Path) -> int:
+        return sum(1 for _ in self.walker.walk(repo_path, include=self._should_include_file))
+    
+    def _should_include_file(self, relative_path: str) -> bool:
+        name = relative_path.rpartition('/')[2]
+        
+        if name.startswith('.'):
             return False
         
-        extension = file_path.suffix.lower()
+        extension = os.path.splitext(name)[1].lower()
         
-        if not extension and file_path.name not in ["Dockerfile", "Makefile", "README"]:
+        if not extension and name not in ["Dockerfile", "Makefile", "README"]:
             return False
         
-        if extension in settings.ALLOWED_EXTENSIONS or file_path.name in settings.ALLOWED_EXTENSIONS:
+        if extension in self.allowed_extensions or name in self.allowed_extensions:
             return True
         
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,65 @@
+import functools
+import logging
+import math
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Estimate used when the model's tokenizer cannot be loaded; code tokenizes
+# densely, so this errs towards smaller chunks
+CHARS_PER_TOKEN = 3
+
+
+class TokenCounter:
+    """Counts tokens the way the embedding model will see them.
+
+    Wraps the model's fast tokenizer (``tokenizers``, no torch import, so it
+    is cheap in chunking pool workers). Special tokens are not counted;
+    callers reserve room for them. Without a tokenizer, counts are estimated
+    from ``CHARS_PER_TOKEN``.
+    """
+
+    def __init__(self, tokenizer=None, name: str = "chars"):
+        self.tokenizer = tokenizer
+        self.name = name
+        if tokenizer is not None:
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "TokenCounter":
+        return _load_counter(model_name)
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        if self.tokenizer is None:
+            return [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+    def split_offsets(self, text: str, max_tokens: int) -> List[int]:
+        """Character offsets that cut ``text`` into pieces of at most ``max_tokens`` tokens."""
+        if self.tokenizer is None:
+            step = max_tokens * CHARS_PER_TOKEN
+            return list(range(step, len(text), step))
+
+        offsets = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        # Cut where the next piece's first token starts, so nothing between tokens is lost
+        return [offsets[i][0] for i in range(max_tokens, len(offsets), max_tokens)]
+
+
+@functools.lru_cache(maxsize=None)
+def _load_counter(model_name: str) -> TokenCounter:
+    # Once per process and model; pool workers load their own copy
+    try:
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_pretrained(model_name)
+    except Exception as e:
+        logger.warning(
+            f"Unable to load tokenizer for {model_name}, estimating "
+            f"{CHARS_PER_TOKEN} characters per token: {e}"
+        )
+        return TokenCounter()
+    return TokenCounter(tokenizer, name=model_name)
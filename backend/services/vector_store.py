@@ -1,10 +1,10 @@
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
-    PointStruct,
     Filter,
     FieldCondition,
     MatchValue,
@@ -13,6 +13,7 @@ from qdrant_client.models import (
 import uuid
 
 from config import settings
+from services.chunk import Chunk
 
 logger = logging.getLogger(__name__)
 
@@ -61,61 +62,62 @@ class VectorStore:
             logger.error(f"Failed to create collection: {e}")
             raise
     
-    def insert_chunks(self, collection_name: str, chunks: List[Dict]) -> int:
-        logger.info(f"Inserting {len(chunks)} chunks into collection {collection_name}")
+    def insert_chunks(self, collection_name: str, chunks: List[Chunk], embeddings: np.ndarray) -> int:
+        """Upsert chunks with their vectors, row ``i`` of ``embeddings`` belonging to ``chunks[i]``.
         
-        if not chunks:
-            return 0
+        Each block of rows goes to ``upload_collection`` as a view of the
+        matrix; the client serializes it for the wire in one request.
+        """
+        logger.debug(f"Inserting {len(chunks)} chunks into collection {collection_name}")
         
-        points = []
-        for chunk in chunks:
-            embedding = chunk.get('embedding')
-            if not embedding:
-                logger.warning(f"Chunk {chunk.get('chunk_id')} has no embedding, skipping")
-                continue
-            
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding,
-                payload={
-                    'chunk_id': chunk.get('chunk_id'),
-                    'content': chunk.get('content'),
-                    'file_path': chunk.get('file_path'),
-                    'file_name': chunk.get('file_name'),
-                    'language': chunk.get('language'),
-                    'type': chunk.get('type'),
-                    'start_line': chunk.get('start_line'),
-                    'end_line': chunk.get('end_line'),
-                    'metadata': chunk.get('metadata', {})
-                }
-            )
-            points.append(point)
+        if len(embeddings) != len(chunks):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
         
         batch_size = 100
         inserted_count = 0
         
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
+        for i in range(0, len(chunks), batch_size):
+            batch = chunks[i:i + batch_size]
             try:
-                self.client.upsert(
+                self.client.upload_collection(
                     collection_name=collection_name,
-                    points=batch
+                    vectors=embeddings[i:i + batch_size],
+                    payload=[chunk.to_dict() for chunk in batch],
+                    ids=[chunk.point_id or str(uuid.uuid4()) for chunk in batch],
+                    batch_size=batch_size,
+                    wait=True
                 )
                 inserted_count += len(batch)
                 
                 if (i + batch_size) % 500 == 0:
-                    logger.info(f"Inserted {inserted_count}/{len(points)} points")
+                    logger.info(f"Inserted {inserted_count}/{len(chunks)} points")
             
             except Exception as e:
                 logger.error(f"Failed to insert batch {i}: {e}")
         
-        logger.info(f"Successfully inserted {inserted_count} chunks")
+        logger.debug(f"Successfully inserted {inserted_count} chunks")
         return inserted_count
     
+    def update_aliases(self, collection_name: str, aliases_by_point: Dict[str, List[Dict]]) -> int:
+        updated = 0
+        
+        for point_id, aliases in aliases_by_point.items():
+            try:
+                self.client.set_payload(
+                    collection_name=collection_name,
+                    payload={'aliases': aliases},
+                    points=[point_id]
+                )
+                updated += 1
+            except Exception as e:
+                logger.error(f"Failed to update aliases for point {point_id}: {e}")
+        
+        return updated
+    
     def search(
         self,
         collection_name: str,
-        query_vector: List[float],
+        query_vector: Union[List[float], np.ndarray],
         top_k: int = None,
         score_threshold: float = None,
         filter_dict: Optional[Dict] = None
@@ -158,6 +160,7 @@ class VectorStore:
                     'type': result.payload.get('type'),
                     'start_line': result.payload.get('start_line'),
                     'end_line': result.payload.get('end_line'),
+                    'aliases': result.payload.get('aliases', []),
                     'metadata': result.payload.get('metadata', {})
                 })
             
@@ -0,0 +1,9 @@
+import pytest
+
+from config import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_content_cache(tmp_path_factory, monkeypatch):
+    # Keep tests from sharing cached reader, chunker or embedder output with each other or a dev checkout
+    monkeypatch.setattr(settings, "CONTENT_CACHE_DIR", str(tmp_path_factory.mktemp("content-cache")))
@@ -0,0 +1,143 @@
+import threading
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.analysis_pipeline import JobStatus, RepositoryAnalyzer
+from services.chunker import CodeChunker
+from services.embedder import Embedder
+from services.embedding_service import EmbeddingService
+
+
+class RecordingEmbedder:
+    batch_size = 2
+    _prepare_text = staticmethod(Embedder._prepare_text)
+
+    dimension = 2
+
+    def embed_texts(self, texts):
+        return np.tile(np.array([0.0, 1.0], dtype=np.float32), (len(texts), 1))
+
+
+class RecordingStore:
+    def __init__(self, consumed):
+        self.consumed = consumed
+        self.batches = []
+        self.embeddings = []
+        self.consumed_at_first_upsert = None
+
+    def insert_chunks(self, collection_name, chunks, embeddings):
+        if self.consumed_at_first_upsert is None:
+            self.consumed_at_first_upsert = len(self.consumed)
+        self.batches.append(chunks)
+        self.embeddings.append(embeddings)
+        return len(chunks)
+
+
+@pytest.mark.asyncio
+async def test_index_files_streams_batches_with_backpressure(monkeypatch):
+    monkeypatch.setattr(settings, "PIPELINE_QUEUE_SIZE", 1)
+    consumed = []
+    lock = threading.Lock()
+
+    class TrackedFile(dict):
+        # Records when the chunker loads content, like FileRecord does lazily
+        def get(self, key, default=None):
+            if key == "content":
+                with lock:
+                    consumed.append(self["path"])
+            return super().get(key, default)
+
+    files = [
+        TrackedFile(
+            path=f"mod{i}.txt",
+            name=f"mod{i}.txt",
+            language="Text",
+            content=f"line {i} of some reasonably long text content\n" * 3,
+        )
+        for i in range(60)
+    ]
+
+    analyzer = RepositoryAnalyzer.__new__(RepositoryAnalyzer)
+    # In-process, so content loads are visible to the test
+    analyzer.chunker = CodeChunker(workers=1)
+    analyzer.embedder = RecordingEmbedder()
+    analyzer.embedding_service = EmbeddingService(analyzer.embedder)
+    analyzer.vector_store = RecordingStore(consumed)
+    status = JobStatus(job_id="job", repo_url="repo", branch="main")
+
+    sample = await analyzer._index_files("collection", files, status)
+
+    store = analyzer.vector_store
+    assert store.consumed_at_first_upsert < 20
+    assert status.chunks_total == status.chunks_indexed == 60
+    assert [len(batch) for batch in store.batches] == [2] * 30
+    assert [chunk.file_path for chunk in sample] == ["mod0.txt", "mod1.txt"]
+    assert all(
+        embeddings.shape == (len(batch), 2) and embeddings.dtype == np.float32
+        for batch, embeddings in zip(store.batches, store.embeddings)
+    )
+
+
+@pytest.mark.asyncio
+async def test_index_files_stops_all_stages_when_one_fails():
+    class FailingStore:
+        def insert_chunks(self, collection_name, chunks, embeddings):
+            raise RuntimeError("qdrant down")
+
+    def files():
+        for i in range(1000):
+            yield {"path": f"f{i}.txt", "name": "f", "language": "Text", "content": "x" * 80}
+
+    analyzer = RepositoryAnalyzer.__new__(RepositoryAnalyzer)
+    analyzer.chunker = CodeChunker()
+    analyzer.embedder = RecordingEmbedder()
+    analyzer.embedding_service = EmbeddingService(analyzer.embedder)
+    analyzer.vector_store = FailingStore()
+    status = JobStatus(job_id="job", repo_url="repo", branch="main")
+
+    with pytest.raises(RuntimeError, match="qdrant down"):
+        await analyzer._index_files("collection", files(), status)
+
+    assert status.chunks_total < 1000
+
+
+@pytest.mark.asyncio
+async def test_index_files_embeds_duplicate_content_once():
+    body = "def handler(event):\n    return {'status': 200, 'body': event}\n" * 3
+    files = [
+        {"path": "svc_a/handler.py", "name": "handler.py", "language": "Text",
+         "content": body, "content_hash": "same"},
+        {"path": "svc_b/handler.py", "name": "handler.py", "language": "Text",
+         "content": body, "content_hash": "same"},
+        {"path": "svc_c/copy.py", "name": "copy.py", "language": "Text",
+         "content": body + "   \n\n", "content_hash": "different"},
+        {"path": "unique.py", "name": "unique.py", "language": "Text",
+         "content": "value = 1\n" * 12, "content_hash": "other"},
+    ]
+
+    class AliasStore(RecordingStore):
+        def __init__(self):
+            super().__init__([])
+            self.updates = {}
+
+        def update_aliases(self, collection_name, aliases_by_point):
+            self.updates.update(aliases_by_point)
+
+    analyzer = RepositoryAnalyzer.__new__(RepositoryAnalyzer)
+    analyzer.chunker = CodeChunker()
+    analyzer.embedder = RecordingEmbedder()
+    analyzer.embedding_service = EmbeddingService(analyzer.embedder)
+    analyzer.vector_store = AliasStore()
+    status = JobStatus(job_id="job", repo_url="repo", branch="main")
+
+    await analyzer._index_files("collection", files, status)
+
+    indexed = [chunk for batch in analyzer.vector_store.batches for chunk in batch]
+    assert [chunk.file_path for chunk in indexed] == ["svc_a/handler.py", "unique.py"]
+    assert status.chunks_deduplicated == 2
+
+    handler = indexed[0]
+    aliases = analyzer.vector_store.updates.get(handler.point_id, handler.aliases)
+    assert [alias["file_path"] for alias in aliases] == ["svc_b/handler.py", "svc_c/copy.py"]
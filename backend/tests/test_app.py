@@ -91,3 +91,12 @@ def test_analyze_repo_endpoint(monkeypatch):
     assert data["summary"] == "ok"
     assert data["source_references"][0]["file_path"] == "README.md"
 
+
+
+def test_shutdown_stops_the_chunk_pool(monkeypatch):
+    calls = []
+    monkeypatch.setattr("app.shutdown_chunk_pool", lambda: calls.append(1))
+
+    with TestClient(app):
+        assert calls == []
+    assert calls == [1]
@@ -0,0 +1,105 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from config import settings
+from routers.repo_router import _stream_upload
+from services.file_reader import FileReader
+
+
+def _tar_gz(root, prefix):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        archive.add(root, arcname=prefix)
+    return buffer.getvalue()
+
+
+def _zip(root, prefix):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"{prefix}/", "")
+        for path in sorted(root.rglob("*")):
+            if path.is_file():
+                archive.write(path, f"{prefix}/{path.relative_to(root)}")
+    return buffer.getvalue()
+
+
+async def _chunked(data, size=512):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+def _by_path(files_data):
+    return {info["path"]: info for info in files_data["files"]}
+
+
+@pytest.fixture()
+def sample_tree(tmp_path):
+    root = tmp_path / "tree"
+    files = {
+        "app.py": "import os\n\nprint(os.getcwd())\n",
+        "src/utils.js": "export const add = (a, b) => a + b;\n",
+        "docs/README.md": "# Sample\n\nSome docs.\n",
+        "node_modules/pkg/index.js": "module.exports = {};\n",
+        ".github/workflows/ci.yml": "on: push\n",
+        "tests/test_app.py": "def test_ok():\n    assert True\n",
+        "empty.txt": "",
+    }
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (root / "logo.png").write_bytes(b"\x89PNG\r\n" + bytes(range(256)) * 8)
+    return root
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("build", [_tar_gz, _zip])
+async def test_archive_ingestion_matches_directory_walk(sample_tree, build):
+    reader = FileReader()
+    updates = []
+
+    from_disk = await reader.read_repository(sample_tree)
+    from_archive = await reader.read_archive(
+        _chunked(build(sample_tree, "repo-main")), progress=updates.append
+    )
+
+    assert _by_path(from_archive) == _by_path(from_disk)
+    assert sorted(_by_path(from_archive)) == ["app.py", "docs/README.md", "src/utils.js"]
+    assert updates[-1]["bytes_received"] > 0
+
+
+@pytest.mark.asyncio
+async def test_archive_upload_over_size_limit_is_rejected(sample_tree, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_REPO_SIZE_MB", 0)
+
+    with pytest.raises(ValueError, match="exceeds maximum allowed size"):
+        await FileReader().read_archive(_chunked(_tar_gz(sample_tree, "repo")))
+
+
+@pytest.mark.asyncio
+async def test_non_archive_upload_is_rejected():
+    with pytest.raises(ValueError, match="not a .tar"):
+        await FileReader().read_archive(_chunked(b"just some text\n" * 100))
+
+
+def test_multipart_upload_streams_only_the_file_part():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        received = b"".join([chunk async for chunk in _stream_upload(request)])
+        return {"size": len(received), "head": received[:4].decode("latin-1")}
+
+    payload = b"PK\x03\x04" + b"x" * 100_000
+    response = TestClient(app).post(
+        "/upload",
+        data={"note": "ignored"},
+        files={"archive": ("repo.zip", payload, "application/zip")},
+    )
+
+    assert response.json() == {"size": len(payload), "head": "PK\x03\x04"}
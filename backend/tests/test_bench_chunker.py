@@ -0,0 +1,20 @@
+from benchmarks.bench_chunker import benchmark_corpus, generate_repository, parse_mix, read_corpus
+
+
+def test_synthetic_corpus_is_reproducible_and_benchmarked(tmp_path):
+    mix = parse_mix("python=2,go=1,markdown=1")
+    generate_repository(tmp_path / "a", 12, 40, mix, seed=7)
+    generate_repository(tmp_path / "b", 12, 40, mix, seed=7)
+
+    first = {path.relative_to(tmp_path / "a"): path.read_text() for path in (tmp_path / "a").rglob("*.*")}
+    second = {path.relative_to(tmp_path / "b"): path.read_text() for path in (tmp_path / "b").rglob("*.*")}
+    assert first == second and len(first) == 12
+
+    files = read_corpus(tmp_path / "a")
+    results = benchmark_corpus("tiny", files, ["semantic", "sliding_window"], repeat=1, workers=1)
+
+    assert [result["strategy"] for result in results] == ["semantic", "sliding_window"]
+    for result in results:
+        assert result["files"] == 12 and result["chunks"] > 0
+        assert result["mb_per_sec"] > 0 and result["peak_memory_mb"] > 0
+        assert result["statistics"]["total_chunks"] == result["chunks"]
@@ -0,0 +1,329 @@
+import pytest
+
+from config import settings
+
+from services.chunker import CodeChunker, get_chunk_pool, shutdown_chunk_pool
+from services.file_reader import FileReader
+from services.token_budget import TokenCounter
+
+
+@pytest.fixture()
+def mixed_tree(tmp_path):
+    for i in range(40):
+        (tmp_path / f"module_{i}.py").write_text(
+            f"class Handler{i}:\n"
+            + "".join(
+                f"    def method_{j}(self, value):\n        return value * {j} + {i}\n\n"
+                for j in range(5 + i % 7)
+            )
+        )
+        (tmp_path / f"notes_{i}.md").write_text(f"# Notes {i}\n\n" + "Some prose here.\n" * (10 + i))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_process_pool_chunking_matches_in_process(mixed_tree, monkeypatch):
+    # Without the content cache, so the second pass really runs in the pool
+    monkeypatch.setattr(settings, "CONTENT_CACHE_ENABLED", False)
+    files = (await FileReader().read_repository(mixed_tree))["files"]
+
+    serial = CodeChunker(workers=1)
+    parallel = CodeChunker(workers=2)
+    parallel.work_unit_bytes = 2048
+
+    try:
+        expected = serial.chunk_repository(files)
+        first = parallel.chunk_repository(files)
+        second = parallel.chunk_repository(files)
+    finally:
+        shutdown_chunk_pool()
+
+    assert len(expected) > len(files)
+    assert [chunk.to_dict() for chunk in first] == [chunk.to_dict() for chunk in expected]
+    assert [chunk.chunk_id for chunk in second] == [chunk.chunk_id for chunk in expected]
+
+
+@pytest.mark.asyncio
+async def test_chunkers_with_other_worker_counts_share_the_pool(mixed_tree, monkeypatch):
+    monkeypatch.setattr(settings, "CONTENT_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "CHUNK_WORKERS", 2)
+    files = (await FileReader().read_repository(mixed_tree))["files"]
+
+    try:
+        pool = get_chunk_pool()
+        chunks = CodeChunker(workers=3).chunk_repository(files)
+        assert get_chunk_pool() is pool
+        assert [chunk.to_dict() for chunk in chunks] == [
+            chunk.to_dict() for chunk in CodeChunker(workers=1).chunk_repository(files)
+        ]
+    finally:
+        shutdown_chunk_pool()
+
+
+def test_work_units_are_balanced_by_size():
+    chunker = CodeChunker(workers=2)
+    chunker.work_unit_bytes = 100
+    files = [{"path": f"f{i}", "size": size} for i, size in enumerate([30, 40, 50, 500, 10, 20])]
+
+    units = [[file_info["path"] for file_info in unit] for unit in chunker._work_units(files)]
+
+    assert units == [["f0", "f1", "f2"], ["f3"], ["f4", "f5"]]
+
+
+def test_chunks_reference_their_file_instead_of_copying_it():
+    file_info = {"path": "notes.txt", "name": "notes.txt", "language": "Text",
+                 "size": 2800, "lines": 81, "type": "documentation",
+                 "content": "a line of text that is long enough\n" * 80}
+
+    chunks = CodeChunker(workers=1).chunk_repository([file_info])
+
+    assert all(chunk.file is file_info and not hasattr(chunk, "__dict__") for chunk in chunks)
+    assert chunks[0].to_dict() == {
+        "chunk_id": "notes.txt::chunk_0",
+        "content": chunks[0].content,
+        "file_path": "notes.txt",
+        "file_name": "notes.txt",
+        "language": "Text",
+        "type": "sliding_window",
+        "start_line": 1,
+        "end_line": 17,
+        "aliases": [],
+        "metadata": {"file_size": 2800, "total_lines": 81, "file_type": "documentation"},
+    }
+
+
+PYTHON_SOURCE = '''"""Service entry points."""
+import asyncio
+
+
+# Retries transient failures
+@retry(times=3)
+async def fetch(client, url):
+    """Fetch one URL."""
+    def parse(body):
+        return body.decode("utf-8", "replace").strip()
+    return parse(await client.get(url))
+
+
+class Repository(Base):
+    """Stores records."""
+
+    table = "records"
+
+    def load(self, record_id):
+        return self.session.query(self.table).filter_by(id=record_id).one_or_none()
+
+    @property
+    def size(self):
+        return self.session.query(self.table).count() + len(self.pending_records)
+
+    async def flush(self):
+        for record in self.pending_records:
+            await self.session.add(record, table=self.table, replace_existing=True)
+'''
+
+
+def _python_blocks(content, chunk_size=1200):
+    chunker = CodeChunker(workers=1)
+    chunker.chunk_size = chunk_size
+    return [(b["type"], b["start_line"], b["end_line"]) for b in chunker._extract_python_blocks(content)]
+
+
+def test_python_blocks_follow_ast_scopes():
+    blocks = _python_blocks(PYTHON_SOURCE)
+
+    assert blocks == [("module", 1, 2), ("function", 5, 11), ("class", 14, 28)]
+
+
+def test_oversized_python_class_is_split_by_method():
+    blocks = _python_blocks(PYTHON_SOURCE, chunk_size=300)
+
+    assert blocks == [
+        ("module", 1, 2),
+        ("function", 5, 11),
+        ("class", 14, 17),
+        ("method", 19, 20),
+        ("method", 22, 24),
+        ("method", 26, 28),
+    ]
+
+
+def test_python_blocks_are_exact_source_slices():
+    chunker = CodeChunker(workers=1)
+    chunker.chunk_size = 300
+    lines = PYTHON_SOURCE.splitlines(keepends=True)
+
+    for block in chunker._extract_python_blocks(PYTHON_SOURCE):
+        assert block["content"] == "".join(lines[block["start_line"] - 1:block["end_line"]])
+
+
+def test_unparseable_python_falls_back_to_line_matching():
+    source = "def legacy(x):\n    print 'value', x\n    return x\n" * 3
+    chunker = CodeChunker(workers=1)
+
+    assert chunker._extract_python_blocks(source) == chunker._extract_python_blocks_regex(source)
+
+
+# ast.parse raises RecursionError for the shallower nesting and MemoryError for the deeper one
+@pytest.mark.parametrize("depth", [5_000, 100_000])
+def test_deeply_nested_python_falls_back_to_line_matching(depth):
+    source = "def handler():\n    return " + "-" * depth + "1\n"
+    chunker = CodeChunker(workers=1)
+
+    assert chunker._extract_python_blocks(source) == chunker._extract_python_blocks_regex(source)
+
+
+JS_SOURCE = r'''import { a } from "./a"
+import b from 'b'
+
+// Builds the URL; braces in strings: "{" '}'
+export function url(base, path) {
+  const re = /[{}]+/g;
+  return `${base}/${path.replace(re, "")}/${ {x: 1}.x }`;
+}
+
+/* class { */
+export class Client extends Base {
+  constructor(opts) {
+    super(opts);
+    this.retries = opts.retries || 3;
+  }
+
+  async get(path) {
+    if (path) {
+      return this.http.get(url(this.base, path));
+    } else {
+      throw new Error("no path }");
+    }
+  }
+}
+
+describe("client", () => {
+  it("works", () => {
+    expect(1).toBe(1);
+  });
+});
+'''
+
+JAVA_SOURCE = '''package app;
+
+import java.util.List;
+
+/** Handles { requests. */
+public class Handler {
+    private static final String OPEN = "{";
+    private final List<String> items;
+
+    public Handler(List<String> items) {
+        this.items = items;
+    }
+
+    public String render() {
+        String text = """
+            } not a brace {
+            """;
+        return OPEN + text + '}';
+    }
+}
+'''
+
+
+def _brace_blocks(content, language, chunk_size=1200):
+    chunker = CodeChunker(workers=1)
+    chunker.chunk_size = chunk_size
+    return [(b["type"], b["start_line"], b["end_line"]) for b in chunker._extract_brace_blocks(content, language)]
+
+
+def test_braces_in_strings_regexes_and_comments_do_not_move_boundaries():
+    assert _brace_blocks(JS_SOURCE, "JavaScript") == [
+        ("module", 1, 2),
+        ("function", 4, 8),
+        ("class", 10, 24),
+        ("function", 26, 30),
+    ]
+
+
+def test_oversized_brace_declarations_are_split_by_member():
+    assert _brace_blocks(JAVA_SOURCE, "Java", chunk_size=150) == [
+        ("module", 1, 3),
+        ("class", 5, 8),
+        ("method", 10, 12),
+        ("method", 14, 19),
+    ]
+
+
+@pytest.mark.parametrize("language, source, expected", [
+    ("Go", 'package main\n\nimport "fmt"\n\nconst t = `{{ .Name }} }`\n\n'
+           'func main() {\n\tfmt.Println("}", \'{\')\n}\n',
+     [("module", 1, 5), ("function", 7, 9)]),
+    ("C++", '#include <string>\nconst char* kJson = R"json({"a": "}"})json";\n'
+            'int main() {\n  return 0;\n}\n',
+     [("module", 1, 2), ("function", 3, 5)]),
+    ("C#", 'class Paths\n{\n    string Root = @"C:\\{root}\\";\n}\n'
+           'class Names\n{\n    string Name() { return $"{Root}"; }\n}\n',
+     [("class", 1, 4), ("class", 5, 8)]),
+])
+def test_language_specific_literals_are_lexed(language, source, expected):
+    assert _brace_blocks(source, language) == expected
+
+
+def test_brace_blocks_are_whole_source_lines():
+    lines = JS_SOURCE.splitlines(keepends=True)
+    chunker = CodeChunker(workers=1)
+    chunker.chunk_size = 150
+
+    for block in chunker._extract_brace_blocks(JS_SOURCE, "JavaScript"):
+        assert block["content"] == "".join(lines[block["start_line"] - 1:block["end_line"]])
+
+
+@pytest.fixture()
+def word_counter():
+    # One token per word or punctuation mark, like the model's pre-tokenizer
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return TokenCounter(tokenizer, name="words")
+
+
+@pytest.fixture()
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_TOKENS", 60)
+    monkeypatch.setattr(settings, "CHUNK_HEADER_TOKENS", 10)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP_TOKENS", 10)
+
+
+def test_oversized_blocks_are_split_into_overlapping_token_bounded_chunks(word_counter, small_budget):
+    source = "def transform(values):\n" + "".join(
+        f"    step_{i} = values[{i}] * {i} + offset\n" for i in range(30)
+    ) + "    return values\n"
+    chunker = CodeChunker(workers=1, token_counter=word_counter)
+
+    parts = chunker._chunk_parts(source, "Python")
+
+    assert [part[0] for part in parts] == list(range(len(parts)))
+    assert len(parts) > 1 and {part[1] for part in parts} == {"function"}
+    assert all(word_counter.count(part[4]) <= 50 for part in parts)
+    # Consecutive sub-chunks share a line and together cover the whole function
+    assert parts[0][2] == 1 and parts[-1][3] == 32
+    assert all(nxt[2] <= prev[3] for prev, nxt in zip(parts, parts[1:]))
+    lines = source.splitlines(keepends=True)
+    assert all(part[4] == "".join(lines[part[2] - 1:part[3]]) for part in parts)
+
+
+def test_lines_longer_than_the_budget_are_cut_at_token_boundaries(word_counter, small_budget):
+    line = " ".join(f"word{i}" for i in range(120)) + "\n"
+    chunker = CodeChunker(workers=1, token_counter=word_counter)
+
+    parts = chunker._sliding_window_chunk(line)
+
+    assert "".join(part[4] for part in parts) == line
+    assert [word_counter.count(part[4]) for part in parts] == [50, 50, 20]
+    assert all(part[2:4] == (1, 1) for part in parts)
+
+
+def test_token_estimate_without_a_tokenizer():
+    counter = TokenCounter()
+
+    assert counter.count_batch(["abcdef", "abcdefg"]) == [2, 3]
+    assert counter.split_offsets("x" * 10, 1) == [3, 6, 9]
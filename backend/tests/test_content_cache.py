@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from config import settings
+from services.chunker import CodeChunker
+from services.content_cache import ContentCache
+from services.file_reader import FileReader
+
+
+@pytest.fixture()
+def source_tree(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for i in range(5):
+        (root / f"handler_{i}.py").write_text(
+            "".join(f"def handler_{i}_{j}(event):\n    return {{'status': {j}, 'body': event}}\n\n" for j in range(4))
+        )
+    (root / "README.md").write_text("# Service\n\n" + "Handles events for the platform.\n" * 30)
+    return root
+
+
+@pytest.mark.asyncio
+async def test_second_job_reuses_decoded_metadata_and_chunks(source_tree, tmp_path, monkeypatch):
+    first_files = (await FileReader().read_repository(source_tree))["files"]
+    first_chunks = [chunk.to_dict() for chunk in CodeChunker(workers=1).chunk_repository(first_files)]
+    expected_files = [dict(info) for info in first_files]
+
+    # A fork of the same code at another path, read by a fresh job
+    fork = tmp_path / "fork"
+    source_tree.rename(fork)
+
+    decoded, chunked = [], []
+    original_decode, original_parts = FileReader._decode, CodeChunker._chunk_parts
+    monkeypatch.setattr(FileReader, "_decode", lambda self, raw: decoded.append(1) or original_decode(self, raw))
+    monkeypatch.setattr(
+        CodeChunker, "_chunk_parts", lambda self, *args: chunked.append(1) or original_parts(self, *args)
+    )
+
+    second_files = (await FileReader().read_repository(fork))["files"]
+    second_chunks = CodeChunker(workers=1).chunk_repository(second_files)
+
+    assert decoded == [] and chunked == []
+    assert [dict(info) for info in second_files] == expected_files
+    assert [chunk.to_dict() for chunk in second_chunks] == first_chunks
+
+
+def test_chunk_cache_hits_do_not_load_the_tokenizer(monkeypatch):
+    from services.token_budget import TokenCounter
+
+    files = [{"path": "app.py", "name": "app.py", "language": "Python",
+              "content": "def main():\n    return 1\n", "content_hash": "hit"}]
+    expected = [chunk.to_dict() for chunk in CodeChunker(workers=1).chunk_repository(files)]
+
+    def fail(model_name):
+        raise AssertionError("tokenizer loaded on a cache hit")
+
+    monkeypatch.setattr(TokenCounter, "for_model", fail)
+    assert [chunk.to_dict() for chunk in CodeChunker(workers=1).chunk_repository(files)] == expected
+
+
+def test_chunk_cache_is_keyed_by_chunk_settings(monkeypatch):
+    files = [{"path": "notes.txt", "name": "notes.txt", "language": "Text",
+              "content": "a line of text that is long enough\n" * 80, "content_hash": "abc"}]
+    default = CodeChunker(workers=1).chunk_repository(files)
+
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_TOKENS", settings.EMBEDDING_MAX_TOKENS * 2)
+    wider = CodeChunker(workers=1).chunk_repository(files)
+
+    assert len(wider) < len(default)
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "CONTENT_CACHE_MAX_MB", 1)
+    cache = ContentCache()
+    blob = os.urandom(200 * 1024).hex()
+
+    for i in range(12):
+        cache.set("chunks", f"key{i}", [i, blob])
+    cache.evict()
+
+    assert cache.total_size() <= cache.max_size_bytes
+    assert cache.get("chunks", "key11") is not None
+    assert cache.get("chunks", "key0") is None
+    cache.close()
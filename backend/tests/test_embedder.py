@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+import sentence_transformers
+
+from config import settings
+from services import onnx_encoder
+from services.chunk import Chunk
+from services.embedder import Embedder
+from utils.metrics import EMBEDDING_CACHE_REQUESTS_TOTAL
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer that records what it encodes."""
+
+    max_seq_length = 512
+
+    def __init__(self, model_name, device=None):
+        self.encoded = []
+        self.batches = []
+        self.fail = False
+
+    def encode(self, texts, **kwargs):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        self.encoded.extend(texts)
+        self.batches.append(list(texts))
+        vectors = np.array(
+            [[len(text), sum(map(ord, text)) % 97, 1.0] + [0.0] * (settings.EMBEDDING_DIMENSION - 3)
+             for text in texts],
+            dtype=np.float32,
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", FakeModel)
+
+
+def make_chunks(contents):
+    file_info = {"path": "app.py", "name": "app.py", "language": "Python"}
+    return [Chunk(file_info, i, "function", 1, 2, content) for i, content in enumerate(contents)]
+
+
+def hits(kind):
+    return EMBEDDING_CACHE_REQUESTS_TOTAL.labels(kind=kind, result="hit")._value.get()
+
+
+def test_only_cache_misses_are_sent_to_the_model():
+    first = Embedder()
+    expected = first.generate_embeddings(make_chunks(["def a(): pass", "def b(): pass"]))
+
+    second = Embedder()
+    hits_before = hits(second.cache_kind)
+    embeddings = second.generate_embeddings(make_chunks(["def a(): pass", "def b(): pass", "def c(): pass"]))
+
+    assert len(second.model.encoded) == 1 and second.model.encoded[0].endswith("def c(): pass")
+    assert np.array_equal(embeddings[:2], expected)
+    assert hits(second.cache_kind) - hits_before == 2
+
+
+def test_cache_is_keyed_by_model_settings_and_skips_failed_batches(monkeypatch):
+    failing = Embedder()
+    failing.model.fail = True
+    embeddings = failing.generate_embeddings(make_chunks(["def a(): pass"]))
+    assert embeddings.shape == (1, settings.EMBEDDING_DIMENSION) and not embeddings.any()
+
+    first = Embedder()
+    first.generate_embeddings(make_chunks(["def a(): pass"]))
+    assert len(first.model.encoded) == 1
+
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_TOKENS", settings.EMBEDDING_MAX_TOKENS * 2)
+    longer = Embedder()
+    longer.generate_embeddings(make_chunks(["def a(): pass"]))
+    assert len(longer.model.encoded) == 1
+
+
+def test_texts_are_batched_by_padded_token_length_and_returned_in_order(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_TOKENS", 400)
+    embedder = Embedder()
+    contents = [("x = 1\n" if i % 3 else "def f():\n" + "    y = 2\n" * 40) + f"# {i}" for i in range(30)]
+
+    chunks = make_chunks(contents)
+    embeddings = embedder.generate_embeddings(chunks)
+
+    texts = [embedder._prepare_text(chunk) for chunk in chunks]
+    assert embeddings.dtype == np.float32 and embeddings.flags.c_contiguous
+    assert np.array_equal(embeddings, FakeModel("fake").encode(texts))
+    lengths = dict(zip(texts, embedder._token_lengths(texts)))
+    assert len(embedder.model.batches) > 1
+    for batch in embedder.model.batches:
+        padded = len(batch) * max(lengths[text] for text in batch)
+        assert padded <= 400 or len(batch) == 1
+    # Short snippets never share a pass with the long functions
+    assert all(len({lengths[text] > 50 for text in batch}) == 1 for batch in embedder.model.batches)
+
+
+def test_onnx_backend_falls_back_to_torch_without_onnxruntime(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(onnx_encoder, "ort", None)
+
+    embedder = Embedder()
+
+    assert isinstance(embedder.model, FakeModel)
+    assert embedder.backend == "torch" and embedder.cache_kind.endswith(":torch")
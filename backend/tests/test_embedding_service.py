@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.embedding_service import EmbeddingService
+
+
+class BatchRecordingEmbedder:
+    dimension = 1
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def embed_texts(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture(autouse=True)
+def batching(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_SERVICE_MAX_BATCH", 8)
+    monkeypatch.setattr(settings, "EMBEDDING_SERVICE_MAX_WAIT_MS", 50)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch_and_get_their_own_results():
+    embedder = BatchRecordingEmbedder()
+    service = EmbeddingService(embedder)
+    requests = [["a" * i, "b" * (i + 10)] for i in range(1, 4)]
+
+    results = await asyncio.gather(*(service.embed_texts(texts) for texts in requests))
+
+    assert embedder.batches == [[text for texts in requests for text in texts]]
+    assert all(result.flags.c_contiguous and result.dtype == np.float32 for result in results)
+    assert [[float(vector[0]) for vector in result] for result in results] == [
+        [len(text) for text in texts] for texts in requests
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batches_close_at_the_size_limit_without_splitting_requests():
+    embedder = BatchRecordingEmbedder()
+    service = EmbeddingService(embedder)
+
+    await asyncio.gather(*(service.embed_texts([f"{i}-{j}" for j in range(3)]) for i in range(5)))
+
+    assert [len(batch) for batch in embedder.batches] == [9, 6]
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_every_caller_in_the_batch_and_the_service_recovers():
+    embedder = BatchRecordingEmbedder(fail=True)
+    service = EmbeddingService(embedder)
+
+    results = await asyncio.gather(
+        service.embed_texts(["x"]), service.embed_texts(["y"]), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    embedder.fail = False
+    assert [float(vector[0]) for vector in await service.embed_texts(["abc"])] == [3.0]
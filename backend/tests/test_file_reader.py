@@ -0,0 +1,260 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from config import settings
+from services.file_reader import FileReader
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture()
+def sample_repo(tmp_path):
+    repo = tmp_path / "repo"
+    files = {
+        "app.py": "import os\n\nprint(os.getcwd())\n",
+        "src/utils.js": "export const add = (a, b) => a + b;\n",
+        "docs/README.md": "# Sample\n\nSome docs.\n",
+        "config/settings.yaml": "debug: true\n",
+        "node_modules/pkg/index.js": "module.exports = {};\n",
+        ".github/workflows/ci.yml": "on: push\n",
+        "tests/test_app.py": "def test_ok():\n    assert True\n",
+        "empty.txt": "",
+    }
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (repo / "logo.png").write_bytes(b"\x89PNG\r\n" + bytes(range(256)) * 8)
+
+    _git(repo.parent, "init", "-q", "-b", "main", str(repo))
+    _git(repo, "add", ".")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "init")
+    return repo
+
+
+def _by_path(files_data):
+    return {info["path"]: info for info in files_data["files"]}
+
+
+@pytest.mark.asyncio
+async def test_git_ingestion_matches_working_tree_walk(sample_repo):
+    reader = FileReader()
+
+    from_disk = await reader.read_repository(sample_repo)
+    from_git = await reader.read_repository_from_git(sample_repo)
+
+    assert _by_path(from_git) == _by_path(from_disk)
+    assert sorted(_by_path(from_git)) == [
+        "app.py",
+        "config/settings.yaml",
+        "docs/README.md",
+        "src/utils.js",
+    ]
+    for key in ("total_files", "total_size", "total_lines", "languages", "file_tree"):
+        assert from_git[key] == from_disk[key]
+
+
+@pytest.mark.asyncio
+async def test_git_ingestion_skips_oversize_blobs_without_reading(sample_repo, monkeypatch):
+    (sample_repo / "big.py").write_text("x = 1\n" * 300_000)
+    _git(sample_repo, "add", "big.py")
+    _git(sample_repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "big")
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    reader = FileReader()
+
+    read_oids = []
+    from services.git_object_reader import GitObjectReader
+
+    original = GitObjectReader.read_blob
+
+    def tracking_read(self, oid):
+        read_oids.append(oid)
+        return original(self, oid)
+
+    monkeypatch.setattr(GitObjectReader, "read_blob", tracking_read)
+    # Full clones take sizes from the tree listing
+    monkeypatch.setattr(GitObjectReader, "get_sizes", None)
+
+    files_data = await reader.read_repository_from_git(sample_repo)
+
+    big_oid = _git(sample_repo, "rev-parse", "HEAD:big.py").strip()
+    assert "big.py" not in _by_path(files_data)
+    assert big_oid not in read_oids
+
+
+@pytest.mark.asyncio
+async def test_partial_clone_ingestion_only_fetches_wanted_blobs(sample_repo, tmp_path):
+    _git(sample_repo, "config", "uploadpack.allowFilter", "true")
+    clone = tmp_path / "partial"
+    _git(tmp_path, "clone", "-q", "--filter=blob:none", "--no-checkout", f"file://{sample_repo}", str(clone))
+
+    files_data = await FileReader().read_repository_from_git(clone)
+
+    assert sorted(_by_path(files_data)) == ["app.py", "config/settings.yaml", "docs/README.md", "src/utils.js"]
+    missing = _git(clone, "rev-list", "--objects", "--missing=print", "HEAD")
+    for path in ("logo.png", "node_modules/pkg/index.js"):
+        assert f"?{_git(sample_repo, 'rev-parse', f'HEAD:{path}').strip()}" in missing
+
+
+@pytest.mark.asyncio
+async def test_disk_reads_are_bounded_and_ordered(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    for i in range(24):
+        (tmp_path / f"dir{i % 3}").mkdir(exist_ok=True)
+        (tmp_path / f"dir{i % 3}" / f"mod{i:02d}.py").write_text(f"value = {i}\n")
+
+    monkeypatch.setattr(settings, "FILE_READ_CONCURRENCY", 4)
+    reader = FileReader()
+
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+    original = FileReader._read_file_sync
+
+    def slow_read(self, entry):
+        with lock:
+            in_flight.append(entry)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        try:
+            return original(self, entry)
+        finally:
+            with lock:
+                in_flight.remove(entry)
+
+    monkeypatch.setattr(FileReader, "_read_file_sync", slow_read)
+
+    files_data = await reader.read_repository(tmp_path)
+    paths = [info["path"] for info in files_data["files"]]
+
+    assert 1 < max(peak) <= 4
+    assert paths == sorted(paths)
+    assert len(paths) == 24
+
+
+def _decode_count(method):
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value("autodeployx_file_decode_total", {"method": method}) or 0
+
+
+def test_decoding_skips_charset_detection_for_utf8_and_bom(monkeypatch):
+    import chardet
+
+    def fail_detect(_):
+        raise AssertionError("chardet should not run")
+
+    monkeypatch.setattr(chardet, "detect", fail_detect)
+    reader = FileReader()
+    before = _decode_count("utf8"), _decode_count("bom")
+
+    assert reader._decode_content("naïve = 'ü'\n".encode("utf-8")) == "naïve = 'ü'\n"
+    assert reader._decode_content("x = 1\n".encode("utf-8-sig")) == "x = 1\n"
+    assert reader._decode_content("é = 1\n".encode("utf-16")) == "é = 1\n"
+    assert (_decode_count("utf8"), _decode_count("bom")) == (before[0] + 1, before[1] + 2)
+
+
+def test_decoding_detects_legacy_charsets_on_a_bounded_sample(monkeypatch):
+    import chardet
+
+    from services import file_reader
+
+    sampled = []
+    original = chardet.detect
+
+    def tracking_detect(data):
+        sampled.append(len(data))
+        return original(data)
+
+    monkeypatch.setattr(chardet, "detect", tracking_detect)
+    raw = ("# café crème brûlée\n" * 20_000).encode("latin-1")
+
+    content = FileReader()._decode_content(raw)
+
+    assert content.startswith("# caf")
+    assert sampled == [file_reader.CHARSET_SAMPLE_BYTES]
+
+
+@pytest.mark.asyncio
+async def test_disk_records_load_content_on_access(tmp_path):
+    from services.file_record import FileRecord
+
+    (tmp_path / "legacy.py").write_bytes(("# café\n" * 50).encode("latin-1"))
+    (tmp_path / "app.py").write_text("print('hi')\n")
+
+    files_data = await FileReader().read_repository(tmp_path)
+    records = _by_path(files_data)
+
+    assert all(isinstance(record, FileRecord) for record in records.values())
+    assert records["app.py"]._content is None
+    assert records["legacy.py"]["content"].startswith("# café\n")
+    assert records["legacy.py"]["lines"] == 51
+
+    (tmp_path / "app.py").write_text("print('changed')\n")
+    assert records["app.py"]["content"] == "print('changed')\n"
+
+
+@pytest.mark.asyncio
+async def test_framework_detection_only_reads_manifests(tmp_path, monkeypatch):
+    from services.file_record import FileRecord
+    from utils.helpers import detect_framework
+
+    (tmp_path / "requirements.txt").write_text("fastapi==0.110\n")
+    (tmp_path / "notes.py").write_text("# not a django or flask project\n")
+    files = (await FileReader().read_repository(tmp_path))["files"]
+
+    loaded = []
+    load_content = FileRecord.load_content
+    monkeypatch.setattr(FileRecord, "load_content", lambda self: loaded.append(self.name) or load_content(self))
+
+    assert detect_framework(files) == ["FastAPI"]
+    assert loaded == ["requirements.txt"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("source", ["disk", "git"])
+async def test_low_value_files_are_skipped_and_reported(sample_repo, source):
+    files = {
+        "package-lock.json": '{"lockfileVersion": 3}\n',
+        "static/app.min.js": "var a=1;\n",
+        "static/vendor.js": "!function(){" + "var a=1;" * 600 + "}();\n",
+        "api_pb2.py": "# message stubs\n",
+        "client.py": "# Code generated by protoc-gen. DO NOT EDIT.\nclass Client:\n    pass\n",
+        "fixtures/data.json": '{"rows": [\n' + '  {"id": 1},\n' * 30_000 + "]}\n",
+    }
+    for name, content in files.items():
+        path = sample_repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    _git(sample_repo, "add", ".")
+    _git(sample_repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "noise")
+
+    reader = FileReader()
+    if source == "git":
+        files_data = await reader.read_repository_from_git(sample_repo)
+    else:
+        files_data = await reader.read_repository(sample_repo)
+
+    assert sorted(_by_path(files_data)) == [
+        "app.py",
+        "config/settings.yaml",
+        "docs/README.md",
+        "src/utils.js",
+    ]
+    assert {item["path"]: item["reason"] for item in files_data["skipped_files"]} == {
+        "package-lock.json": "lockfile",
+        "static/app.min.js": "generated",
+        "static/vendor.js": "minified",
+        "api_pb2.py": "generated",
+        "client.py": "generated",
+        "fixtures/data.json": "large_data",
+    }
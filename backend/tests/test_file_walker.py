@@ -0,0 +1,76 @@
+import pytest
+
+from services.file_walker import FileWalker, GitignoreRules
+from services.repo_cloner import RepoCloner
+
+
+def _write(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+@pytest.mark.parametrize(
+    "pattern, path, is_dir, expected",
+    [
+        ("*.log", "a/b/debug.log", False, True),
+        ("/build", "build", True, True),
+        ("/build", "src/build", True, None),
+        ("out/", "src/out", True, True),
+        ("out/", "src/out", False, None),
+        ("docs/**/*.md", "docs/a/b/x.md", False, True),
+        ("**/cache", "a/b/cache", True, True),
+        ("logs/**", "logs/x/y.txt", False, True),
+        ("file?.py", "file1.py", False, True),
+        ("file[!0-9].py", "file1.py", False, None),
+        ("\\#notes", "#notes", False, True),
+    ],
+)
+def test_gitignore_pattern_semantics(pattern, path, is_dir, expected):
+    assert GitignoreRules([pattern]).match(path, is_dir) is expected
+
+
+def test_walk_honors_nested_gitignores_and_prunes(tmp_path):
+    _write(tmp_path, {
+        ".gitignore": "*.gen.py\nscratch/\n!keep.gen.py\n",
+        "app.py": "a = 1\n",
+        "model.gen.py": "generated\n",
+        "keep.gen.py": "kept\n",
+        "scratch/notes.py": "x\n",
+        "pkg/.gitignore": "local.py\n",
+        "pkg/local.py": "x\n",
+        "pkg/mod.py": "m = 1\n",
+        "other/local.py": "x\n",
+        "node_modules/dep/index.js": "x\n",
+        ".hidden/secret.py": "x\n",
+    })
+    (tmp_path / "link.py").symlink_to(tmp_path / "app.py")
+
+    entries = list(FileWalker().walk(tmp_path, include=lambda path: path.endswith(".py")))
+
+    assert [entry.relative_path for entry in entries] == [
+        "app.py",
+        "keep.gen.py",
+        "other/local.py",
+        "pkg/mod.py",
+    ]
+    assert entries[0].size == len("a = 1\n")
+
+
+@pytest.mark.asyncio
+async def test_file_count_uses_walker(tmp_path, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "CLONE_DIR", str(tmp_path / "repos"))
+    monkeypatch.setattr(settings, "MIRROR_CACHE_ENABLED", False)
+    _write(tmp_path / "repo", {
+        ".gitignore": "dist-local/\n",
+        "main.go": "package main\n",
+        "lib/util.go": "package lib\n",
+        "dist-local/out.go": "package out\n",
+        "vendor/x.go": "package x\n",
+        "notes": "no extension\n",
+    })
+
+    assert await RepoCloner().get_file_count(tmp_path / "repo") == 2
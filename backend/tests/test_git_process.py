@@ -0,0 +1,71 @@
+import asyncio
+import os
+import subprocess
+import time
+
+import pytest
+
+from config import settings
+from services.git_process import parse_progress_line, run_git
+from services.repo_cloner import RepoCloner
+
+
+def test_parse_progress_line_reads_objects_and_bytes():
+    stats = parse_progress_line(
+        "Receiving objects:  45% (450/1000), 12.50 MiB | 3.21 MiB/s"
+    )
+    assert stats == {
+        "objects_received": 450,
+        "objects_total": 1000,
+        "bytes_received": int(12.5 * 1024 * 1024),
+    }
+    assert parse_progress_line("Resolving deltas: 100% (3/3), done.") is None
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_git_and_its_children(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    alias = f"alias.hang=!echo $$ > {pid_file}; exec sleep 30"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(run_git(tmp_path, ["-c", alias, "hang"]), timeout=1.0)
+
+    child_pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while _process_alive(child_pid) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    assert not _process_alive(child_pid)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mirror_enabled", [True, False])
+async def test_clone_reports_transfer_progress(tmp_path, monkeypatch, mirror_enabled):
+    upstream = tmp_path / "upstream"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(upstream)], check=True)
+    for i in range(20):
+        (upstream / f"mod{i}.py").write_text(f"value = {i}\n")
+    subprocess.run(["git", "add", "."], cwd=upstream, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "init"],
+        cwd=upstream,
+        check=True,
+    )
+
+    monkeypatch.setattr(settings, "CLONE_DIR", str(tmp_path / "repos"))
+    monkeypatch.setattr(settings, "MIRROR_CACHE_DIR", str(tmp_path / "mirrors"))
+    monkeypatch.setattr(settings, "MIRROR_CACHE_ENABLED", mirror_enabled)
+    cloner = RepoCloner()
+
+    updates = []
+    await cloner.clone_repository(f"file://{upstream}", "job", "main", progress=updates.append)
+
+    assert updates
+    assert updates[-1]["objects_received"] == updates[-1]["objects_total"] > 0
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from config import settings
+from services.mirror_cache import MirrorCache
+from services.repo_cloner import RepoCloner
+from utils.helpers import normalize_repo_url
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _commit(repo: Path, name: str, content: str) -> None:
+    (repo / name).write_text(content)
+    _git(repo, "add", name)
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", name)
+
+
+@pytest.fixture()
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    _commit(repo, "app.py", "print('hello')\n")
+    return repo
+
+
+@pytest.fixture()
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MIRROR_CACHE_DIR", str(tmp_path / "mirrors"))
+    monkeypatch.setattr(settings, "MIRROR_CACHE_MAX_MB", 1024)
+    monkeypatch.setattr(settings, "CLONE_DEPTH", 1)
+    monkeypatch.setattr(settings, "CLONE_DIR", str(tmp_path / "repos"))
+    return MirrorCache()
+
+
+def test_normalize_repo_url_collapses_equivalent_forms():
+    assert (
+        normalize_repo_url("https://GitHub.com/Octocat/Hello-World.git/")
+        == normalize_repo_url("https://github.com/octocat/hello-world")
+    )
+
+
+@pytest.mark.asyncio
+async def test_checkout_reuses_mirror_and_fetches_new_commits(cache, upstream, tmp_path):
+    url = f"file://{upstream}"
+
+    first = tmp_path / "job1"
+    assert (await cache.checkout(url, "main", first))[0] == "main"
+    assert (first / "app.py").exists()
+    await cache.release(url)
+
+    _commit(upstream, "lib.py", "x = 1\n")
+
+    second = tmp_path / "job2"
+    await cache.checkout(url, "main", second)
+    assert (second / "lib.py").exists()
+    assert _git(second, "remote", "get-url", "origin").strip() == url
+    assert cache.get_stats()["mirrors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_branch_falls_back_to_default(cache, upstream, tmp_path):
+    branch, _ = await cache.checkout(f"file://{upstream}", "does-not-exist", tmp_path / "job")
+    assert branch == "main"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_checkouts_share_one_fetch(cache, upstream, tmp_path, monkeypatch):
+    calls = []
+    original = MirrorCache._fetch_branch
+
+    async def counting_fetch(self, mirror_path, branch, partial=False, progress=None):
+        calls.append(branch)
+        return await original(self, mirror_path, branch, partial, progress)
+
+    monkeypatch.setattr(MirrorCache, "_fetch_branch", counting_fetch)
+
+    url = f"file://{upstream}"
+    await asyncio.gather(
+        *(cache.checkout(url, "main", tmp_path / f"job{i}") for i in range(3))
+    )
+
+    assert calls == ["main"]
+    assert cache.get_stats()["active_leases"] == 3
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_skips_leased_mirrors(cache, tmp_path):
+    urls = []
+    for name in ("a", "b"):
+        repo = tmp_path / name
+        repo.mkdir()
+        _git(repo, "init", "-q", "-b", "main")
+        _commit(repo, "f.py", name * 100)
+        urls.append(f"file://{repo}")
+
+    await cache.checkout(urls[0], "main", tmp_path / "job-a")
+    await cache.release(urls[0])
+
+    cache.max_size_bytes = 1
+    await cache.checkout(urls[1], "main", tmp_path / "job-b")
+
+    assert not cache.mirror_path(urls[0]).exists()
+    assert cache.mirror_path(urls[1]).exists()
+
+    evicted, kept = cache.mirror_key(urls[0]), cache.mirror_key(urls[1])
+    assert set(cache._locks) == {kept}
+    assert {key for key, _ in cache._fetched_at} == {kept}
+    assert evicted not in cache._lock_users
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout_skips_assets_and_excluded_dirs(cache, upstream, tmp_path):
+    _git(upstream, "config", "uploadpack.allowFilter", "true")
+    (upstream / "node_modules" / "pkg").mkdir(parents=True)
+    (upstream / "node_modules" / "pkg" / "index.js").write_text("module.exports = 1\n")
+    (upstream / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 4096)
+    _git(upstream, "add", ".")
+    _git(upstream, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "assets")
+
+    url = f"file://{upstream}"
+    target = tmp_path / "job"
+    patterns = RepoCloner().get_sparse_checkout_patterns()
+    await cache.checkout(url, "main", target, sparse_patterns=patterns)
+
+    checked_out = sorted(
+        str(p.relative_to(target)) for p in target.rglob("*") if p.is_file() and p.name != ".git"
+    )
+    assert checked_out == ["app.py"]
+
+    png_oid = _git(upstream, "rev-parse", "HEAD:logo.png").strip()
+    missing = _git(cache.mirror_path(url), "rev-list", "--objects", "--missing=print", "main")
+    assert f"?{png_oid}" in missing
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mirror_enabled", [True, False])
+async def test_oversized_repository_is_rejected_during_transfer(
+    cache, upstream, tmp_path, monkeypatch, mirror_enabled
+):
+    (upstream / "blob.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+    _git(upstream, "add", "blob.bin")
+    _git(upstream, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "blob")
+
+    monkeypatch.setattr(settings, "MAX_REPO_SIZE_MB", 1)
+    monkeypatch.setattr(settings, "MIRROR_CACHE_ENABLED", mirror_enabled)
+    cloner = RepoCloner()
+
+    with pytest.raises(ValueError, match="exceeds maximum allowed size"):
+        await cloner.clone_repository(f"file://{upstream}", "job", "main")
+
+    assert not (tmp_path / "repos" / "job").exists()
+    leftovers = list((tmp_path / "mirrors").rglob("tmp_pack_*"))
+    assert leftovers == []
+
+
+@pytest.mark.asyncio
+async def test_budget_charges_each_fetch_and_oversized_mirrors_are_rebuilt(cache, upstream, tmp_path):
+    (upstream / "main.bin").write_bytes(os.urandom(600 * 1024))
+    _git(upstream, "add", "main.bin")
+    _git(upstream, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "main")
+    _git(upstream, "checkout", "-q", "-b", "feature")
+    (upstream / "feature.bin").write_bytes(os.urandom(600 * 1024))
+    _git(upstream, "add", "feature.bin")
+    _git(upstream, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "feature")
+
+    cache.max_repo_size_bytes = 1024 * 1024
+    url = f"file://{upstream}"
+
+    _, first = await cache.checkout(url, "main", tmp_path / "job1")
+    await cache.release(url)
+    # The mirror ends up over budget, but this job only received the new blob
+    _, second = await cache.checkout(url, "feature", tmp_path / "job2")
+    await cache.release(url)
+
+    assert first < cache.max_repo_size_bytes and second < cache.max_repo_size_bytes
+    assert cache.total_size() > cache.max_repo_size_bytes
+
+    _, third = await cache.checkout(url, "main", tmp_path / "job3")
+    assert third == pytest.approx(first, rel=0.1)
+    assert cache.total_size() < cache.max_repo_size_bytes
+    assert "feature" not in _git(cache.mirror_path(url), "branch", "--list")
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from config import settings
+
+ort = pytest.importorskip("onnxruntime")
+
+TEXTS = [
+    "def add(a, b):\n    return a + b\n",
+    "File: app.py\nLanguage: Python\nType: class\n\nCode:\nclass Service:\n    pass\n",
+    "export const handler = (event) => ({ status: 200, body: JSON.stringify(event) });",
+    "## Deployment\n\nSet QDRANT_HOST and run docker compose up.",
+    "x",
+]
+
+
+@pytest.fixture(scope="module")
+def torch_model():
+    from sentence_transformers import SentenceTransformer
+
+    try:
+        model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device="cpu")
+    except OSError:
+        pytest.skip("embedding model is not available locally")
+    model.max_seq_length = settings.EMBEDDING_MAX_TOKENS
+    return model
+
+
+@pytest.mark.parametrize("quantize, threshold", [(False, 0.999), (True, 0.97)])
+def test_onnx_embeddings_match_torch(torch_model, tmp_path_factory, quantize, threshold):
+    from services.onnx_encoder import OnnxEncoder
+
+    encoder = OnnxEncoder(
+        settings.EMBEDDING_MODEL_NAME, settings.EMBEDDING_MAX_TOKENS,
+        str(tmp_path_factory.mktemp("onnx")), quantize=quantize
+    )
+
+    expected = torch_model.encode(TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    actual = encoder.encode(TEXTS, batch_size=2, convert_to_numpy=True, normalize_embeddings=True)
+    single = encoder.encode(TEXTS[0], normalize_embeddings=True)
+
+    assert actual.shape == expected.shape and actual.dtype == np.float32
+    # Dynamic quantization scales activations per batch, so padding shifts int8 results slightly
+    assert np.dot(single, actual[0]) >= threshold
+    assert np.all(np.sum(actual * expected, axis=1) >= threshold)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from services.chunk import Chunk
+from services.vector_store import VectorStore
+
+
+class RecordingClient:
+    def __init__(self):
+        self.uploads = []
+
+    def upload_collection(self, collection_name, vectors, payload, ids, batch_size, wait):
+        self.uploads.append({"vectors": vectors, "payload": payload, "ids": ids, "batch_size": batch_size})
+
+
+def make_store():
+    store = VectorStore.__new__(VectorStore)
+    store.client = RecordingClient()
+    return store
+
+
+def test_chunks_are_uploaded_as_views_of_the_matrix():
+    file_info = {"path": "app.py", "name": "app.py", "language": "Python"}
+    chunks = [Chunk(file_info, i, "function", i, i + 1, f"def f{i}(): pass", point_id=f"{i:032x}")
+              for i in range(250)]
+    embeddings = np.arange(250 * 3, dtype=np.float32).reshape(250, 3)
+    store = make_store()
+
+    assert store.insert_chunks("collection", chunks, embeddings) == 250
+
+    uploads = store.client.uploads
+    assert [len(upload["ids"]) for upload in uploads] == [100, 100, 50]
+    assert [point_id for upload in uploads for point_id in upload["ids"]] == [chunk.point_id for chunk in chunks]
+    # No per-vector lists: each block is a slice sharing the matrix's memory
+    assert all(np.shares_memory(upload["vectors"], embeddings) for upload in uploads)
+    assert np.array_equal(np.concatenate([upload["vectors"] for upload in uploads]), embeddings)
+    assert uploads[2]["payload"][0] == chunks[200].to_dict()
+
+
+def test_misaligned_embeddings_are_rejected():
+    with pytest.raises(ValueError):
+        make_store().insert_chunks("collection", [], np.zeros((1, 3), dtype=np.float32))
@@ -7,6 +7,9 @@ from .helpers import (
     extract_repo_info,
     format_file_size,
     get_directory_size,
+    get_object_store_size,
+    hash_content,
+    normalize_repo_url,
     parse_package_json,
     parse_requirements_txt,
     sanitize_filename,
@@ -17,8 +20,11 @@ from .helpers import (
 __all__ = [
     "validate_github_url",
     "extract_repo_info",
+    "normalize_repo_url",
     "format_file_size",
     "get_directory_size",
+    "get_object_store_size",
+    "hash_content",
     "detect_language_from_extension",
     "sanitize_filename",
     "truncate_text",
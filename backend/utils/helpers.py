@@ -1,6 +1,7 @@
 import re
 import os
 import asyncio
+import hashlib
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
@@ -27,6 +28,25 @@ def extract_repo_info(url: str) -> dict:
     return {}
 
 
+def normalize_repo_url(url: str) -> str:
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or "https").lower()
+    host = parsed.netloc.lower()
+    path = parsed.path.rstrip('/')
+    
+    if path.endswith('.git'):
+        path = path[:-4]
+    
+    if host in ("github.com", "www.github.com"):
+        host = "github.com"
+        path = path.lower()
+    
+    if not host:
+        return path
+    
+    return f"{scheme}://{host}{path}"
+
+
 def format_file_size(size_bytes: int) -> str:
     for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
         if size_bytes < 1024.0:
@@ -53,6 +73,30 @@ async def get_directory_size(path: Path) -> int:
     return total_size
 
 
+def get_object_store_size(git_dir: Path) -> int:
+    # Packs only: a handful of files, so this is cheap enough to poll
+    # while a fetch is still streaming into tmp_pack_*.
+    size = 0
+    
+    try:
+        with os.scandir(Path(git_dir) / "objects" / "pack") as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    try:
+                        size += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        continue
+    except FileNotFoundError:
+        return 0
+    
+    return size
+
+
+def hash_content(data) -> str:
+    # Accepts any bytes-like buffer, including an mmap
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
 def detect_language_from_extension(extension: str) -> Optional[str]:
     language_map = {
         '.py': 'Python',
@@ -157,25 +201,32 @@ def parse_package_json(content: str) -> dict:
 def detect_framework(files: list) -> list:
     frameworks = []
     
-    file_names = [f.get('name', '') for f in files]
-    file_contents = {f.get('name', ''): f.get('content', '') for f in files}
-    
-    if 'package.json' in file_names:
-        content = file_contents.get('package.json', '')
-        if 'react' in content.lower():
-            frameworks.append('React')
-        if 'vue' in content.lower():
-            frameworks.append('Vue.js')
-        if 'angular' in content.lower():
-            frameworks.append('Angular')
-        if 'next' in content.lower():
-            frameworks.append('Next.js')
-        if 'express' in content.lower():
-            frameworks.append('Express.js')
-    
-    if 'requirements.txt' in file_names or 'pyproject.toml' in file_names:
-        for file in files:
-            content = file.get('content', '').lower()
+    file_names = {f.get('name', '') for f in files}
+    manifests = ('package.json', 'requirements.txt', 'pyproject.toml', 'Gemfile')
+    
+    # Only manifests are read, one at a time: checkout records load their
+    # content from disk on access, so touching every file would read the repo
+    for file in files:
+        name = file.get('name', '')
+        if name not in manifests:
+            continue
+        content = (file.get('content') or '').lower()
+        
+        if name == 'package.json':
+            if 'react' in content:
+                frameworks.append('React')
+            if 'vue' in content:
+                frameworks.append('Vue.js')
+            if 'angular' in content:
+                frameworks.append('Angular')
+            if 'next' in content:
+                frameworks.append('Next.js')
+            if 'express' in content:
+                frameworks.append('Express.js')
+        elif name == 'Gemfile':
+            if 'rails' in content:
+                frameworks.append('Ruby on Rails')
+        else:
             if 'django' in content:
                 frameworks.append('Django')
             if 'flask' in content:
@@ -186,11 +237,6 @@ def detect_framework(files: list) -> list:
     if 'pom.xml' in file_names or 'build.gradle' in file_names:
         frameworks.append('Spring Boot')
     
-    if 'Gemfile' in file_names:
-        content = file_contents.get('Gemfile', '')
-        if 'rails' in content.lower():
-            frameworks.append('Ruby on Rails')
-    
     return list(set(frameworks))
 
 
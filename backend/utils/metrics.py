@@ -0,0 +1,81 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Registered on the default registry, so they are served from
+# PROMETHEUS_METRICS_PATH next to the HTTP metrics.
+
+FILE_DECODE_TOTAL = Counter(
+    "autodeployx_file_decode_total",
+    "Files decoded by FileReader, by the decoding path that produced the text",
+    ["method"],
+)
+
+FILE_CHARSET_DETECTED_TOTAL = Counter(
+    "autodeployx_file_charset_detected_total",
+    "Encodings reported by charset detection for files that were not UTF-8",
+    ["encoding"],
+)
+
+CHUNKS_SEEN_TOTAL = Counter(
+    "autodeployx_chunks_seen_total",
+    "Chunks produced before deduplication, counting every copy of a duplicated file",
+)
+
+CHUNKS_DEDUPLICATED_TOTAL = Counter(
+    "autodeployx_chunks_deduplicated_total",
+    "Chunks served by an existing embedding instead of being embedded again",
+)
+
+CHUNK_DEDUP_RATIO = Histogram(
+    "autodeployx_chunk_dedup_ratio",
+    "Fraction of a job's chunks saved by content deduplication",
+    buckets=(0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0),
+)
+
+CONTENT_CACHE_REQUESTS_TOTAL = Counter(
+    "autodeployx_content_cache_requests_total",
+    "Content cache lookups, by entry kind and whether they hit",
+    ["kind", "result"],
+)
+
+CONTENT_CACHE_EVICTIONS_TOTAL = Counter(
+    "autodeployx_content_cache_evictions_total",
+    "Content cache entries evicted to stay within CONTENT_CACHE_MAX_MB",
+)
+
+CONTENT_CACHE_SIZE_BYTES = Gauge(
+    "autodeployx_content_cache_size_bytes",
+    "Compressed size of the content cache at its last size check",
+)
+
+EMBEDDING_CACHE_REQUESTS_TOTAL = Counter(
+    "autodeployx_embedding_cache_requests_total",
+    "Embedding cache lookups, by model key and whether they hit",
+    ["kind", "result"],
+)
+
+EMBEDDING_CACHE_EVICTIONS_TOTAL = Counter(
+    "autodeployx_embedding_cache_evictions_total",
+    "Embedding cache entries evicted to stay within EMBEDDING_CACHE_MAX_MB",
+)
+
+EMBEDDING_CACHE_SIZE_BYTES = Gauge(
+    "autodeployx_embedding_cache_size_bytes",
+    "Size of the embedding cache at its last size check",
+)
+
+EMBEDDING_QUEUE_DEPTH = Gauge(
+    "autodeployx_embedding_queue_depth",
+    "Texts waiting for the shared embedding worker",
+)
+
+EMBEDDING_BATCH_FILL_RATIO = Histogram(
+    "autodeployx_embedding_batch_fill_ratio",
+    "Texts in each coalesced embedding batch as a fraction of EMBEDDING_SERVICE_MAX_BATCH",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0, 1.5),
+)
+
+EMBEDDING_BATCH_REQUESTS = Histogram(
+    "autodeployx_embedding_batch_requests",
+    "Requests coalesced into each embedding batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)